@@ -1,20 +1,38 @@
-import copy
-import logging
+import inspect
 from typing import TYPE_CHECKING
 
 from errors import ErrorCode
-from infra.bank_api import MockBankSystem1
-from model.command import MockUpdateTransactionCommand
+from infra.bank_api import MockBankSystem1, AsyncMockBankSystem1
+from infra.event_sink import DEBUG, INFO, WARNING, Event, NULL_EVENT_SINK
+from model.command import MockUpdateTransactionCommand, new_transaction_key
+from model.session import DEPOSIT, WITHDRAW, OperationResult, SessionResult, validate_plan
+from model.snapshot import AccountSnapshot, CardSnapshot, UserSnapshot
 
 if TYPE_CHECKING:
     from model.domain import Card, Account, CashBox
-    from infra.bank_api import IBankSystem
+    from infra.bank_api import IBankSystem, AsyncIBankSystem
     from typing import Callable, NoReturn
     from model.command import IUpdateTransactionCommand
+    from infra.event_sink import IEventSink
+    from infra.timing import Timings
+    from model.velocity import VelocityLimits
+    from concurrent.futures import Future
+    from infra.prefetch import AccountPrefetcher
+
+# Actions, index of `AtmState.transitions`, named after the handler method
+ACTIONS = (
+    'insert_card', 'enter_pin', 'get_accounts', 'back', 'select_account', 'select_deposit', 'select_withdraw',
+    'put_cash', 'enter_withdrawal_amount', 'take_cash', 'select_balance', 'exit', 'remove_card', 'on_load',
+)
+(INSERT_CARD, ENTER_PIN, GET_ACCOUNTS, BACK, SELECT_ACCOUNT, SELECT_DEPOSIT, SELECT_WITHDRAW,
+ PUT_CASH, ENTER_WITHDRAWAL_AMOUNT, TAKE_CASH, SELECT_BALANCE, EXIT, REMOVE_CARD, ON_LOAD) = range(len(ACTIONS))
 
 
 class Atm:
-    def __init__(self, cash_box, bank_system=None, update_transaction=None):
+    __slots__ = ('__context',)
+
+    def __init__(self, cash_box, bank_system=None, update_transaction=None, event_sink=None, timings=None,
+                 velocity_limits=None, prefetcher=None):
         """
         Args:
             cash_box (CashBox): CashBox containing cash, not a physical one
@@ -22,12 +40,33 @@ class Atm:
 
             bank_system (IBankSystem): implementation of Bank System or Mock
             update_transaction (IUpdateTransactionCommand): implementation of update transaction
+            event_sink (IEventSink): sink of transition and handler events, nothing is written by default
+            timings (Timings): histograms of time spent in states and handlers, nothing is timed by default
+            velocity_limits (VelocityLimits): withdrawal limits per card and account, nothing is limited by default
+            prefetcher (AccountPrefetcher): fetches accounts while the pin is entered, nothing is prefetched by default
+        """
+        self.__context = AtmContext(
+            cash_box,
+            bank_system() if bank_system else MockBankSystem1(),
+            update_transaction() if update_transaction else MockUpdateTransactionCommand(),
+            event_sink,
+            timings,
+            velocity_limits,
+            prefetcher
+        )  # type: AtmContext
+
+    @classmethod
+    def attach(cls, context):
+        """Create an `Atm` facade over an existing context
+
+        * It is used by `AtmFleet`, which owns the contexts of its terminals
+
+        Args:
+            context (AtmContext): Terminal record to be driven
         """
-        self.__context = AtmContext()  # type: AtmContext
-        self.__context.cash_box = cash_box
-        self.__context.bank_system = bank_system() if bank_system else MockBankSystem1()
-        self.__context.update_transaction_command \
-            = update_transaction() if update_transaction else MockUpdateTransactionCommand()
+        atm = cls.__new__(cls)
+        atm.__context = context
+        return atm
 
     """ATM ACTIONS"""
     def insert_card(self, card):
@@ -36,7 +75,7 @@ class Atm:
         Args:
             card (Card): Current card
         """
-        self.__context.current.insert_card(card)
+        self.__context.dispatch(INSERT_CARD, card)
 
     def enter_pin(self, pin):
         """Enter pin using `AtmReady`
@@ -44,14 +83,14 @@ class Atm:
         Args:
             pin (str): Personal identification number
         """
-        self.__context.current.enter_pin(pin)
+        self.__context.dispatch(ENTER_PIN, pin)
 
     def display_account_list(self):
-        """Retrieve copy of accounts connected to card"""
-        return self.__context.current.get_accounts()
+        """Retrieve snapshots of accounts connected to card"""
+        return self.__context.dispatch(GET_ACCOUNTS)
 
     def back(self):
-        self.__context.current.back()
+        self.__context.dispatch(BACK)
 
     def select_account(self, idx):
         """Select account
@@ -59,16 +98,15 @@ class Atm:
         Args:
             idx (int): Index of accounts in shared_context, start with 0
         """
-        self.__context.current.select_account(idx)
+        self.__context.dispatch(SELECT_ACCOUNT, idx)
 
     def select_deposit(self):
         """Select deposit menu"""
-        self.__context.current.select_deposit()
+        self.__context.dispatch(SELECT_DEPOSIT)
 
     def select_withdraw(self):
         """Select withdraw menu"""
-        logger = logging.getLogger()
-        self.__context.current.select_withdraw()
+        self.__context.dispatch(SELECT_WITHDRAW)
 
     def put_in_cash(self, amount):
         """Put amount into selected account
@@ -76,7 +114,7 @@ class Atm:
         Args:
             amount: Amount to be deposited
         """
-        self.__context.current.put_cash(amount)
+        self.__context.dispatch(PUT_CASH, amount)
 
     def enter_withdrawal_amount(self, amount):
         """Enter the amount to withdraw from the selected account
@@ -84,7 +122,7 @@ class Atm:
         Args:
             amount (int): Amount to be withdrawn
         """
-        self.__context.current.enter_withdrawal_amount(amount)
+        self.__context.dispatch(ENTER_WITHDRAWAL_AMOUNT, amount)
 
     def take_out_cash(self, amount):
         """Withdraw the amount from selected account after vault is opened
@@ -92,43 +130,76 @@ class Atm:
         Args:
             amount (int): Amount of money to withdraw
         """
-        self.__context.current.take_cash(amount)
+        self.__context.dispatch(TAKE_CASH, amount)
 
     def select_balance(self):
         """Select balance"""
-        self.__context.current.select_balance()
+        self.__context.dispatch(SELECT_BALANCE)
 
     def exit(self):
         """Exit system"""
-        self.__context.current.exit()
+        self.__context.dispatch(EXIT)
 
     def take_out_card(self):
         """Take out card in exit state"""
-        self.__context.current.remove_card()
+        self.__context.dispatch(REMOVE_CARD)
+
+    def run_session(self, card, pin, operations):
+        """Run a whole session, from inserting card to taking it out, in one call
+
+        - The plan is validated before anything is done, see `validate_plan`
+
+        - Balances, cash, errors and `on_error_func` calls are the same as calling the actions one by one::
+
+            insert_card, enter_pin,
+            for each operation: select_account, then
+                select_deposit, put_in_cash
+                or select_withdraw, enter_withdrawal_amount, take_out_cash
+                or select_balance
+            and back, then exit, take_out_card
+
+        - Pin is validated and accounts are loaded once for the session, accounts are not loaded
+          again between operations. No transition is emitted and `on_load_func` is not called
+
+        Args:
+            card (Card): Card to insert
+            pin (str): Personal identification number
+            operations (Iterable[tuple]): `(DEPOSIT, account_index, amount)`, `(WITHDRAW, account_index, amount)`
+                or `(BALANCE, account_index)`, see `model.session`
+
+        Returns:
+            SessionResult: Result of authorization and of each operation run
+
+        Raises:
+            ValueError: Raised if the plan is not valid, nothing is done
+            RuntimeError: Raised if a card is in the terminal
+        """
+        return self.__context.run_session(card, pin, validate_plan(operations))
 
     """FOR UI IMPLEMENTATION"""
     def get_selected_account(self):
-        """Get selected account object
+        """Get read-only snapshot of selected account, None if not selected
 
         * This method designed to support ui
         """
-        return copy.deepcopy(self.__context.selected_account)
+        account = self.__context.selected_account
+        return AccountSnapshot.of(account) if account is not None else None
 
     def get_inserted_card(self):
-        """Get card object
+        """Get read-only snapshot of card, None if no card is inserted
 
         * This method designed to support ui
         """
-        card = copy.deepcopy(self.__context.card)
-        return card
+        card = self.__context.card
+        return CardSnapshot.of(card) if card is not None else None
 
     def get_user(self):
-        """Get user object
+        """Get read-only snapshot of card holder with cards and accounts, None if no card is inserted
 
         * This method designed to support ui
         """
-        user = copy.deepcopy(self.__context.card.card_holder)
-        return user
+        card = self.__context.card
+        return UserSnapshot.of(card.card_holder) if card is not None else None
 
     def get_current_state_name(self):
         """Get current state
@@ -159,216 +230,465 @@ class Atm:
         """
         self.__context.register_on_error(on_error_func)
 
-class AtmContext:
-    def __init__(self):
-        self.states = {
-            AtmWait.get_name(): AtmWait(self),
-            AtmReady.get_name(): AtmReady(self),
-            AtmAuthorized.get_name(): AtmAuthorized(self),
-            AtmAccountSelected.get_name(): AtmAccountSelected(self),
-            AtmProcessingDeposit.get_name(): AtmProcessingDeposit(self),
-            AtmPreProcessingWithdrawal.get_name(): AtmPreProcessingWithdrawal(self),
-            AtmProcessingWithdrawal.get_name(): AtmProcessingWithdrawal(self),
-            AtmDisplayingBalance.get_name(): AtmDisplayingBalance(self),
-            AtmExit.get_name(): AtmExit(self),
-        }
-        # Initialize first time only
-        self.cash_box = None # type: CashBox
-        self.bank_system = None  # type: IBankSystem
-        self.update_transaction_command = None # type: IUpdateTransactionCommand
-        self.on_load_func = None # type: Callable[..., NoReturn]
-        self.on_error_func = None # type: Callable[[Exception], NoReturn]
 
-        # Temporal variables which can be reset on user's leave
-        self.current = self.states[AtmWait.get_name()]  # type: AtmState
-        self.card = None  # type: Card
-        self.accounts = []
-        self.selected_account = None  # type: Account
-        self.amount_to_be_withdrawn = 0  # type: int
-    def clean_context(self):
-        """Clean context
+class AsyncAtm:
+    """Asyncio counterpart of `Atm`
 
-        * It change the current state to AtmWait
-        """
-        self.current = self.states[AtmWait.get_name()]  # type: AtmState
-        self.card = None  # type: Card
-        self.accounts = []
-        self.selected_account = None  # type: Account
-        self.amount_to_be_withdrawn = 0  # type: int
+    - Actions are coroutines, the bank is called through `AsyncIBankSystem` so one event loop
+      can drive many terminals at once
 
+    - Other actions and transitions are the same as `Atm`, both use `TRANSITIONS`
+    """
+    __slots__ = ('__context',)
 
-    def set_state(self, state_name):
-        """Set current state by state name
-
-        * All states needs to call this method to change itself to another
-
+    def __init__(self, cash_box, bank_system=None, update_transaction=None, event_sink=None, timings=None,
+                 velocity_limits=None, prefetcher=None):
+        """
         Args:
-            state_name (str): Name of next state
+            cash_box (CashBox): CashBox containing cash, not a physical one
+            bank_system (AsyncIBankSystem): implementation of async Bank System or Mock
+            update_transaction (IUpdateTransactionCommand): implementation of update transaction
+            event_sink (IEventSink): sink of transition and handler events, nothing is written by default
+            timings (Timings): histograms of time spent in states and handlers, nothing is timed by default
+            velocity_limits (VelocityLimits): withdrawal limits per card and account, nothing is limited by default
+            prefetcher (AccountPrefetcher): fetches accounts while the pin is entered, nothing is prefetched by default
         """
-        self.current = self.states[state_name]
-        self.current.on_load()
-        balance = self.selected_account.balance if self.selected_account else 'Not Selected'
-        print('[%s card=%s, balance=%s]' % (state_name, self.card, balance))
-        if self.on_load_func:
-            self.on_load_func()
+        self.__context = AtmContext(
+            cash_box,
+            bank_system() if bank_system else AsyncMockBankSystem1(),
+            update_transaction() if update_transaction else MockUpdateTransactionCommand(),
+            event_sink,
+            timings,
+            velocity_limits,
+            prefetcher
+        )  # type: AtmContext
 
-    def register_on_load(self, on_load_func):
-        """Register function which is to be called after change state
+    @classmethod
+    def attach(cls, context):
+        """Create an `AsyncAtm` facade over an existing context
 
         Args:
-            on_load_func (function): Function to be called after change state
+            context (AtmContext): Terminal record whose bank system is an `AsyncIBankSystem`
         """
-        self.on_load_func = on_load_func
+        atm = cls.__new__(cls)
+        atm.__context = context
+        return atm
+
+    """ATM ACTIONS"""
+    async def insert_card(self, card):
+        """Same as `Atm.insert_card`"""
+        await self.__context.dispatch_async(INSERT_CARD, card)
+
+    async def enter_pin(self, pin):
+        """Same as `Atm.enter_pin`, pin is validated without blocking the event loop"""
+        await self.__context.dispatch_async(ENTER_PIN, pin)
+
+    async def display_account_list(self):
+        """Same as `Atm.display_account_list`"""
+        return await self.__context.dispatch_async(GET_ACCOUNTS)
+
+    async def back(self):
+        await self.__context.dispatch_async(BACK)
+
+    async def select_account(self, idx):
+        """Same as `Atm.select_account`"""
+        await self.__context.dispatch_async(SELECT_ACCOUNT, idx)
+
+    async def select_deposit(self):
+        """Same as `Atm.select_deposit`"""
+        await self.__context.dispatch_async(SELECT_DEPOSIT)
+
+    async def select_withdraw(self):
+        """Same as `Atm.select_withdraw`"""
+        await self.__context.dispatch_async(SELECT_WITHDRAW)
+
+    async def put_in_cash(self, amount):
+        """Same as `Atm.put_in_cash`"""
+        await self.__context.dispatch_async(PUT_CASH, amount)
+
+    async def enter_withdrawal_amount(self, amount):
+        """Same as `Atm.enter_withdrawal_amount`"""
+        await self.__context.dispatch_async(ENTER_WITHDRAWAL_AMOUNT, amount)
+
+    async def take_out_cash(self, amount):
+        """Same as `Atm.take_out_cash`"""
+        await self.__context.dispatch_async(TAKE_CASH, amount)
+
+    async def select_balance(self):
+        """Same as `Atm.select_balance`"""
+        await self.__context.dispatch_async(SELECT_BALANCE)
+
+    async def exit(self):
+        """Same as `Atm.exit`"""
+        await self.__context.dispatch_async(EXIT)
+
+    async def take_out_card(self):
+        """Same as `Atm.take_out_card`"""
+        await self.__context.dispatch_async(REMOVE_CARD)
+
+    """FOR UI IMPLEMENTATION"""
+    def get_selected_account(self):
+        """Same as `Atm.get_selected_account`"""
+        return Atm.attach(self.__context).get_selected_account()
+
+    def get_inserted_card(self):
+        """Same as `Atm.get_inserted_card`"""
+        return Atm.attach(self.__context).get_inserted_card()
+
+    def get_user(self):
+        """Same as `Atm.get_user`"""
+        return Atm.attach(self.__context).get_user()
+
+    def get_current_state_name(self):
+        """Same as `Atm.get_current_state_name`"""
+        return self.__context.current.get_name()
+
+    def register_on_load(self, on_load_func):
+        """Same as `Atm.register_on_load`"""
+        self.__context.register_on_load(on_load_func)
 
     def register_on_error(self, on_error_func):
-        """Register on error function to be called after error
+        """Same as `Atm.register_on_error`"""
+        self.__context.register_on_error(on_error_func)
 
-        * The method design to support UI
 
-        Args:
-            on_error_func (function): Function to be called after changing state
-                `on_error_func` should have one parameter (e.g. Callable[[Exception], NoReturn]) to get an error
-                return type does not matter
-        """
-        self.on_error_func = on_error_func
+class AtmContext:
+    """Per-terminal record
 
-class AtmState:
-    """The default state
+    - States are shared flyweights (see `STATES`), so everything that belongs to one
+      terminal lives here and is passed to the state handlers
+
+    - Actions are dispatched through the compiled `TRANSITIONS` table of the current state
 
-    - For all method, it print message `Action is not available in the current state`
+    - With enabled `timings`, handlers and the time spent in each state are recorded, see `Timings`
     """
 
-    def __init__(self, context):
+    __slots__ = (
+        'cash_box', 'bank_system', 'update_transaction_command', 'event_sink', 'on_load_func', 'on_error_func',
+        'timings', 'entered', 'current', 'card', 'accounts', 'selected_account', 'amount_to_be_withdrawn',
+        'transaction_key', 'velocity_limits', 'prefetcher', 'prefetch',
+    )
+
+    def __init__(self, cash_box=None, bank_system=None, update_transaction_command=None, event_sink=None,
+                 timings=None, velocity_limits=None, prefetcher=None):
         """
         Args:
-            context (AtmContext): Shared context
+            cash_box (CashBox): Atm's cashbox
+            bank_system (IBankSystem): Bank system instance, may be shared between terminals
+            update_transaction_command (IUpdateTransactionCommand): Transaction command instance
+            event_sink (IEventSink): Sink of events, may be shared between terminals
+            timings (Timings): Latency histograms, may be shared between terminals
+            velocity_limits (VelocityLimits): Withdrawal limits, shared between terminals
+            prefetcher (AccountPrefetcher): Account prefetcher, shared between terminals
         """
-        self.shared_context = context
+        # Initialize first time only
+        self.cash_box = cash_box # type: CashBox
+        self.bank_system = bank_system  # type: IBankSystem
+        self.update_transaction_command = update_transaction_command # type: IUpdateTransactionCommand
+        self.event_sink = event_sink or NULL_EVENT_SINK # type: IEventSink
+        self.on_load_func = None # type: Callable[..., NoReturn]
+        self.on_error_func = None # type: Callable[[Exception], NoReturn]
+        self.timings = timings  # type: Timings
+        self.velocity_limits = velocity_limits  # type: VelocityLimits
+        self.prefetcher = prefetcher  # type: AccountPrefetcher
+        # accounts of the inserted card being fetched, not taken yet
+        self.prefetch = None  # type: Future
+        # perf counter and state when the current state was entered while timing
+        self.entered = None  # type: tuple[int, AtmState]
 
-    @classmethod
-    def get_name(cls):
-        """Return class state_name
+        # Temporal variables which can be reset on user's leave
+        self.clean_context()
 
-        - Class state_name is used for picking next state in `AtmContext`
-        """
-        return cls.__name__
+    @property
+    def states(self):
+        """Shared state instances by state name"""
+        return STATES
 
-    def on_error(self, e):
-        """call on_errr_func in context
+    def clean_context(self):
+        """Clean context
 
-        Args:
-            e (str): error message
+        * It change the current state to AtmWait
+
+        * Accounts prefetched but not taken are discarded
         """
-        if self.shared_context.on_error_func:
-            self.shared_context.on_error_func(e)
+        if self.prefetch is not None:
+            self.prefetcher.discard(self.prefetch)
+            self.prefetch = None
+        self.current = STATES[AtmWait.get_name()]  # type: AtmState
+        self.card = None  # type: Card
+        self.accounts = ()
+        self.selected_account = None  # type: Account
+        self.amount_to_be_withdrawn = 0  # type: int
+        # idempotency key of the transaction selected, the same for retries of it
+        self.transaction_key = None  # type: str
 
-    def on_load(self):
-        pass
+    def dispatch(self, action, *args):
+        """Run handler of action in the current state, then move to the next state
 
-    def insert_card(self, card):
-        """Insert card in `AtmWait`
+        - When the handler raises one of `HANDLED_ERRORS`, `on_error_func` is called and
+          it moves to the failure state of the transition instead
 
         Args:
-            card (Card): Current card
+            action (int): One of action constants e.g. `INSERT_CARD`
+
+        Returns:
+            Return value of handler, None if it failed
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        handler, on_success, on_failure = self.current.transitions[action]
+        timings = self.timings
+        try:
+            if timings is None or not timings.enabled:
+                result = handler(self, *args)
+            else:
+                result = self.timed(timings, action, handler, args)
+        except HANDLED_ERRORS as e:
+            self.fail(e)
+            if on_failure is not None:
+                self.set_state(on_failure)
+            return None
+        if on_success is not None:
+            self.set_state(on_success)
+        return result
 
-    def enter_pin(self, pin):
-        """Enter pin number in `AtmReady`
+    async def dispatch_async(self, action, *args):
+        """Same as `dispatch`, but handlers calling the bank are awaited
 
-        Args:
-            pin (str): Personal identification number
+        * Bank system of the context must be an `AsyncIBankSystem`
 
-        Raises:
-            ValueError: Raised if incorrect pin is entered.
+        Args:
+            action (int): One of action constants e.g. `INSERT_CARD`
 
-                When raised, then it does not change to `AtmExit`
+        Returns:
+            Return value of handler, None if it failed
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        handler, on_success, on_failure, is_coroutine = self.current.transitions_async[action]
+        timings = self.timings
+        started = timings.clock() if timings is not None and timings.enabled else None
+        try:
+            result = handler(self, *args)
+            if is_coroutine:
+                result = await result
+        except HANDLED_ERRORS as e:
+            self.fail(e)
+            if on_failure is not None:
+                await self.set_state_async(on_failure)
+            return None
+        finally:
+            if started is not None:
+                timings.record(_handler_timing_name(action, handler), timings.clock() - started)
+        if on_success is not None:
+            await self.set_state_async(on_success)
+        return result
+
+    def timed(self, timings, action, handler, args):
+        """Run handler and record its latency as `handler.<action>`
+
+        * Actions not available in the current state are recorded as `handler.not_available`
+        """
+        started = timings.clock()
+        try:
+            return handler(self, *args)
+        finally:
+            timings.record(_handler_timing_name(action, handler), timings.clock() - started)
 
-    def get_accounts(self):
-        """Get account list which is connected to card in `AtmAuthorized`
+    def run_session(self, card, pin, plan):
+        """Run handlers of a validated plan directly, see `Atm.run_session`
+
+        * A handler failing takes the same way as its failure transition: a failed deposit or
+          withdrawal amount ends the session, a failed cash take-out or account selection does not
+
+        Args:
+            card (Card): Card to insert
+            pin (str): Personal identification number
+            plan (tuple[tuple[str, int, int], ...]): Result of `validate_plan`
 
         Returns:
-            list[Account]: List of account
+            SessionResult: Result of authorization and of each operation run
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        if self.current is not STATES[AtmWait.get_name()]:
+            raise RuntimeError('a card is in the terminal')
+        wait, ready, authorized, selected, deposit, pre_withdrawal, withdrawal, displaying = _SESSION_STATES
+        operations = []
+        try:
+            wait.insert_card(self, card)
+            try:
+                ready.enter_pin(self, pin)
+                authorized.on_load(self)
+            except HANDLED_ERRORS as e:
+                self.fail(e)
+                return SessionResult(False, e, ())
+            for kind, index, amount in plan:
+                try:
+                    authorized.select_account(self, index)
+                except HANDLED_ERRORS as e:
+                    self.fail(e)
+                    operations.append(OperationResult(kind, index, amount, None, e))
+                    continue
+                error = None
+                try:
+                    if kind == DEPOSIT:
+                        selected.select_deposit(self)
+                        deposit.put_cash(self, amount)
+                    elif kind == WITHDRAW:
+                        selected.select_withdraw(self)
+                        pre_withdrawal.enter_withdrawal_amount(self, amount)
+                except HANDLED_ERRORS as e:
+                    self.fail(e)
+                    operations.append(OperationResult(kind, index, amount, self.selected_account.balance, e))
+                    return SessionResult(True, e, tuple(operations))
+                if kind == WITHDRAW:
+                    try:
+                        withdrawal.take_cash(self, amount)
+                    except HANDLED_ERRORS as e:
+                        self.fail(e)
+                        error = e
+                displaying.on_load(self)
+                operations.append(OperationResult(kind, index, amount, self.selected_account.balance, error))
+            return SessionResult(True, None, tuple(operations))
+        finally:
+            self.clean_context()
+
+    def fail(self, e):
+        """Report error raised by a handler of the current state
 
-    def back(self):
-        print('Action is not available in the current state [%s]' % self.get_name())
+        Args:
+            e (Exception): Raised error
+        """
+        self.emit(WARNING, 'error', '%s', e)
+        self.current.on_error(self, e)
 
-    def select_account(self, idx):
-        """Select account to be used in `AtmAuthorized`
+    def set_state(self, state):
+        """Set current state
 
-        - When is success, then it changes to `AtmAccountSelected`
+        * `dispatch` calls this method with the next state of the transition
 
         Args:
-            idx (int): Index of accounts in shared_context, start with 0
-
-        Raises:
-            IndexError: Raised if Idx is not in range of account list - When raised,
-                then it changes to `AtmExit`
+            state (AtmState): Next state, one of `STATES`
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        timings = self.timings
+        if timings is not None and timings.enabled:
+            self.enter(timings, state)
+        self.current = state
+        if state.transitions[ON_LOAD] is not None:
+            self.dispatch(ON_LOAD)
+        self.loaded(state)
 
-    def select_deposit(self):
-        """Select deposit menu
+    async def set_state_async(self, state):
+        """Same as `set_state`, used by `dispatch_async`
 
-        * It changes to `AtmProcessingDeposit`
+        Args:
+            state (AtmState): Next state, one of `STATES`
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        timings = self.timings
+        if timings is not None and timings.enabled:
+            self.enter(timings, state)
+        self.current = state
+        if state.transitions_async[ON_LOAD] is not None:
+            await self.dispatch_async(ON_LOAD)
+        self.loaded(state)
+
+    def enter(self, timings, state):
+        """Record time spent in the state entered before as `state.<name>`, then start timing state
+
+        * Time of the first state entered after timing is enabled is not known, it is not recorded
+        """
+        now = timings.clock()
+        entered = self.entered
+        if entered is not None:
+            timings.record(_STATE_TIMING_NAMES[entered[1]], now - entered[0])
+        self.entered = (now, state)
 
-    def select_withdraw(self):
-        """Select withdraw menu
+    def loaded(self, state):
+        """Emit transition event and call `on_load_func` after a state is loaded
 
-        * It changes to `AtmProcessingWithdraw`
+        Args:
+            state (AtmState): Loaded state
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        sink = self.event_sink
+        if INFO >= sink.level:
+            sink.emit(Event(INFO, 'transition', '[%s card=%s, balance=%s]', (
+                state.get_name(),
+                self.card.card_number if self.card else None,
+                self.selected_account.balance if self.selected_account else 'Not Selected'
+            )))
+        if self.on_load_func:
+            self.on_load_func()
+
+    def emit(self, level, kind, message, *args):
+        """Emit event to the sink if the level is enabled
 
-    def put_cash(self, amount):
-        """Deposit the amount into selected account in `AtmAccountSelected`
+        * Arguments are kept as they are, formatting is left to the sink
 
         Args:
-            amount (int): Amount of money to deposit
+            level (int): Level of event
+            kind (str): Kind of event
+            message (str): %-style format string
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        sink = self.event_sink
+        if level >= sink.level:
+            sink.emit(Event(level, kind, message, args))
 
-    def enter_withdrawal_amount(self, amount):
-        """Enter the amount to withdraw from the selected account
+    def register_on_load(self, on_load_func):
+        """Register function which is to be called after change state
 
         Args:
-            amount (int): Amount of money to withdraw
+            on_load_func (function): Function to be called after change state
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        self.on_load_func = on_load_func
 
-    def take_cash(self, amount):
-        """Withdraw the amount from selected account after vault is opened
+    def register_on_error(self, on_error_func):
+        """Register on error function to be called after error
+
+        * The method design to support UI
 
         Args:
-            amount (int): Amount of money to withdraw
+            on_error_func (function): Function to be called after changing state
+                `on_error_func` should have one parameter (e.g. Callable[[Exception], NoReturn]) to get an error
+                return type does not matter
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        self.on_error_func = on_error_func
 
-    def select_balance(self):
-        """Select display balance menu in `AtmAccountSelected`
+class AtmState:
+    """The default state
 
-        * It changes to `AtmDisplayingBalance`
-        """
-        print('Action is not available in the current state [%s]' % self.get_name())
+    - Actions which are not in `TRANSITIONS` emit `Action is not available in the current state` event
 
-    def exit(self):
-        """Select display balance menu in multiple state
+    - A state holds nothing, one instance of each state is shared by every terminal.
+      The terminal's `AtmContext` is passed as the first argument of each handler
+
+    - A handler raises one of `HANDLED_ERRORS` to take the failure transition
+    """
+
+    __slots__ = ()
+
+    # Compiled rows of `TRANSITIONS` indexed by action, set by `compile_transitions`
+    transitions = ()  # type: tuple
+    transitions_async = ()  # type: tuple
 
-        * It changes to `AtmExit`
+    @classmethod
+    def get_name(cls):
+        """Return class state_name
+
+        - Class state_name is used for displaying current state
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        return cls.__name__
 
-    def remove_card(self):
-        """Remove card and remove all context variables
+    def on_error(self, context, e):
+        """call on_errr_func in context
 
-        * It changes to ` AtmWait'
+        Args:
+            e (str): error message
         """
-        print('Action is not available in the current state [%s]' % self.get_name())
+        if context.on_error_func:
+            context.on_error_func(e)
+
+    def not_available(self, context, *args):
+        """Emit event for an action which is not available in the current state"""
+        sink = context.event_sink
+        if WARNING >= sink.level:
+            sink.emit(Event(WARNING, 'not_available', 'Action is not available in the current state [%s]', (
+                self.get_name(),
+            )))
 
 
 class AtmWait(AtmState):
@@ -379,7 +699,7 @@ class AtmWait(AtmState):
     - When a card is inserted th,en it changes to the `AtmReady`
     """
 
-    def insert_card(self, card):
+    def insert_card(self, context, card):
         """Insert card in `AtmWait`
 
         - If successful, it changes to `AtmReady`.
@@ -387,9 +707,10 @@ class AtmWait(AtmState):
         Args:
             card (Card): Current card
         """
-        print('insert card %s' % card)
-        self.shared_context.card = card
-        self.shared_context.set_state(AtmReady.get_name())
+        context.emit(DEBUG, 'insert_card', 'insert card %s', card.card_number)
+        context.card = card
+        if context.prefetcher is not None:
+            context.prefetch = context.prefetcher.start(context.bank_system, card)
 
 
 class AtmReady(AtmState):
@@ -402,7 +723,7 @@ class AtmReady(AtmState):
     - When a back is selected, then it changes to `AtmExit`
     """
 
-    def enter_pin(self, pin):
+    def enter_pin(self, context, pin):
         """Enter pin number in `AtmReady`
 
         Args:
@@ -411,24 +732,26 @@ class AtmReady(AtmState):
         Raises:
             ValueError: incorrect pin is entered - When raised, it changes to `AtmExit`.
         """
-        print('enter pin %s' % pin)
-        # TODO: verify number from server
-        try:
-            if self.shared_context.bank_system.validate_pin(
-                    self.shared_context.card.card_number,
-                    pin
-            ):
-                self.shared_context.set_state(AtmAuthorized.get_name())
-                return True
-            else:
-                raise ValueError(ErrorCode.PIN_IS_NOT_MATCHED)
-        except ValueError as e:
-            self.on_error(e)
-            self.shared_context.set_state(AtmExit.get_name())
-            logging.getLogger().warning(e)
+        context.emit(DEBUG, 'enter_pin', 'enter pin')
+        return self.check_pin(context.bank_system.validate_pin(context.card.card_number, pin))
 
-    def exit(self):
-        self.shared_context.set_state(AtmExit.get_name())
+    async def enter_pin_async(self, context, pin):
+        """Same as `enter_pin` with `AsyncIBankSystem`"""
+        context.emit(DEBUG, 'enter_pin', 'enter pin')
+        return self.check_pin(await context.bank_system.validate_pin(context.card.card_number, pin))
+
+    def check_pin(self, is_valid):
+        """Check result of pin validation
+
+        Args:
+            is_valid (bool): Result from bank system
+
+        Raises:
+            ValueError: incorrect pin is entered - When raised, it changes to `AtmExit`.
+        """
+        if not is_valid:
+            raise ValueError(ErrorCode.PIN_IS_NOT_MATCHED)
+        return True
 
 
 class AtmAuthorized(AtmState):
@@ -441,31 +764,62 @@ class AtmAuthorized(AtmState):
     - When a back-menu is selected, then it changes to `AtmReady`
     """
 
-    def on_load(self):
-        self.get_accounts()
+    def on_load(self, context):
+        """Load accounts into context, the snapshot for UI is not made here
+
+        * Accounts prefetched since the card was inserted are taken instead of calling the bank,
+          see `AccountPrefetcher`
+        """
+        prefetch, accounts = context.prefetch, None
+        if prefetch is not None:
+            context.prefetch = None
+            accounts = context.prefetcher.take(prefetch)
+        if accounts is None:
+            accounts = context.bank_system.get_accounts(context.card)
+        self.set_accounts(context, accounts)
+
+    async def on_load_async(self, context):
+        """Same as `on_load` with `AsyncIBankSystem`"""
+        prefetch, accounts = context.prefetch, None
+        if prefetch is not None:
+            context.prefetch = None
+            accounts = await context.prefetcher.take_async(prefetch)
+        if accounts is None:
+            accounts = await context.bank_system.get_accounts(context.card)
+        self.set_accounts(context, accounts)
+
+    def set_accounts(self, context, accounts):
+        """Keep accounts retrieved from bank system in context
+
+        Args:
+            accounts (list[Account]): Accounts connected to card
+
+        Raises:
+            RuntimeError: Raised if cannot find accounts - When raised, it changes to `AtmExit`.
+        """
+        context.accounts = accounts
+        if len(accounts) < 1:
+            raise RuntimeError(ErrorCode.CANNOT_FIND_ACCOUNT)
+        context.emit(DEBUG, 'get_accounts', 'get accounts result=%s', accounts)
 
-    def get_accounts(self):
+    def get_accounts(self, context):
         """Get account list which is connected to card in `AtmAuthorized`
 
         Returns:
-            list[Account]: List of account
+            tuple[AccountSnapshot]: Snapshots of accounts
 
         Raises:
-            ReferenceError: Raised if cannot find accounts - When raised, it changes to `AtmExit`.
+            RuntimeError: Raised if cannot find accounts - When raised, it changes to `AtmExit`.
         """
-        try:
-            self.shared_context.accounts \
-                = self.shared_context.bank_system.get_accounts(self.shared_context.card)
-            if len(self.shared_context.accounts) < 1:
-                raise RuntimeError(ErrorCode.CANNOT_FIND_ACCOUNT)
-            print('get accounts result=%s' % self.shared_context.accounts)
-        except RuntimeError as e:
-            print(e)
-            self.on_error(e)
-            self.shared_context.set_state(AtmExit.get_name())
-        return copy.deepcopy(self.shared_context.accounts)
+        self.on_load(context)
+        return tuple([AccountSnapshot.of(account) for account in context.accounts])
 
-    def select_account(self, idx):
+    async def get_accounts_async(self, context):
+        """Same as `get_accounts` with `AsyncIBankSystem`"""
+        await self.on_load_async(context)
+        return tuple([AccountSnapshot.of(account) for account in context.accounts])
+
+    def select_account(self, context, idx):
         """Select account to be used in `AtmAuthorized`
 
         - When is success, then It changes to `AtmAccountSelected`
@@ -477,16 +831,10 @@ class AtmAuthorized(AtmState):
             IndexError: Raised if idx is not in range of account list - When raised, it does not anything
         """
         try:
-            self.shared_context.selected_account \
-                = self.shared_context.accounts[idx]
-            self.shared_context.set_state(AtmAccountSelected.get_name())
-        except IndexError as e:
-            print(e)
-            self.on_error(e)
-            print('index starts from 0, candidates=%s' % self.shared_context.accounts)
-
-    def exit(self):
-        self.shared_context.set_state(AtmExit.get_name())
+            context.selected_account = context.accounts[idx]
+        except IndexError:
+            context.emit(DEBUG, 'select_account', 'index starts from 0, candidates=%s', context.accounts)
+            raise
 
 
 class AtmAccountSelected(AtmState):
@@ -501,36 +849,19 @@ class AtmAccountSelected(AtmState):
     - When a get-balance is selected, then it gives balance of selected account
     """
 
-    def select_deposit(self):
-        """Select deposit menu
-
-        * It changes to `AtmProcessingDeposit`
-        """
-        self.shared_context.set_state(AtmProcessingDeposit.get_name())
-
-    def select_withdraw(self):
-        """Select withdraw menu
-
-        * It changes to `AtmProcessingWithdraw`
-        """
-        self.shared_context.set_state(AtmPreProcessingWithdrawal.get_name())
-
-    def exit(self):
-        self.shared_context.set_state(AtmExit.get_name())
-
-    def select_balance(self):
-        """Select display balance menu in `AtmAccountSelected`
-
-        * It changes to `AtmDisplayingBalance`
-        """
-        self.shared_context.set_state(AtmDisplayingBalance.get_name())
+    def select_deposit(self, context):
+        """Give the deposit a new idempotency key"""
+        context.transaction_key = new_transaction_key()
 
+    def select_withdraw(self, context):
+        """Give the withdrawal a new idempotency key"""
+        context.transaction_key = new_transaction_key()
 
-    def back(self):
+    def back(self, context):
         """ back to `AtmAuthorized`
         """
-        self.shared_context.selected_account = None
-        self.shared_context.set_state(AtmAuthorized.get_name())
+        context.selected_account = None
+
 
 class AtmProcessingDeposit(AtmState):
     """The state processing deposit transaction
@@ -543,39 +874,26 @@ class AtmProcessingDeposit(AtmState):
       `AtmExit` while throwing error
     """
 
-    def put_cash(self, amount):
+    def put_cash(self, context, amount):
         """Put amount into selected account in `AtmProcessingDeposit`
 
+        * When failed, assume customer withdraw the left money in the vault
+
         Args:
             amount: Amount the customer wants to deposit
         """
-        print('put cash %s' % amount)
-        try:
-            if amount < 0:
-                raise ValueError(ErrorCode.AMOUNT_MUST_BE_POSITIVE)
-            # transaction
-            self.shared_context.update_transaction_command.execute(
-                self.shared_context.bank_system,
-                self.shared_context.cash_box,
-                self.shared_context.selected_account,
-                + amount
-            )
-            self.shared_context.set_state(AtmDisplayingBalance.get_name())
-        except ValueError as e:
-            print(e)
-            self.on_error(e)
-            # in this case, assume customer withdraw the left money in the vault
-            self.shared_context.set_state(AtmExit.get_name())
-
-    def exit(self):
-        self.shared_context.set_state(AtmExit.get_name())
+        context.emit(DEBUG, 'put_cash', 'put cash %s', amount)
+        if amount < 0:
+            raise ValueError(ErrorCode.AMOUNT_MUST_BE_POSITIVE)
+        # transaction
+        context.update_transaction_command.execute(
+            context.bank_system,
+            context.cash_box,
+            context.selected_account,
+            + amount,
+            context.transaction_key
+        )
 
-    def back(self):
-        """ back to `AtmAccountSelected`
-
-        * Customer canceled deposit
-        """
-        self.shared_context.set_state(AtmAccountSelected.get_name())
 
 class AtmPreProcessingWithdrawal(AtmState):
     """The state processing withdrawal transaction
@@ -588,40 +906,32 @@ class AtmPreProcessingWithdrawal(AtmState):
       `AtmProcessingWithdrawal`
     """
 
-    def enter_withdrawal_amount(self, amount):
+    def enter_withdrawal_amount(self, context, amount):
         """Enter amount customer want to withdraw
 
-        - Check current machine's cash box
+        - Check current machine's cash box, and that its notes can make the amount
 
         - Check customer's account balance
 
+        - Check withdrawal limits of card and account, see `VelocityLimits`
+
         Args:
             amount: Amount the customer want to withdraw
         """
-        print('enter withdrawal amount %s' % amount)
-        try:
-            if amount < 0:
-                raise ValueError(ErrorCode.AMOUNT_MUST_BE_POSITIVE)
-            if self.shared_context.cash_box.cash < amount:
-                raise ValueError(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH)
-            if self.shared_context.selected_account.balance < amount:
-                raise ValueError(ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH)
-            self.shared_context.amount_to_be_withdrawn = amount
-            self.shared_context.set_state(AtmProcessingWithdrawal.get_name())
-        except ValueError as e:
-            print(str(e))
-            self.on_error(e)
-            self.shared_context.set_state(AtmExit.get_name())
+        context.emit(DEBUG, 'enter_withdrawal_amount', 'enter withdrawal amount %s', amount)
+        if amount < 0:
+            raise ValueError(ErrorCode.AMOUNT_MUST_BE_POSITIVE)
+        cash_box = context.cash_box
+        if cash_box.cash < amount:
+            raise ValueError(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH)
+        if cash_box.cassettes is not None:
+            cash_box.cassettes.plan(amount)
+        if context.selected_account.balance < amount:
+            raise ValueError(ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH)
+        if context.velocity_limits is not None:
+            context.velocity_limits.check(context.card.card_number, context.selected_account.account_number, amount)
+        context.amount_to_be_withdrawn = amount
 
-    def exit(self):
-        self.shared_context.set_state(AtmExit.get_name())
-
-    def back(self):
-        """ back to `AtmAccountSelected`
-
-        * Customer canceled withdrawal
-        """
-        self.shared_context.set_state(AtmAccountSelected.get_name())
 
 class AtmProcessingWithdrawal(AtmState):
     """The state processing withdrawal transaction
@@ -634,43 +944,44 @@ class AtmProcessingWithdrawal(AtmState):
       `AtmExit` while throwing error
     """
 
-    def take_cash(self, amount):
+    def take_cash(self, context, amount):
         """Withdraw the amount from selected account after vault is opened
 
         * Customer left with out taking cash means customer take 0 cash
+
+        * The amount is counted in `velocity_limits` before the transaction and given back if it fails
         Args:
             amount (int): Amount to withdraw
         """
-        print('[take cash %s]' % amount)
+        context.emit(DEBUG, 'take_cash', '[take cash %s]', amount)
+        if amount < 0:
+            raise RuntimeError(ErrorCode.AMOUNT_MUST_BE_POSITIVE)
+        if amount > context.amount_to_be_withdrawn:
+            raise RuntimeError(ErrorCode.AMOUNT_MUST_BE_LOWER_THAN_AMOUNT_TO_BE_WITHDRAWN)
+        limits, at = context.velocity_limits, None
+        if limits is not None and amount:
+            at = limits.withdraw(context.card.card_number, context.selected_account.account_number, amount)
         try:
-            if amount < 0:
-                raise RuntimeError(ErrorCode.AMOUNT_MUST_BE_POSITIVE)
-            if amount > self.shared_context.amount_to_be_withdrawn:
-                raise RuntimeError(ErrorCode.AMOUNT_MUST_BE_LOWER_THAN_AMOUNT_TO_BE_WITHDRAWN)
             # transaction
-            self.shared_context.update_transaction_command.execute(
-                self.shared_context.bank_system,
-                self.shared_context.cash_box,
-                self.shared_context.selected_account,
-                - amount
+            context.update_transaction_command.execute(
+                context.bank_system,
+                context.cash_box,
+                context.selected_account,
+                - amount,
+                context.transaction_key
             )
-            self.shared_context.set_state(AtmDisplayingBalance.get_name())
-        except ValueError as e:
-            print(e)
-            self.on_error(e)
-            self.shared_context.set_state(AtmDisplayingBalance.get_name())
+        except Exception:
+            if at is not None:
+                limits.cancel(context.card.card_number, context.selected_account.account_number, amount, at)
+            raise
 
-    def exit(self):
-        self.shared_context.selected_account.balance += self.shared_context.amount_to_be_withdrawn
-        self.shared_context.set_state(AtmExit.get_name())
-
-    def back(self):
+    def back(self, context):
         """ back to `AtmPreProcessingWithdrawal`
 
         * May be Customer wants to change amount to withdrawn
         """
-        self.shared_context.amount_to_be_withdrawn = 0
-        self.shared_context.set_state(AtmPreProcessingWithdrawal.get_name())
+        context.amount_to_be_withdrawn = 0
+
 
 class AtmDisplayingBalance(AtmState):
     """The state displaying balance
@@ -683,17 +994,10 @@ class AtmDisplayingBalance(AtmState):
     - Cannot go back to former state
     """
 
-    def on_load(self):
-        account = self.shared_context.selected_account
-        print('[on load\naccount_number: %s,\naccount_holder: %s,\naccount_balance:%s]' % (
-            account.account_number, account.name, account.balance))
-
-    def back(self):
-        """Go back to accounts"""
-        self.shared_context.set_state(AtmAuthorized.get_name())
-
-    def exit(self):
-        self.shared_context.set_state(AtmExit.get_name())
+    def on_load(self, context):
+        account = context.selected_account
+        context.emit(INFO, 'balance', '[on load\naccount_number: %s,\naccount_holder: %s,\naccount_balance:%s]',
+                     account.account_number, account.name, account.balance)
 
 
 class AtmExit(AtmState):
@@ -704,9 +1008,116 @@ class AtmExit(AtmState):
     - When customer take card, then it changes to `AtmWait`
     """
 
-    def back(self):
-        """print message"""
-        print('take card, then atm changes to initial state')
-
-    def remove_card(self):
-        self.shared_context.clean_context()
+    def back(self, context):
+        """Emit message"""
+        context.emit(INFO, 'take_card', 'take card, then atm changes to initial state')
+
+    def remove_card(self, context):
+        context.clean_context()
+
+
+STATES = {
+    state.get_name(): state() for state in (
+        AtmWait,
+        AtmReady,
+        AtmAuthorized,
+        AtmAccountSelected,
+        AtmProcessingDeposit,
+        AtmPreProcessingWithdrawal,
+        AtmProcessingWithdrawal,
+        AtmDisplayingBalance,
+        AtmExit,
+    )
+}
+
+# States whose handlers `AtmContext.run_session` calls
+_SESSION_STATES = tuple([STATES[state.get_name()] for state in (
+    AtmWait, AtmReady, AtmAuthorized, AtmAccountSelected, AtmProcessingDeposit, AtmPreProcessingWithdrawal,
+    AtmProcessingWithdrawal, AtmDisplayingBalance,
+)])
+
+# Names of `Timings` histograms
+_STATE_TIMING_NAMES = {state: 'state.' + name for name, state in STATES.items()}
+_HANDLER_TIMING_NAMES = tuple(['handler.' + action for action in ACTIONS])
+
+
+def _handler_timing_name(action, handler):
+    return 'handler.not_available' if handler.__name__ == 'not_available' else _HANDLER_TIMING_NAMES[action]
+
+
+# Errors taking the failure transition, other errors are raised to the caller
+HANDLED_ERRORS = (ValueError, RuntimeError, IndexError)
+
+TRANSITIONS = (
+    # state, action, next state on success, next state on failure (None stays)
+    (AtmWait, INSERT_CARD, AtmReady, None),
+    (AtmReady, ENTER_PIN, AtmAuthorized, AtmExit),
+    (AtmReady, EXIT, AtmExit, None),
+    (AtmAuthorized, ON_LOAD, None, AtmExit),
+    (AtmAuthorized, GET_ACCOUNTS, None, AtmExit),
+    (AtmAuthorized, SELECT_ACCOUNT, AtmAccountSelected, None),
+    (AtmAuthorized, EXIT, AtmExit, None),
+    (AtmAccountSelected, SELECT_DEPOSIT, AtmProcessingDeposit, None),
+    (AtmAccountSelected, SELECT_WITHDRAW, AtmPreProcessingWithdrawal, None),
+    (AtmAccountSelected, SELECT_BALANCE, AtmDisplayingBalance, None),
+    (AtmAccountSelected, BACK, AtmAuthorized, None),
+    (AtmAccountSelected, EXIT, AtmExit, None),
+    (AtmProcessingDeposit, PUT_CASH, AtmDisplayingBalance, AtmExit),
+    (AtmProcessingDeposit, BACK, AtmAccountSelected, None),
+    (AtmProcessingDeposit, EXIT, AtmExit, None),
+    (AtmPreProcessingWithdrawal, ENTER_WITHDRAWAL_AMOUNT, AtmProcessingWithdrawal, AtmExit),
+    (AtmPreProcessingWithdrawal, BACK, AtmAccountSelected, None),
+    (AtmPreProcessingWithdrawal, EXIT, AtmExit, None),
+    (AtmProcessingWithdrawal, TAKE_CASH, AtmDisplayingBalance, AtmDisplayingBalance),
+    (AtmProcessingWithdrawal, BACK, AtmPreProcessingWithdrawal, None),
+    (AtmProcessingWithdrawal, EXIT, AtmExit, None),
+    (AtmDisplayingBalance, ON_LOAD, None, None),
+    (AtmDisplayingBalance, BACK, AtmAuthorized, None),
+    (AtmDisplayingBalance, EXIT, AtmExit, None),
+    (AtmExit, BACK, None, None),
+    (AtmExit, REMOVE_CARD, AtmWait, None),
+)
+
+
+def _pass(context, *args):
+    pass
+
+
+def compile_transitions(transitions):
+    """Compile transition table into `transitions` and `transitions_async` rows of each state class
+
+    - A row is a tuple indexed by action, each item is (handler, next state on success, next state on failure)
+
+    - Handler is the bound method of the shared state named after the action, or does nothing
+      if the state does not define it
+
+    - Item of `transitions_async` has one more flag telling the handler is a coroutine. It uses
+      the `<action>_async` method when the state defines one
+
+    - Missing actions call `AtmState.not_available`, missing `ON_LOAD` is None
+
+    Args:
+        transitions (tuple): Declarative table like `TRANSITIONS`
+    """
+    rows = {}
+    for state in STATES.values():
+        row = [(state.not_available, None, None)] * len(ACTIONS)
+        row[ON_LOAD] = None
+        row_async = [(state.not_available, None, None, False)] * len(ACTIONS)
+        row_async[ON_LOAD] = None
+        rows[state] = (row, row_async)
+    for state_class, action, on_success, on_failure in transitions:
+        state = STATES[state_class.get_name()]
+        row, row_async = rows[state]
+        handler = getattr(state, ACTIONS[action], _pass)
+        handler_async = getattr(state, ACTIONS[action] + '_async', handler)
+        on_success = STATES[on_success.get_name()] if on_success else None
+        on_failure = STATES[on_failure.get_name()] if on_failure else None
+        row[action] = (handler, on_success, on_failure)
+        row_async[action] = (handler_async, on_success, on_failure, inspect.iscoroutinefunction(handler_async))
+    for state, (row, row_async) in rows.items():
+        type(state).transitions = tuple(row)
+        type(state).transitions_async = tuple(row_async)
+
+
+compile_transitions(TRANSITIONS)
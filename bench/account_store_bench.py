@@ -0,0 +1,65 @@
+"""Bytes per account of `Account` objects vs `AccountStore`
+
+Run from the repository root::
+
+    python -m bench.account_store_bench [accounts]
+
+Allocations are measured with tracemalloc while the accounts are built, the accounts
+are kept in a list like the stand-in bank does. Measured on CPython 3.11, x86_64 with 1M accounts::
+
+    dataclass with __dict__   ~264 bytes/account
+    slotted dataclass         ~224 bytes/account
+    AccountStore              ~40 bytes/account (12-byte number, 10-byte name)
+    AccountStore, indexed     ~164 bytes/account
+"""
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+from model.account_store import AccountStore
+from model.domain import Account
+
+
+@dataclass
+class DictAccount:
+    """`Account` before it was slotted"""
+    name: str
+    account_number: str
+    balance: int
+    version: int = 0
+
+
+def objects(cls, n):
+    return [cls('user%06d' % (i % 100000), '%012d' % i, i * 100) for i in range(n)]
+
+
+def store(indexed, n):
+    accounts = AccountStore(number_width=12, name_width=10, indexed=indexed)
+    for i in range(n):
+        accounts.add('user%06d' % (i % 100000), '%012d' % i, i * 100)
+    return accounts
+
+
+def measure(build, n):
+    """Return bytes per account kept by the result of build"""
+    tracemalloc.start()
+    result = build(n)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return allocated / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for name, build in (
+        ('dataclass with __dict__', lambda n: objects(DictAccount, n)),
+        ('slotted dataclass', lambda n: objects(Account, n)),
+        ('AccountStore', lambda n: store(False, n)),
+        ('AccountStore, indexed', lambda n: store(True, n)),
+    ):
+        print('%-24s %6.0f bytes/account' % (name, measure(build, n)))
+
+
+if __name__ == '__main__':
+    main()
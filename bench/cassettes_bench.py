@@ -0,0 +1,74 @@
+"""Cost of planning notes with `Cassettes`
+
+Run from the repository root::
+
+    python -m bench.cassettes_bench
+
+Measured on CPython 3.11, x86_64, cassettes of 100, 50, 20 and 10, at most 40 notes::
+
+    plan, full cassettes                  about 5 us
+    plan + dispense, full cassettes       about 7 us (no table rebuilt)
+    plan + dispense + restore, low 10     about 1.5 ms (every table rebuilt twice)
+    withdrawal session, no cassettes      about 18 us
+    withdrawal session, full cassettes    about 32-38 us (planned at the amount entered and at take out)
+"""
+import timeit
+
+from atm import Atm
+from model.cassettes import Cassettes
+from model.domain import Account, Card, CashBox, User
+
+DENOMINATIONS = (100, 50, 20, 10)
+
+
+def per_call(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def make_card():
+    user = User('user', [], [])
+    user.accounts.append(Account('user', '0001', 10 ** 12))
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    return card
+
+
+def withdrawal_session(cassettes):
+    cash_box = CashBox(cash=10 ** 12, limit=10 ** 15, cassettes=cassettes)
+    atm = Atm(cash_box)
+    card = make_card()
+
+    def session():
+        if cassettes is not None and min(cassettes.counts) < 10 ** 5:
+            for denomination in DENOMINATIONS:
+                cassettes.load(denomination, 10 ** 6)
+        atm.insert_card(card)
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_withdraw()
+        atm.enter_withdrawal_amount(370)
+        atm.take_out_cash(370)
+        atm.exit()
+        atm.take_out_card()
+    return session
+
+
+def main():
+    full = Cassettes({denomination: 10 ** 6 for denomination in DENOMINATIONS})
+    print('plan, full cassettes                %8.1f us' % per_call(lambda: full.plan(370), 10000))
+    print('plan + dispense, full cassettes     %8.1f us' % per_call(lambda: full.dispense(full.plan(370)), 10000))
+    low = Cassettes({100: 10 ** 6, 50: 10 ** 6, 20: 10 ** 6, 10: 20})
+
+    def dispense_low():
+        plan = low.plan(10)
+        low.dispense(plan)  # under max_notes, the tables change
+        low.restore(plan)
+    print('plan + dispense + restore, low 10   %8.1f us' % per_call(dispense_low, 200))
+    print('withdrawal session, no cassettes    %8.1f us' % per_call(withdrawal_session(None), 2000))
+    full = Cassettes({denomination: 10 ** 6 for denomination in DENOMINATIONS})
+    print('withdrawal session, full cassettes  %8.1f us' % per_call(withdrawal_session(full), 2000))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""Transactions on one hot account from many threads, unguarded vs optimistic commits
+
+Run from the repository root::
+
+    python -m bench.contention_bench
+
+Every thread is a terminal with its own cash box, all of them deposit and withdraw on the
+same account. The switch interval is shortened so threads interleave often, as they would
+with more cores than terminals. Lost updates are the difference between the expected and
+the final balance.
+
+Measured on CPython 3.11, x86_64 (transactions/s)::
+
+    unguarded    1 / 4 / 16 threads   ~3.3M / 3.1M / 3.1M, no lost update observed under the GIL
+    optimistic   1 / 4 / 16 threads   ~810k / 660k / 600k, ~60 / ~220 conflicts retried
+
+The unguarded command is only atomic by accident of where CPython switches threads,
+the optimistic one stays correct without the GIL (e.g. free-threaded builds).
+"""
+import sys
+import threading
+import time
+
+from infra.bank_api import IBankSystem
+from model.command import MockUpdateTransactionCommand, OptimisticUpdateTransactionCommand
+from model.domain import Account, CashBox
+
+ROUNDS = 200000
+BALANCE = 10 ** 9
+
+
+class NullBankSystem(IBankSystem):
+    def validate_pin(self, card_number, pin):
+        return True
+
+    def get_accounts(self, card):
+        return []
+
+
+def run(command, threads):
+    """Return transactions per second and lost updates"""
+    bank_system = NullBankSystem()
+    account = Account('hot', '0001', BALANCE)
+    cash_boxes = [CashBox(cash=10 ** 9, limit=10 ** 10) for _ in range(threads)]
+    per_thread = ROUNDS // threads
+
+    def terminal(cash_box):
+        for i in range(per_thread):
+            command.execute(bank_system, cash_box, account, 3 if i % 2 else -1)
+
+    workers = [threading.Thread(target=terminal, args=(cash_box,)) for cash_box in cash_boxes]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    expected = sum(3 if i % 2 else -1 for i in range(per_thread)) * threads
+    return per_thread * threads / elapsed, abs(BALANCE + expected - account.balance)
+
+
+def main():
+    sys.setswitchinterval(1e-6)
+    optimistic = OptimisticUpdateTransactionCommand()
+    for name, command in (('unguarded', MockUpdateTransactionCommand()), ('optimistic', optimistic)):
+        for threads in (1, 4, 16):
+            conflicts = optimistic.conflicts
+            rate, lost = run(command, threads)
+            print('%-10s %2d threads %8.0f tx/s  lost %5d  conflicts %5d' % (
+                name, threads, rate, lost, optimistic.conflicts - conflicts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Cost of `DedupingUpdateTransactionCommand` at high rates of unique keys
+
+Run from the repository root::
+
+    python -m bench.dedupe_bench
+
+Every transaction has a new key, so each one is a miss, an insertion and, once `capacity` is
+reached, an eviction. Measured on CPython 3.11, x86_64::
+
+    command                      tx/s      bytes per key kept
+    plain                        2.2M
+    dedupe, 10k keys             310k      170 (plus the key string)
+    dedupe, 1M keys              345k      176
+    dedupe, replays              600k
+
+The in-flight marker is a plain `None` until a replay has to wait, with an `Event` for
+every key the rate was 100k tx/s.
+"""
+import time
+import tracemalloc
+
+from infra.bank_api import IBankSystem
+from model.command import DedupingUpdateTransactionCommand, MockUpdateTransactionCommand, new_transaction_key
+from model.domain import Account, CashBox
+
+TRANSACTIONS = 300000
+
+
+class NullBankSystem(IBankSystem):
+    def validate_pin(self, card_number, pin):
+        return True
+
+    def get_accounts(self, card):
+        return []
+
+
+def rate(command, keys):
+    """Return transactions per second of deposits and withdrawals with the given keys"""
+    bank_system = NullBankSystem()
+    cash_box, account = CashBox(cash=10 ** 9, limit=10 ** 12), Account('user', '0001', 10 ** 9)
+    execute = command.execute
+    started = time.perf_counter()
+    for i, key in enumerate(keys):
+        execute(bank_system, cash_box, account, 1 if i & 1 else -1, key)
+    return len(keys) / (time.perf_counter() - started)
+
+
+def bytes_per_key(capacity):
+    """Return bytes allocated by the dedupe index per key kept"""
+    keys = [new_transaction_key() for _ in range(capacity)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    command = DedupingUpdateTransactionCommand(MockUpdateTransactionCommand(), capacity=capacity)
+    rate(command, keys)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(command)
+
+
+def main():
+    keys = [new_transaction_key() for _ in range(TRANSACTIONS)]
+    print('%-24s %10.0f tx/s' % ('plain', rate(MockUpdateTransactionCommand(), keys)))
+    for capacity in (10000, 1000000):
+        command = DedupingUpdateTransactionCommand(MockUpdateTransactionCommand(), capacity=capacity)
+        print('%-24s %10.0f tx/s  %6.0f bytes/key' % (
+            'dedupe, %d keys' % capacity, rate(command, keys), bytes_per_key(min(capacity, TRANSACTIONS))))
+    print('%-24s %10.0f tx/s' % ('dedupe, replays', rate(command, keys)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Memory and construction rate of `AtmFleet`
+
+Run from the repository root::
+
+    python -m bench.fleet_bench
+"""
+import gc
+import time
+import tracemalloc
+
+from fleet import AtmFleet
+from model.domain import CashBox
+
+# Targets for a fleet, checked at the end of the run
+MAX_BYTES_PER_TERMINAL = 400
+MIN_TERMINALS_PER_SECOND = 100000
+
+
+def measure(n):
+    """Build a fleet of `n` terminals
+
+    Returns:
+        tuple[float, float]: bytes per terminal, terminals constructed per second
+    """
+    gc.collect()
+    tracemalloc.start()
+    fleet = AtmFleet()
+    before = tracemalloc.get_traced_memory()[0]
+    for terminal_id in range(n):
+        fleet.add(terminal_id, CashBox(cash=1000, limit=5000))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    fleet = AtmFleet()
+    started = time.perf_counter()
+    for terminal_id in range(n):
+        fleet.add(terminal_id, CashBox(cash=1000, limit=5000))
+    elapsed = time.perf_counter() - started
+    return (after - before) / n, n / elapsed
+
+
+def main():
+    ok = True
+    for n in (10000, 100000):
+        bytes_per_terminal, rate = measure(n)
+        passed = bytes_per_terminal <= MAX_BYTES_PER_TERMINAL and rate >= MIN_TERMINALS_PER_SECOND
+        ok = ok and passed
+        print('%7d terminals: %6.1f bytes/terminal, %9.0f terminals/s %s' % (
+            n, bytes_per_terminal, rate, 'ok' if passed else 'FAILED'))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
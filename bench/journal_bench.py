@@ -0,0 +1,56 @@
+"""Journal records per second under each fsync policy
+
+Run from the repository root::
+
+    python -m bench.journal_bench [directory]
+
+The directory should be on the disk to be measured, a temporary directory is used by default.
+
+Measured on CPython 3.11, x86_64, local SSD (records/s)::
+
+    never   1 writer     ~300k
+    always  1 writer      ~18k
+    group   1 writer      ~18k   (alone it syncs at once, same as always)
+    group  16 writers     ~12k
+    group  64 writers     ~50k   (one msync covers up to 64 records)
+"""
+import sys
+import tempfile
+import threading
+import time
+
+from infra.journal import Journal, FSYNC_ALWAYS, FSYNC_GROUP, FSYNC_NEVER
+
+RECORDS = 20000
+
+
+def run(directory, fsync, threads):
+    """Return records per second appended by `threads` writers"""
+    journal = Journal(directory, fsync=fsync, group_size=64, group_interval=0.001)
+    per_thread = RECORDS // threads
+
+    def writer(i):
+        for j in range(per_thread):
+            journal.append_transaction('%08d' % i, -10, j, j)
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    journal.close()
+    return per_thread * threads / elapsed
+
+
+def main():
+    base = sys.argv[1] if len(sys.argv) > 1 else None
+    for fsync, threads in ((FSYNC_NEVER, 1), (FSYNC_ALWAYS, 1), (FSYNC_GROUP, 1), (FSYNC_GROUP, 16),
+                           (FSYNC_GROUP, 64)):
+        with tempfile.TemporaryDirectory(dir=base) as directory:
+            print('%-6s %2d writers %10.0f records/s' % (fsync, threads, run(directory, fsync, threads)))
+
+
+if __name__ == '__main__':
+    main()
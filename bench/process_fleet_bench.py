@@ -0,0 +1,96 @@
+"""Sessions per second of `ProcessFleet` from 1 to N worker processes
+
+Run from the repository root::
+
+    python -m bench.process_fleet_bench            # 1 .. number of CPUs
+    python -m bench.process_fleet_bench 8          # 1 .. 8 workers
+
+Each session is `Atm.run_session` with a deposit, a withdrawal and a balance, spread over 256
+terminals. The first line is the same sessions in this process with `AtmFleet`, the ceiling of one
+interpreter. Reading the fleet-wide cash total from shared memory is timed as well.
+
+Measured on CPython 3.11, x86_64 with a single CPU, where the supervisor and the workers share
+the core, so it shows the cost of queues and pickling rather than scaling. On N CPUs each worker
+has a core of its own, and the rate is expected to grow with workers until the supervisor,
+submitting and draining, becomes the bottleneck::
+
+    in-process        about 38k sessions/s
+    1 worker          about 19k sessions/s (batches of 64)
+    2 workers         about 22k sessions/s
+    total_cash        about 0.3-0.4 us per read
+"""
+import os
+import sys
+import time
+import timeit
+
+from fleet import AtmFleet
+from model.domain import Account, Card, CashBox, User
+from model.session import BALANCE, DEPOSIT, WITHDRAW
+from process_fleet import ProcessFleet
+
+TERMINALS = 256
+SESSIONS = 50000
+PLAN = ((DEPOSIT, 0, 10), (WITHDRAW, 0, 10), (BALANCE, 0))
+
+
+def make_cards():
+    cards = {}
+    for n in range(64):
+        user = User('user%d' % n, [], [])
+        user.accounts.append(Account(user.name, '%04d' % n, 10 ** 12))
+        card = Card(user.name, '%04d' % n, user)
+        user.cards.append(card)
+        cards[card.card_number] = card
+    return cards
+
+
+def make_cash_boxes():
+    return {'atm-%d' % i: CashBox(cash=10 ** 9, limit=10 ** 12) for i in range(TERMINALS)}
+
+
+def sessions():
+    card_numbers = list(make_cards())
+    terminal_ids = list(make_cash_boxes())
+    for i in range(SESSIONS):
+        yield terminal_ids[i % TERMINALS], card_numbers[i % len(card_numbers)]
+
+
+def in_process():
+    """Return sessions per second of one `AtmFleet` in this process"""
+    fleet = AtmFleet()
+    for terminal_id, cash_box in make_cash_boxes().items():
+        fleet.add(terminal_id, cash_box)
+    cards = make_cards()
+    started = time.perf_counter()
+    for terminal_id, card_number in sessions():
+        fleet.get(terminal_id).run_session(cards[card_number], '1', PLAN)
+    return SESSIONS / (time.perf_counter() - started)
+
+
+def with_workers(workers, batch_size=64):
+    """Return sessions per second and seconds per `total_cash` of `workers` processes"""
+    with ProcessFleet(make_cash_boxes(), make_cards, workers, batch_size=batch_size) as fleet:
+        fleet.submit('atm-0', '0000', '1', PLAN)
+        fleet.drain()  # workers are up
+        started = time.perf_counter()
+        for terminal_id, card_number in sessions():
+            fleet.submit(terminal_id, card_number, '1', PLAN)
+        fleet.drain()
+        rate = SESSIONS / (time.perf_counter() - started)
+        read = min(timeit.repeat(fleet.total_cash, number=10000, repeat=3)) / 10000
+    return rate, read
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    most = int(argv[0]) if argv else os.cpu_count() or 1
+    print('in-process   %9.0f sessions/s' % in_process())
+    for workers in sorted({1, 2, most} | {n for n in (4, 8, 16, 32) if n < most}):
+        rate, read = with_workers(workers)
+        print('%2d workers   %9.0f sessions/s  total_cash %.2f us' % (workers, rate, read * 1e6))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+"""Replay of a day's transactions, one `execute` call each vs `model.replay.replay`
+
+Run from the repository root (needs numpy)::
+
+    python -m bench.replay_bench [transactions]
+
+1M transactions over 1000 atms and 100k accounts, the opening balance sets the share of
+rejections. Measured on CPython 3.11, numpy 2.4, x86_64 (transactions/s)::
+
+    rejected   scalar   vectorized
+    0.02%      ~660k    ~2.4M
+    0.6%       ~660k    ~1.4M
+    4%         ~650k    ~700k   (mostly checked one by one)
+"""
+import sys
+import time
+
+import numpy as np
+
+from infra.bank_api import IBankSystem
+from model.command import MockUpdateTransactionCommand
+from model.domain import Account, CashBox
+from model.replay import replay
+
+ATMS = 1000
+ACCOUNTS = 100000
+
+
+class NullBankSystem(IBankSystem):
+    def validate_pin(self, card_number, pin):
+        return True
+
+    def get_accounts(self, card):
+        return []
+
+
+def day(n, opening_balance, seed=1):
+    """Return columns of n transactions and the state at the start of the day"""
+    rng = np.random.default_rng(seed)
+    atm_ids = rng.integers(0, ATMS, n)
+    account_ids = rng.integers(0, ACCOUNTS, n)
+    offsets = rng.integers(1, 500, n) * rng.choice((1, -1), n)
+    cash = rng.integers(10000, 200000, ATMS)
+    limits = np.full(ATMS, 250000)
+    balances = rng.integers(0, opening_balance, ACCOUNTS)
+    return atm_ids, account_ids, offsets, cash, limits, balances
+
+
+def scalar(atm_ids, account_ids, offsets, cash, limits, balances):
+    """Return number of rejected transactions replayed by the command"""
+    bank_system = NullBankSystem()
+    command = MockUpdateTransactionCommand()
+    cash_boxes = [CashBox(int(c), int(limit)) for c, limit in zip(cash, limits)]
+    accounts = [Account('user', str(i), int(balance)) for i, balance in enumerate(balances)]
+    rejected = 0
+    for atm, account, offset in zip(atm_ids.tolist(), account_ids.tolist(), offsets.tolist()):
+        try:
+            command.execute(bank_system, cash_boxes[atm], accounts[account], offset)
+        except ValueError:
+            rejected += 1
+    return rejected
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for opening_balance in (10 ** 6, 20000, 3000):
+        columns = day(n, opening_balance)
+        started = time.perf_counter()
+        rejected = scalar(*columns)
+        scalar_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        result = replay(*columns)
+        vector_seconds = time.perf_counter() - started
+        assert rejected == int((~result.accepted).sum())
+        print('%d transactions, %.2f%% rejected: scalar %.0f tx/s, vectorized %.0f tx/s' % (
+            n, 100.0 * rejected / n, n / scalar_seconds, n / vector_seconds))
+
+
+if __name__ == '__main__':
+    main()
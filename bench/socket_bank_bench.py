@@ -0,0 +1,68 @@
+"""End to end load test of `SocketBankSystem` against `LocalBankServer`
+
+Run from the repository root::
+
+    python -m bench.socket_bank_bench
+
+Client and server share one process (and one core here), CPython 3.11:
+
+    about 16k-20k calls/s with one call per round-trip for 1 to 16 threads
+
+    about 49k calls/s with 4 threads pipelining 100 calls per round-trip
+"""
+import threading
+import time
+
+from infra.bank_server import InMemoryBank, LocalBankServer
+from infra.socket_bank import SocketBankSystem
+from model.domain import Card, User
+
+CARDS = 1000
+CALLS_PER_THREAD = 2000
+
+
+def make_bank():
+    bank = InMemoryBank()
+    for i in range(CARDS):
+        bank.add_account('user%d' % i, 'a%d' % i, 10 ** 6)
+        bank.add_card('c%d' % i, '1111', ['a%d' % i])
+    return bank
+
+
+def run_threads(threads, work):
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * CALLS_PER_THREAD / (time.perf_counter() - started)
+
+
+def main():
+    with LocalBankServer(make_bank()) as server:
+        for threads in (1, 4, 16):
+            bank_system = SocketBankSystem(*server.server_address, pool_size=threads)
+
+            def session(worker):
+                for i in range(CALLS_PER_THREAD // 3):
+                    card_number = 'c%d' % ((worker * 7919 + i) % CARDS)
+                    bank_system.validate_pin(card_number, '1111')
+                    bank_system.get_accounts(Card('', card_number, User('', [], [])))
+                    bank_system.sync_transaction('%d-%d' % (worker, i), 'a%d' % (i % CARDS), 1)
+
+            print('%2d threads, one call per round-trip: %8.0f calls/s' % (threads, run_threads(threads, session)))
+            bank_system.close()
+
+        bank_system = SocketBankSystem(*server.server_address, pool_size=4)
+
+        def pipelined(worker):
+            for i in range(CALLS_PER_THREAD // 100):
+                bank_system.pipeline([('validate_pin', ('c%d' % j, '1111')) for j in range(100)])
+
+        print(' 4 threads, 100 calls per round-trip: %8.0f calls/s' % run_threads(4, pipelined))
+        bank_system.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+"""Benchmark suite of the state machine and the transaction path, with a regression check
+
+Run from the repository root::
+
+    python -m bench.suite                         # print results, compare with bench/baseline.json
+    python -m bench.suite --json results.json     # also write machine-readable results
+    python -m bench.suite --save-baseline         # replace the baseline with this run
+    python -m bench.suite -k session --threshold 0.1
+
+Each case is timed with `timeit` in nanoseconds per operation. A case is a regression when it is slower than its baseline by more than
+`--threshold` (0.25 means 25%), the exit status is then 1, so it can gate a release.
+
+- Timings are compared relative to the `calibration` case, a plain Python loop measured in
+  the same run, so a machine that is busier or slower than the baseline one as a whole does
+  not look like a regression. Single rounds vary by about 25% on a busy machine, as much as the
+  threshold, so rounds of each case alternate with rounds of `calibration` and the median of
+  their ratios is kept, see `measure`
+
+- A case found slower is measured again up to `--retries` times and kept only if it stays slow
+
+The stored baseline was measured on CPython 3.11, x86_64. Save a baseline on the machine
+running the check before relying on it.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+from atm import Atm, AtmContext, STATES
+from infra.bank_api import MockBankSystem1
+from model.command import MockUpdateTransactionCommand
+from model.domain import Account, Card, CashBox, User
+from model.session import BALANCE, DEPOSIT, WITHDRAW
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+MIN_ROUNDS = 15
+
+# name -> factory returning the operation to be timed
+CASES = {}  # type: dict[str, Callable[[], Callable[[], object]]]
+
+
+def case(name):
+    """Register factory of a case under name"""
+    def register(factory):
+        CASES[name] = factory
+        return factory
+    return register
+
+
+def make_card(accounts=3):
+    user = User('user', [], [])
+    user.accounts.extend(Account('user', '%04d' % i, 10 ** 12) for i in range(accounts))
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    return card
+
+
+@case('calibration')
+def calibration():
+    """Plain Python work, the unit of `compare`"""
+    def loop():
+        total = 0
+        for i in range(100):
+            total += i
+        return total
+    return loop
+
+
+@case('atm.construct')
+def atm_construct():
+    cash_box = CashBox(cash=1000, limit=5000)
+    return lambda: Atm(cash_box)
+
+
+def make_set_state(state):
+    context = AtmContext(CashBox(cash=1000, limit=5000), MockBankSystem1(), MockUpdateTransactionCommand())
+    context.card = make_card()
+    context.accounts = context.card.card_holder.accounts
+    context.selected_account = context.accounts[0]
+    set_state, state = context.set_state, STATES[state]
+    return lambda: set_state(state)
+
+
+for _name in STATES:
+    case('set_state.' + _name)(lambda _name=_name: make_set_state(_name))
+
+
+def make_session(*steps):
+    atm = Atm(CashBox(cash=10 ** 12, limit=10 ** 15))
+    card = make_card()
+
+    def session():
+        atm.insert_card(card)
+        atm.enter_pin('1')
+        atm.select_account(0)
+        for step in steps:
+            step(atm)
+        atm.exit()
+        atm.take_out_card()
+    return session
+
+
+@case('session.deposit')
+def deposit_session():
+    return make_session(Atm.select_deposit, lambda atm: atm.put_in_cash(10))
+
+
+@case('session.withdraw')
+def withdraw_session():
+    return make_session(Atm.select_withdraw, lambda atm: atm.enter_withdrawal_amount(10),
+                        lambda atm: atm.take_out_cash(10))
+
+
+@case('session.balance')
+def balance_session():
+    return make_session(Atm.select_balance)
+
+
+@case('session.run_session')
+def run_session():
+    """Same deposit, withdrawal and balance as the three sessions above, in one call"""
+    atm = Atm(CashBox(cash=10 ** 12, limit=10 ** 15))
+    card = make_card()
+    plan = [(DEPOSIT, 0, 10), (WITHDRAW, 0, 10), (BALANCE, 0)]
+    return lambda: atm.run_session(card, '1', plan)
+
+
+@case('command.execute')
+def command_execute():
+    """A deposit and a withdrawal, so balances do not drift"""
+    execute = MockUpdateTransactionCommand().execute
+    bank_system, cash_box, account = MockBankSystem1(), CashBox(cash=1000, limit=5000), Account('a', '0001', 1000)
+
+    def deposit_and_withdraw():
+        execute(bank_system, cash_box, account, 10)
+        execute(bank_system, cash_box, account, -10)
+    return deposit_and_withdraw
+
+
+def make_selected_atm():
+    atm = Atm(CashBox(cash=1000, limit=5000))
+    atm.insert_card(make_card())
+    atm.enter_pin('1')
+    atm.select_account(0)
+    return atm
+
+
+@case('getter.get_user')
+def get_user():
+    return make_selected_atm().get_user
+
+
+@case('getter.get_selected_account')
+def get_selected_account():
+    return make_selected_atm().get_selected_account
+
+
+@case('getter.get_inserted_card')
+def get_inserted_card():
+    return make_selected_atm().get_inserted_card
+
+
+@case('getter.display_account_list')
+def display_account_list():
+    atm = Atm(CashBox(cash=1000, limit=5000))
+    atm.insert_card(make_card())
+    atm.enter_pin('1')
+    return atm.display_account_list
+
+
+def _number(timer, min_time):
+    """Return number of operations of one round of about min_time seconds"""
+    number, elapsed = timer.autorange()
+    return max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+
+def measure(factory, repeat=5, min_time=0.02):
+    """Return time of the case relative to `calibration`, timed in turns with it
+
+    * Rounds of the case and of `calibration` alternate, so both see the same load, and the
+      median of their ratios is kept. There are at least `MIN_ROUNDS` rounds
+
+    Args:
+        factory (Callable): Factory of the case
+        repeat (int): Number of rounds
+        min_time (float): Seconds of one round, decides the number of operations
+
+    Returns:
+        tuple[float, float]: Ratio of the case to `calibration` and median nanoseconds per
+        operation of `calibration`
+    """
+    timers = timeit.Timer(factory()), timeit.Timer(CASES['calibration']())
+    numbers = [_number(timer, min_time) for timer in timers]
+    rounds = [], []
+    for _ in range(max(repeat, MIN_ROUNDS)):
+        for timer, number, times in zip(timers, numbers, rounds):
+            times.append(timer.timeit(number) / number * 1e9)
+    return statistics.median(case / unit for case, unit in zip(*rounds)), statistics.median(rounds[1])
+
+
+def run(pattern=None, repeat=5, min_time=0.02, names=None):
+    """Return nanoseconds per operation of every case whose name contains pattern
+
+    * A case is its ratio to `calibration` times the median of `calibration` in this run,
+      see `measure`
+
+    Args:
+        pattern (str): Part of case names, every case if None
+        repeat (int): Number of rounds, see `measure`
+        min_time (float): Seconds of one round
+        names (list[str]): Cases to run instead of pattern
+
+    Returns:
+        dict[str, float]: Nanoseconds per operation by case name
+    """
+    if names is None:
+        names = [name for name in CASES if name != 'calibration' and (not pattern or pattern in name)]
+    ratios, units = {}, []
+    for name in names:
+        ratios[name], unit = measure(CASES[name], repeat, min_time)
+        units.append(unit)
+    unit = statistics.median(units) if units else measure(CASES['calibration'], repeat, min_time)[1]
+    results = {'calibration': unit}
+    results.update((name, ratio * unit) for name, ratio in ratios.items())
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return cases slower than the baseline by more than threshold, relative to `calibration`
+
+    * Cases missing in either side are not compared. Without `calibration` in both,
+      nanoseconds are compared as they are
+
+    Args:
+        results (dict[str, float]): Nanoseconds per operation by case name
+        baseline (dict[str, float]): Same as results, from the baseline
+        threshold (float): Allowed slowdown, 0.25 is 25%
+
+    Returns:
+        dict[str, tuple[float, float]]: Baseline scaled to this run and current nanoseconds by case name
+    """
+    scale = 1.0
+    if 'calibration' in results and 'calibration' in baseline:
+        scale = results['calibration'] / baseline['calibration']
+    return {name: (baseline[name] * scale, ns) for name, ns in results.items()
+            if name != 'calibration' and name in baseline and ns > baseline[name] * scale * (1 + threshold)}
+
+
+def document(results):
+    """Return results with the environment, as written by `--json` and `--save-baseline`"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'unit': 'ns/op',
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='pattern', help='only cases whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.02, help='seconds of one round')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25)
+    parser.add_argument('--retries', type=int, default=2, help='measure slow cases again this many times')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.repeat, args.min_time)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    for name, ns in results.items():
+        before = baseline.get(name)
+        change = '%+6.1f%%' % ((ns / before - 1) * 100) if before else '      '
+        print('%-40s %12.0f ns/op  %s' % (name, ns, change))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(document(results), f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document(dict(baseline, **results)), f, indent=2, sort_keys=True)
+            f.write('\n')
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        again = run(repeat=args.repeat, min_time=args.min_time, names=list(regressions))
+        regressions = compare(again, baseline, args.threshold)
+    for name, (before, ns) in regressions.items():
+        print('REGRESSION %s %.0f -> %.0f ns/op' % (name, before, ns), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Overhead of `Timings` on full deposit/withdraw sessions
+
+Run from the repository root::
+
+    python -m bench.timing_bench
+
+Best of five runs, CPython 3.11, x86_64, null event sink, bank calls wrapped by `TimedBankSystem`
+when timed. The budget is 20% while disabled and 1.5 us per recorded latency while enabled:
+
+    ==========================  ==============  ========
+    case                        us/session      overhead
+    ==========================  ==============  ========
+    no timings                  18.4            -
+    timings disabled            21.2            +15%
+    timings enabled             59.6            +223%
+    ==========================  ==============  ========
+
+A session records 31 latencies (states, handlers and bank calls), about 1.3 us each:
+two `perf_counter_ns` calls, a thread-local lookup and a histogram increment. Most of
+the disabled overhead is the `TimedBankSystem` indirection.
+"""
+import time
+
+from atm import Atm
+from infra.bank_api import MockBankSystem1
+from infra.timing import Timings, TimedBankSystem
+from model.domain import Account, Card, CashBox, User
+
+SESSIONS = 20000
+
+
+def make_card():
+    user = User('user', [], [])
+    user.accounts.append(Account('user', '0001', 10 ** 9))
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    return card
+
+
+def session_time(timings):
+    """Return best microseconds per full session"""
+    bank_system = (lambda: TimedBankSystem(MockBankSystem1(), timings)) if timings else None
+    atm = Atm(CashBox(cash=10 ** 9, limit=10 ** 12), bank_system, timings=timings)
+    card = make_card()
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(SESSIONS):
+            atm.insert_card(card)
+            atm.enter_pin('1')
+            atm.select_account(0)
+            atm.select_deposit()
+            atm.put_in_cash(10)
+            atm.back()
+            atm.select_account(0)
+            atm.select_withdraw()
+            atm.enter_withdrawal_amount(10)
+            atm.take_out_cash(10)
+            atm.exit()
+            atm.take_out_card()
+        best = min(best, (time.perf_counter() - started) / SESSIONS * 1e6)
+    return best
+
+
+def main():
+    base = session_time(None)
+    print('%-20s %8.2f us/session' % ('no timings', base))
+    for name, timings in (('timings disabled', Timings(enabled=False)), ('timings enabled', Timings())):
+        us = session_time(timings)
+        print('%-20s %8.2f us/session  %+5.1f%%' % (name, us, (us / base - 1) * 100))
+    print('state.AtmProcessingDeposit', timings.report()['state.AtmProcessingDeposit'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Memory and throughput of `VelocityLimits` with millions of cards
+
+Run from the repository root::
+
+    python -m bench.velocity_bench             # 1M cards
+    python -m bench.velocity_bench 3000000
+
+Every card withdraws once, then a second pass withdraws again, with an hourly and a daily limit
+per card and a daily limit per account. Memory is measured with `tracemalloc`, card numbers are
+not counted as they belong to the cards.
+
+Measured on CPython 3.11, x86_64, 1M cards::
+
+    first withdrawal of a card    about 100k withdrawals/s
+    later withdrawal of a card    about 130k withdrawals/s (3 windows checked and updated)
+    check                         about 260k checks/s
+    memory                        about 160 bytes per key and window, about 480 bytes per card
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from model.velocity import VelocityLimits
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 1000000
+    cards = ['%016d' % i for i in range(n)]
+    accounts = ['%012d' % i for i in range(n)]
+    now = [0.0]
+
+    def make_limits():
+        return VelocityLimits(card_limits=((3600, 10 ** 6), (86400, 10 ** 7)), account_limits=((86400, 10 ** 7),),
+                              clock=lambda: now[0])
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    limits = make_limits()
+    for card, account in zip(cards, accounts):
+        limits.withdraw(card, account, 100)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del limits
+    gc.collect()
+
+    limits = make_limits()
+    withdraw, check = limits.withdraw, limits.check
+    started = time.perf_counter()
+    for card, account in zip(cards, accounts):
+        withdraw(card, account, 100)
+    first = n / (time.perf_counter() - started)
+    now[0] = 60.0
+    started = time.perf_counter()
+    for card, account in zip(cards, accounts):
+        withdraw(card, account, 100)
+    later = n / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for card, account in zip(cards, accounts):
+        check(card, account, 100)
+    checks = n / (time.perf_counter() - started)
+
+    print('first withdrawal of a card  %9.0f withdrawals/s' % first)
+    print('later withdrawal of a card  %9.0f withdrawals/s' % later)
+    print('check                       %9.0f checks/s' % checks)
+    print('memory                      %9.0f bytes per key and window, %.0f bytes per card' % (size / n / 3, size / n))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
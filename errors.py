@@ -4,16 +4,28 @@ from enum import Enum
 class ErrorCode(Enum):
     # program related error 1xxx
     AMOUNT_MUST_BE_POSITIVE = 1001
+    TRANSACTION_IS_CONFLICTED = 1002
+    TRANSACTION_KEY_IS_REUSED = 1003
 
     # card related error 2xxx
     PIN_IS_NOT_MATCHED = 2001
+    CARD_WITHDRAWAL_LIMIT_EXCEEDED = 2002
+    PIN_ATTEMPTS_EXCEEDED = 2003
 
     # account related error 3xxx
     CANNOT_FIND_ACCOUNT = 3001
-    WRONG_ACCOUNT_SELECTED = 3001
     ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH = 3002
     AMOUNT_MUST_BE_LOWER_THAN_AMOUNT_TO_BE_WITHDRAWN = 3003
+    WRONG_ACCOUNT_SELECTED = 3004
+    ACCOUNT_WITHDRAWAL_LIMIT_EXCEEDED = 3005
 
     # cash box related error 4xxx
     CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH = 4001
     CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE = 4002
+    CASH_BOX_CANNOT_DISPENSE_AMOUNT = 4003
+
+    # bank system related error 5xxx
+    BANK_SYSTEM_IS_NOT_AVAILABLE = 5001
+    BANK_SYSTEM_TIMED_OUT = 5002
+    BANK_SYSTEM_SENT_INVALID_RESPONSE = 5003
+    BANK_SYSTEM_IS_CLOSED = 5004
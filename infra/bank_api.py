@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABCMeta, abstractmethod
 from typing import TYPE_CHECKING
 from unittest.mock import MagicMock
@@ -22,6 +23,95 @@ class IBankSystem(metaclass=ABCMeta):
         """Retrieve all accounts connected to card"""
         pass
 
+    def validate_pins(self, requests):
+        """Verify many pin numbers, implementations should answer them with one round-trip
+
+        * By default, it calls `validate_pin` for each
+
+        Args:
+            requests (list[tuple[str, str]]): Card number and pin of each request
+
+        Returns:
+            list[bool]: Result of each request
+        """
+        return [self.validate_pin(card_number, pin) for card_number, pin in requests]
+
+    def sync_transactions(self, transactions):
+        """Apply transactions made at the terminal to the bank
+
+        * The bank must ignore a transaction id it has already applied, so callers may retry
+
+        * By default, it does nothing since mock accounts are kept at the terminal
+
+        Args:
+            transactions (list[tuple[str, str, int]]): Transaction id, account number and offset of each
+
+        Returns:
+            list: Result of each transaction, True if applied, False if applied before,
+                or an error message if the bank rejected it. None if results are not known
+
+        Raises:
+            RuntimeError: Raised if the bank cannot be reached, none or some of transactions may be applied
+        """
+        pass
+
+    def invalidate_account(self, account_number):
+        """Called after the balance of an account is changed, for implementations keeping accounts
+
+        Args:
+            account_number (str): Account number
+        """
+        pass
+
+
+class AsyncIBankSystem(metaclass=ABCMeta):
+    """Asyncio counterpart of `IBankSystem` used by `AsyncAtm`"""
+
+    @abstractmethod
+    async def validate_pin(self, card_number, pin):
+        """Verify pin number using server
+        Args:
+            card_number (str): Card number
+            pin (str): Personal identification number likes '1111' or '1111-k' or else.
+        """
+        pass
+
+    @abstractmethod
+    async def get_accounts(self, card):
+        """Retrieve all accounts connected to card"""
+        pass
+
+    def invalidate_account(self, account_number):
+        """Same as `IBankSystem.invalidate_account`, it is not a coroutine"""
+        pass
+
+
+class AsyncBankSystemAdapter(AsyncIBankSystem):
+    """Run calls of a blocking `IBankSystem` in an executor
+
+    * It keeps the event loop free, but each call still takes a thread of the executor
+    """
+
+    def __init__(self, bank_system, executor=None):
+        """
+        Args:
+            bank_system (IBankSystem): Blocking bank system
+            executor (concurrent.futures.Executor): Executor running calls, default executor of the loop if None
+        """
+        self.bank_system = bank_system
+        self.executor = executor
+
+    async def validate_pin(self, card_number, pin):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.bank_system.validate_pin, card_number, pin)
+
+    async def get_accounts(self, card):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.bank_system.get_accounts, card)
+
+    def invalidate_account(self, account_number):
+        self.bank_system.invalidate_account(account_number)
+
 
 def mock_server_api(x, y):
     return y == '1'
@@ -56,3 +146,19 @@ class MockBankSystem1(IBankSystem):
             card (Card): Card
         """
         return card.card_holder.accounts
+
+
+class AsyncMockBankSystem1(AsyncIBankSystem):
+    """Asyncio version of `MockBankSystem1`"""
+
+    async def validate_pin(self, card_number, pin):
+        """Verify pin number, same answer as `MockBankSystem1`"""
+        return mock_server_api(card_number, pin)
+
+    async def get_accounts(self, card):
+        """Return accounts from card, same as `MockBankSystem1`
+
+        Args:
+            card (Card): Card
+        """
+        return card.card_holder.accounts
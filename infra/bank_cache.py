@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from infra.bank_api import IBankSystem
+
+if TYPE_CHECKING:
+    from model.domain import Card
+
+
+class CachingBankSystem(IBankSystem):
+    """Bank system keeping `get_accounts` results by card number
+
+    - Entries are evicted by LRU when `capacity` is reached and expire after `ttl` seconds
+
+    - `invalidate_account` drops every card connected to the account, transaction commands call it
+      after changing a balance, so accounts returned from cache are never stale.
+      A fetch overlapping the invalidation of one of its accounts is returned but not cached
+
+    - `validate_pin` is not cached
+    """
+
+    def __init__(self, bank_system, capacity=10000, ttl=30.0, clock=time.monotonic):
+        """
+        Args:
+            bank_system (IBankSystem): Bank system to be cached
+            capacity (int): Max number of cards kept
+            ttl (float): Seconds an entry is kept
+            clock (Callable[[], float]): Clock returning seconds
+        """
+        self.bank_system = bank_system
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()  # type: OrderedDict[str, tuple[float, list]]
+        self.__cards_by_account = {}  # type: dict[str, set[str]]
+        # account numbers invalidated while each fetch is in flight
+        self.__in_flight = {}  # type: dict[object, set[str]]
+        self.__lock = threading.Lock()
+
+    def validate_pin(self, card_number, pin):
+        return self.bank_system.validate_pin(card_number, pin)
+
+    def validate_pins(self, requests):
+        return self.bank_system.validate_pins(requests)
+
+    def get_accounts(self, card):
+        """Retrieve accounts connected to card from cache, or from bank system on miss
+
+        Args:
+            card (Card): Card
+        """
+        card_number = card.card_number
+        with self.__lock:
+            entry = self.__entries.get(card_number)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self.__entries.move_to_end(card_number)
+                    self.hits += 1
+                    return entry[1]
+                self.__remove(card_number)
+            self.misses += 1
+            fetch = object()
+            invalidated = self.__in_flight[fetch] = set()
+        try:
+            accounts = self.bank_system.get_accounts(card)
+        finally:
+            with self.__lock:
+                del self.__in_flight[fetch]
+        with self.__lock:
+            if any(account.account_number in invalidated for account in accounts):
+                return accounts
+            self.__remove(card_number)
+            self.__entries[card_number] = (self.clock() + self.ttl, accounts)
+            for account in accounts:
+                self.__cards_by_account.setdefault(account.account_number, set()).add(card_number)
+            while len(self.__entries) > self.capacity:
+                self.__remove(next(iter(self.__entries)))
+        return accounts
+
+    def sync_transactions(self, transactions):
+        return self.bank_system.sync_transactions(transactions)
+
+    def invalidate_account(self, account_number):
+        """Drop cached cards connected to the account
+
+        Args:
+            account_number (str): Account number
+        """
+        with self.__lock:
+            for card_number in self.__cards_by_account.pop(account_number, ()):
+                self.__remove(card_number)
+            for invalidated in self.__in_flight.values():
+                invalidated.add(account_number)
+        self.bank_system.invalidate_account(account_number)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __remove(self, card_number):
+        entry = self.__entries.pop(card_number, None)
+        if entry is None:
+            return
+        for account in entry[1]:
+            cards = self.__cards_by_account.get(account.account_number)
+            if cards is not None:
+                cards.discard(card_number)
+                if not cards:
+                    del self.__cards_by_account[account.account_number]
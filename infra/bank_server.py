@@ -0,0 +1,172 @@
+import dataclasses
+import json
+import socketserver
+import threading
+from typing import TYPE_CHECKING
+
+from model.domain import Account
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+
+class InMemoryBank:
+    """Account store of the stand-in bank
+
+    * Every method is thread safe, they are called by connection threads of `LocalBankServer`
+    """
+
+    def __init__(self):
+        self.cards = {}  # type: dict[str, tuple[str, list[str]]]
+        self.accounts = {}  # type: dict[str, Account]
+        self.applied_transactions = set()  # type: set[str]
+        self.__lock = threading.Lock()
+
+    def add_account(self, name, account_number, balance):
+        """Add account
+
+        Args:
+            name (str): Account holder name
+            account_number (str): Account number
+            balance (int): Initial balance
+        """
+        with self.__lock:
+            self.accounts[account_number] = Account(name, account_number, balance)
+
+    def add_card(self, card_number, pin, account_numbers):
+        """Add card connected to accounts
+
+        Args:
+            card_number (str): Card number
+            pin (str): Personal identification number
+            account_numbers (list[str]): Numbers of connected accounts
+        """
+        with self.__lock:
+            self.cards[card_number] = (pin, list(account_numbers))
+
+    def validate_pin(self, card_number, pin):
+        card = self.cards.get(card_number)
+        return card is not None and card[0] == pin
+
+    def validate_pins(self, requests):
+        return [self.validate_pin(card_number, pin) for card_number, pin in requests]
+
+    def get_accounts(self, card_number):
+        """Return accounts connected to card as dictionaries"""
+        with self.__lock:
+            card = self.cards.get(card_number)
+            if card is None:
+                return []
+            return [dataclasses.asdict(self.accounts[number]) for number in card[1]]
+
+    def sync_transaction(self, transaction_id, account_number, offset):
+        """Apply offset to account once per transaction id
+
+        Returns:
+            bool: False if the transaction was already applied
+        """
+        with self.__lock:
+            if transaction_id in self.applied_transactions:
+                return False
+            self.accounts[account_number].balance += offset
+            self.applied_transactions.add(transaction_id)
+            return True
+
+    def sync_transactions(self, transactions):
+        """Apply transactions one by one, a rejected transaction does not stop the others
+
+        Returns:
+            list: True if applied, False if applied before, error message if rejected e.g. unknown account
+        """
+        results = []
+        for transaction in transactions:
+            try:
+                results.append(self.sync_transaction(*transaction))
+            except (KeyError, TypeError, ValueError) as e:
+                results.append(repr(e))
+        return results
+
+
+class BankRequestHandler(socketserver.BaseRequestHandler):
+    """Serve one connection
+
+    - Request and response are one json object per line,
+      request {"id": 1, "op": "validate_pin", "args": [...]}, response {"id": 1, "ok": true, "result": ...}
+
+    - Requests are answered in order, every request in one received chunk is answered by one send,
+      so a client may pipeline many requests before reading
+    """
+
+    def handle(self):
+        pending = b''
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            *lines, pending = (pending + data).split(b'\n')
+            self.request.sendall(b''.join(self.respond(line) for line in lines))
+
+    def respond(self, line):
+        """Return response line of request line
+
+        * A malformed request is answered with `"ok": false` and `"id": null` if its id cannot be read
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request['id']
+            response = {'id': request_id, 'ok': True,
+                        'result': self.server.operations[request['op']](*request['args'])}
+        except Exception as e:
+            response = {'id': request_id, 'ok': False, 'error': repr(e)}
+        return json.dumps(response).encode() + b'\n'
+
+
+class LocalBankServer(socketserver.ThreadingTCPServer):
+    """Stand-in bank server on localhost for load tests
+
+    * Usage::
+
+        with LocalBankServer(bank) as server:
+            bank_system = SocketBankSystem(*server.server_address)
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, bank, host='127.0.0.1', port=0):
+        """
+        Args:
+            bank (InMemoryBank): Account store to serve
+            host (str): Address to bind, localhost by default
+            port (int): Port to bind, any free port if 0
+        """
+        super().__init__((host, port), BankRequestHandler)
+        self.bank = bank
+        self.operations = {
+            'validate_pin': bank.validate_pin,
+            'validate_pins': bank.validate_pins,
+            'get_accounts': bank.get_accounts,
+            'sync_transaction': bank.sync_transaction,
+            'sync_transactions': bank.sync_transactions,
+        }
+        self.__thread = None  # type: Optional[threading.Thread]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Serve in a background thread"""
+        self.__thread = threading.Thread(
+            target=self.serve_forever, args=(0.05,), name='local-bank-server', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+        self.__thread.join()
@@ -0,0 +1,151 @@
+import sys
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from logging import DEBUG, INFO, WARNING
+
+# Same numbers as `logging`, `OFF` is above every level
+OFF = 100
+
+
+class Event:
+    """Structured event
+
+    - Message is formatted only when the event is written, so a disabled or buffered
+      sink never pays for `%` formatting on the hot path
+    """
+
+    __slots__ = ('level', 'kind', 'message', 'args')
+
+    def __init__(self, level, kind, message, args=()):
+        """
+        Args:
+            level (int): Level of event, `DEBUG`, `INFO` or `WARNING`
+            kind (str): Kind of event e.g. 'transition', 'not_available', 'error'
+            message (str): %-style format string
+            args (tuple): Arguments of format string
+        """
+        self.level = level
+        self.kind = kind
+        self.message = message
+        self.args = args
+
+    def format(self):
+        """Return formatted message"""
+        return self.message % self.args if self.args else self.message
+
+    def __repr__(self):
+        return 'Event(%s, %r)' % (self.kind, self.format())
+
+
+class IEventSink(metaclass=ABCMeta):
+    """Event sink interface
+
+    * Emitters must check `level` before building an event::
+
+        if level >= sink.level:
+            sink.emit(Event(level, kind, message, args))
+    """
+    level = INFO
+
+    @abstractmethod
+    def emit(self, event):
+        """Accept an event
+
+        Args:
+            event (Event): Event passed the level check
+        """
+        pass
+
+    def flush(self):
+        """Write buffered events"""
+        pass
+
+    def close(self):
+        """Flush and release resources"""
+        self.flush()
+
+
+class NullEventSink(IEventSink):
+    """Sink dropping everything
+
+    * `level` is `OFF`, so emitters skip building events and the cost is one comparison
+    """
+    level = OFF
+
+    def emit(self, event):
+        pass
+
+
+class StreamEventSink(IEventSink):
+    """Sink writing each event synchronously, like the former `print` calls"""
+
+    def __init__(self, level=INFO, stream=None):
+        """
+        Args:
+            level (int): Lowest level to be written
+            stream (TextIO): Stream to write, stdout by default
+        """
+        self.level = level
+        self.stream = stream or sys.stdout
+
+    def emit(self, event):
+        self.stream.write(event.format() + '\n')
+
+
+class BufferedEventSink(IEventSink):
+    """Sink keeping events in a ring buffer which is written by a background thread
+
+    - `emit` is a single `deque.append`, which is atomic, so emitters never take a lock
+
+    - When the buffer is full, the oldest events are dropped
+    """
+
+    def __init__(self, level=INFO, stream=None, capacity=65536, interval=0.1):
+        """
+        Args:
+            level (int): Lowest level to be written
+            stream (TextIO): Stream to write, stdout by default
+            capacity (int): Number of events kept in the ring buffer
+            interval (float): Seconds between background flushes
+        """
+        self.level = level
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self.buffer = deque(maxlen=capacity)
+        self.__stopped = threading.Event()
+        self.__writer = threading.Thread(target=self.__run, name='event-sink-writer', daemon=True)
+        self.__writer.start()
+
+    def emit(self, event):
+        self.buffer.append(event)
+
+    def flush(self):
+        """Write every buffered event
+
+        * Called by the background thread, it can be called by the owner at any time
+        """
+        popleft = self.buffer.popleft
+        lines = []
+        while True:
+            try:
+                lines.append(popleft().format())
+            except IndexError:
+                break
+        if lines:
+            lines.append('')
+            self.stream.write('\n'.join(lines))
+            self.stream.flush()
+
+    def close(self):
+        """Stop background writer after writing every buffered event"""
+        self.__stopped.set()
+        self.__writer.join()
+        self.flush()
+
+    def __run(self):
+        while not self.__stopped.wait(self.interval):
+            self.flush()
+
+
+NULL_EVENT_SINK = NullEventSink()
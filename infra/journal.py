@@ -0,0 +1,279 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from model.domain import CashBox, Account
+
+# Kinds of record
+TRANSACTION = 1
+CHECKPOINT_BEGIN = 2
+CHECKPOINT_ACCOUNT = 3
+CHECKPOINT_END = 4
+# balance changed without moving cash, e.g. a withdrawal given back on exit
+ADJUSTMENT = 5
+
+# Fsync policies
+FSYNC_ALWAYS = 'always'
+FSYNC_GROUP = 'group'
+FSYNC_NEVER = 'never'
+
+# seq, kind, crc32 of the rest, account number, offset, cash after, balance after
+RECORD = struct.Struct('<QB3xI32sqqq')
+_BODY = struct.Struct('<QB32sqqq')
+
+
+def _crc(seq, kind, account_number, offset, cash, balance):
+    return zlib.crc32(_BODY.pack(seq, kind, account_number, offset, cash, balance))
+
+
+def _path(directory, segment):
+    return os.path.join(directory, 'journal-%06d.seg' % segment)
+
+
+def segments(directory):
+    """Return segment numbers of journal directory in order"""
+    return sorted(int(name[8:-4]) for name in os.listdir(directory)
+                  if name.startswith('journal-') and name.endswith('.seg'))
+
+
+def read_records(directory, segment_numbers=None):
+    """Yield records of journal directory in order, one segment is read at a time
+
+    * It does not open the journal, so a journal in use or of another terminal can be read
+
+    Args:
+        directory (str): Directory of segment files
+        segment_numbers (list[int]): Segment numbers to read, every segment if None
+
+    Yields:
+        tuple: seq, kind, account number, offset, cash after, balance after
+    """
+    for segment in segments(directory) if segment_numbers is None else segment_numbers:
+        path = _path(directory, segment)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        for position in range(0, len(data) - RECORD.size + 1, RECORD.size):
+            seq, kind, crc, account_number, offset, cash, balance = RECORD.unpack_from(data, position)
+            if seq == 0 or crc != _crc(seq, kind, account_number, offset, cash, balance):
+                break
+            yield seq, kind, account_number.rstrip(b'\0').decode(), offset, cash, balance
+
+
+class Journal:
+    """Write-ahead journal of one terminal in fixed-size records over memory-mapped segment files
+
+    - A record is `RECORD.size` (72) bytes, sequence numbers start from 1 and an all-zero slot ends the journal
+
+    - A segment is a file of `segment_records` slots, a new one is created when it is full
+
+    - `fsync` decides when appended records reach the disk
+
+        `FSYNC_ALWAYS` msync on every append
+
+        `FSYNC_GROUP` callers wait for a shared msync issued by one of them every `group_size` records
+        or `group_interval` seconds (group commit), a caller appending alone syncs at once
+
+        `FSYNC_NEVER` left to the OS
+
+    - `checkpoint` writes the cash box and accounts, then older segments are deleted,
+      `recover` replays from the last complete checkpoint
+    """
+
+    def __init__(self, directory, segment_records=65536, fsync=FSYNC_GROUP, group_size=64, group_interval=0.001):
+        """
+        Args:
+            directory (str): Directory of segment files, created if missing
+            segment_records (int): Number of records in one segment
+            fsync (str): One of `FSYNC_ALWAYS`, `FSYNC_GROUP` and `FSYNC_NEVER`
+            group_size (int): Number of records which triggers a group msync
+            group_interval (float): Max seconds a record waits for its group msync
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_records = segment_records
+        self.fsync = fsync
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.__lock = threading.Condition()
+        self.__flushing = False
+        self.__appending = 0
+        self.__appending_lock = threading.Lock()
+        self.__file = None
+        self.__map = None
+        self.__segment = 0
+        self.__slot = 0
+        self.__seq = 0
+        self.__synced = 0
+        # continue after the last record, the last segment may be empty right after it was created
+        segments = self.segments() or [1]
+        for record in self.records(segments[-2:-1]):
+            self.__seq = record[0]
+        for record in self.records(segments[-1:]):
+            self.__seq = record[0]
+            self.__slot += 1
+        self.__synced = self.__seq
+        self.__open(segments[-1])
+
+    def segments(self):
+        """Return segment numbers in order"""
+        return segments(self.directory)
+
+    def records(self, segments=None):
+        """Yield records in order, see `read_records`"""
+        return read_records(self.directory, segments)
+
+    def append(self, kind, account_number='', offset=0, cash=0, balance=0):
+        """Append record, it returns after the record is durable under the fsync policy
+
+        Args:
+            kind (int): Kind of record
+            account_number (str): Account number, up to 32 bytes
+            offset (int): Amount to deposit or withdrawal
+            cash (int): Cash of cash box after the change
+            balance (int): Balance of account after the change
+
+        Returns:
+            int: Sequence number of record
+        """
+        with self.__appending_lock:
+            self.__appending += 1
+        try:
+            with self.__lock:
+                seq = self.__write(kind, account_number, offset, cash, balance)
+                if self.fsync == FSYNC_ALWAYS:
+                    self.__map.flush()
+                    self.__synced = seq
+                elif self.fsync == FSYNC_GROUP:
+                    if seq - self.__synced >= self.group_size:
+                        self.__lock.notify_all()
+                    self.__wait_synced(seq)
+                return seq
+        finally:
+            with self.__appending_lock:
+                self.__appending -= 1
+
+    def append_transaction(self, account_number, offset, cash, balance):
+        """Append `TRANSACTION` record, see `append`"""
+        return self.append(TRANSACTION, account_number, offset, cash, balance)
+
+    def checkpoint(self, cash_box, accounts):
+        """Write cash box and accounts, then delete segments before the checkpoint
+
+        * Balances recovered from the journal are written as well, so accounts not passed, e.g.
+          touched before a restart, are not lost with the deleted segments
+
+        Args:
+            cash_box (CashBox): Atm's cashbox
+            accounts (list[Account]): Accounts touched by the terminal
+        """
+        with self.__lock:
+            balances = self.recover()[1]
+            for account in accounts:
+                balances[account.account_number] = account.balance
+            # segment holding BEGIN, or the one before it when BEGIN starts a new segment
+            begin_segment = self.__segment
+            self.__write(CHECKPOINT_BEGIN, '', 0, cash_box.cash, 0)
+            for account_number, balance in balances.items():
+                self.__write(CHECKPOINT_ACCOUNT, account_number, 0, cash_box.cash, balance)
+            self.__write(CHECKPOINT_END, '', 0, cash_box.cash, 0)
+            self.__map.flush()
+            self.__synced = self.__seq
+        for segment in self.segments():
+            if segment < begin_segment:
+                os.remove(self.__path(segment))
+
+    def recover(self):
+        """Replay from the last complete checkpoint
+
+        Returns:
+            tuple[int, dict[str, int]]: Cash of cash box (None if nothing recorded) and balance by account number
+        """
+        cash = None
+        balances = {}
+        snapshot = None
+        for seq, kind, account_number, offset, record_cash, balance in self.records():
+            if kind == CHECKPOINT_BEGIN:
+                snapshot = (record_cash, {})
+            elif kind == CHECKPOINT_ACCOUNT and snapshot is not None:
+                snapshot[1][account_number] = balance
+            elif kind == CHECKPOINT_END and snapshot is not None:
+                cash, balances = snapshot[0], snapshot[1]
+                snapshot = None
+            elif kind == TRANSACTION or kind == ADJUSTMENT:
+                cash = record_cash
+                balances[account_number] = balance
+        return cash, balances
+
+    def restore(self, cash_box, accounts):
+        """Set cash of cash box and balance of accounts from `recover`
+
+        Args:
+            cash_box (CashBox): Atm's cashbox
+            accounts (list[Account]): Accounts to be restored, accounts not in the journal are left as they are
+        """
+        cash, balances = self.recover()
+        if cash is not None:
+            cash_box.cash = cash
+        for account in accounts:
+            if account.account_number in balances:
+                account.balance = balances[account.account_number]
+
+    def sync(self):
+        """msync current segment"""
+        with self.__lock:
+            self.__map.flush()
+            self.__synced = self.__seq
+
+    def close(self):
+        with self.__lock:
+            self.__map.flush()
+            self.__map.close()
+            self.__file.close()
+
+    def __path(self, segment):
+        return _path(self.directory, segment)
+
+    def __open(self, segment):
+        path = self.__path(segment)
+        self.__file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self.__file.truncate(self.segment_records * RECORD.size)
+        self.__map = mmap.mmap(self.__file.fileno(), self.segment_records * RECORD.size)
+        self.__segment = segment
+
+    def __write(self, kind, account_number, offset, cash, balance):
+        if self.__slot == self.segment_records:
+            self.__map.flush()
+            self.__map.close()
+            self.__file.close()
+            self.__open(self.__segment + 1)
+            self.__slot = 0
+        self.__seq += 1
+        account_number = account_number.encode()
+        RECORD.pack_into(
+            self.__map, self.__slot * RECORD.size, self.__seq, kind,
+            _crc(self.__seq, kind, account_number, offset, cash, balance),
+            account_number, offset, cash, balance
+        )
+        self.__slot += 1
+        return self.__seq
+
+    def __wait_synced(self, seq):
+        """Group commit, called with the lock held"""
+        while self.__synced < seq:
+            if self.__flushing:
+                self.__lock.wait()
+                continue
+            self.__flushing = True
+            # wait for the group only while other callers are appending
+            if self.__appending > 1 and self.__seq - self.__synced < self.group_size:
+                self.__lock.wait(self.group_interval)
+            self.__map.flush()
+            self.__synced = self.__seq
+            self.__flushing = False
+            self.__lock.notify_all()
@@ -0,0 +1,241 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+from errors import ErrorCode
+from infra.event_sink import IEventSink, INFO, OFF
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Optional
+    from fleet import AtmFleet
+
+# Prometheus types
+COUNTER = 'counter'
+GAUGE = 'gauge'
+
+DESCRIPTIONS = {
+    'atm_transitions_total': (COUNTER, 'State transitions by the state entered'),
+    'atm_errors_total': (COUNTER, 'Errors raised by handlers by error code'),
+    'atm_not_available_total': (COUNTER, 'Actions not available in the current state'),
+    'atm_transactions_total': (COUNTER, 'Transaction commands by kind and result'),
+    'atm_transaction_amount_total': (COUNTER, 'Cash moved by applied transactions by kind'),
+    'atm_prefetch_total': (COUNTER, 'Account prefetches by outcome'),
+    'atm_prefetch_saved_seconds_total': (COUNTER, 'Latency of account fetches taken off pin entry'),
+    'atm_sessions': (GAUGE, 'Terminals in each state'),
+    'atm_cash': (GAUGE, 'Cash in the cash box of each terminal'),
+    'atm_cash_limit': (GAUGE, 'Limit of the cash box of each terminal'),
+    'atm_cash_fill_ratio': (GAUGE, 'Cash over limit of each terminal'),
+}
+
+
+class Metrics:
+    """Registry of counters fed by the state machine and transaction commands, and of gauges read on scrape
+
+    - `inc` adds to a counter of the calling thread, so it takes no lock.
+      `samples` and `render` merge every thread
+
+    - Gauges come from collectors called on scrape, see `fleet_collector`
+
+    - A counter is a name and a tuple of label pairs e.g.
+      `('atm_errors_total', (('code', 'PIN_IS_NOT_MATCHED'),))`
+    """
+
+    def __init__(self):
+        self.__local = threading.local()
+        self.__tables = []  # type: list[dict[tuple, int]]
+        self.__collectors = []  # type: list[Callable[[], Iterable[tuple]]]
+        self.__lock = threading.Lock()
+
+    def inc(self, name, labels=(), value=1):
+        """Add value to counter
+
+        Args:
+            name (str): Name of counter
+            labels (tuple[tuple[str, str], ...]): Label pairs
+            value (int): Amount to add
+        """
+        try:
+            table = self.__local.table
+        except AttributeError:
+            table = self.__local.table = {}
+            with self.__lock:
+                self.__tables.append(table)
+        key = (name, labels)
+        table[key] = table.get(key, 0) + value
+
+    def register_collector(self, collector):
+        """Register function returning gauge samples on scrape
+
+        Args:
+            collector (Callable[[], Iterable[tuple[str, tuple, float]]]): Returns name, labels and value of each
+        """
+        with self.__lock:
+            self.__collectors.append(collector)
+
+    def samples(self):
+        """Return counters of every thread merged, then gauges of collectors
+
+        Returns:
+            dict[tuple[str, tuple], float]: Value by name and labels
+        """
+        with self.__lock:
+            tables = list(self.__tables)
+            collectors = list(self.__collectors)
+        merged = {}
+        for table in tables:
+            for key, value in list(table.items()):
+                merged[key] = merged.get(key, 0) + value
+        for collector in collectors:
+            for name, labels, value in collector():
+                merged[(name, labels)] = value
+        return merged
+
+    def render(self):
+        """Return samples in Prometheus text format"""
+        by_name = {}
+        for (name, labels), value in self.samples().items():
+            by_name.setdefault(name, []).append((labels, value))
+        lines = []
+        for name in sorted(by_name):
+            kind, description = DESCRIPTIONS.get(name, (GAUGE, name))
+            lines.append('# HELP %s %s' % (name, description))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for labels, value in sorted(by_name[name]):
+                if labels:
+                    lines.append('%s{%s} %s' % (name, ','.join(
+                        '%s="%s"' % (key, _escape(label)) for key, label in labels), _number(value)))
+                else:
+                    lines.append('%s %s' % (name, _number(value)))
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def error_code_label(e):
+    """Return label of error, the `ErrorCode` name when it was raised with one"""
+    code = e.args[0] if getattr(e, 'args', None) else None
+    return code.name if isinstance(code, ErrorCode) else type(e).__name__
+
+
+class MetricsEventSink(IEventSink):
+    """Sink counting transitions, errors by `ErrorCode` and actions not available, then passing events on
+
+    * Events of the level of the next sink or above are emitted to it as well
+    """
+
+    def __init__(self, metrics, sink=None):
+        """
+        Args:
+            metrics (Metrics): Destination of counts
+            sink (IEventSink): Next sink, nothing is passed on if None
+        """
+        self.metrics = metrics
+        self.sink = sink
+        self.level = min(INFO, sink.level) if sink else INFO
+        self.__next_level = sink.level if sink else OFF
+
+    def emit(self, event):
+        kind = event.kind
+        if kind == 'transition':
+            self.metrics.inc('atm_transitions_total', (('state', event.args[0]),))
+        elif kind == 'error':
+            self.metrics.inc('atm_errors_total', (('code', error_code_label(event.args[0])),))
+        elif kind == 'not_available':
+            self.metrics.inc('atm_not_available_total', (('state', event.args[0]),))
+        if event.level >= self.__next_level:
+            self.sink.emit(event)
+
+    def flush(self):
+        if self.sink:
+            self.sink.flush()
+
+    def close(self):
+        if self.sink:
+            self.sink.close()
+
+
+def fleet_collector(fleet):
+    """Return collector of terminals in each state and cash levels of each terminal
+
+    Args:
+        fleet (AtmFleet): Fleet to be scraped
+
+    Returns:
+        Callable[[], list[tuple[str, tuple, float]]]: Collector for `Metrics.register_collector`
+    """
+    def collect():
+        samples = [('atm_sessions', (('state', state),), count) for state, count in fleet.count_by_state().items()]
+        for terminal_id, (cash, limit) in fleet.cash_levels().items():
+            labels = (('atm', str(terminal_id)),)
+            samples.append(('atm_cash', labels, cash))
+            samples.append(('atm_cash_limit', labels, limit))
+            samples.append(('atm_cash_fill_ratio', labels, cash / limit if limit else 0.0))
+        return samples
+    return collect
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Answer `GET /metrics` with `Metrics.render` of the server"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Prometheus text-format endpoint on localhost
+
+    * Usage::
+
+        with MetricsServer(metrics, port=9464) as server:
+            ...  # scrape http://127.0.0.1:9464/metrics
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, metrics, host='127.0.0.1', port=0):
+        """
+        Args:
+            metrics (Metrics): Metrics to serve
+            host (str): Address to bind, localhost by default
+            port (int): Port to bind, any free port if 0
+        """
+        super().__init__((host, port), MetricsRequestHandler)
+        self.metrics = metrics
+        self.__thread = None  # type: Optional[threading.Thread]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Serve in a background thread"""
+        self.__thread = threading.Thread(
+            target=self.serve_forever, args=(0.05,), name='metrics-server', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+        self.__thread.join()
+
+
+def _escape(label):
+    return str(label).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
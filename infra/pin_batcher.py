@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import TYPE_CHECKING
+
+from errors import ErrorCode
+from infra.bank_api import IBankSystem
+
+if TYPE_CHECKING:
+    from model.domain import Card
+
+
+class BatchingBankSystem(IBankSystem):
+    """Bank system coalescing concurrent `validate_pin` calls into `validate_pins` batches
+
+    - Calls from many terminals (threads) wait in one queue, a background thread sends up to
+      `max_batch_size` of them with one `validate_pins` call
+
+    - A batch is sent when it is full or `max_latency` seconds after its first request arrived,
+      requests arriving while a batch is in flight go to the next batch
+
+    - A caller waits at most `timeout` seconds for its answer, a batch answered with fewer
+      results than requests fails the requests left without an answer
+
+    - Other calls are passed to the wrapped bank system as they are
+    """
+
+    def __init__(self, bank_system, max_batch_size=64, max_latency=0.002, timeout=1.0):
+        """
+        Args:
+            bank_system (IBankSystem): Bank system answering `validate_pins`
+            max_batch_size (int): Max number of requests in one batch
+            max_latency (float): Max seconds a request waits for its batch to fill
+            timeout (float): Max seconds a caller waits for its answer
+        """
+        self.bank_system = bank_system
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.timeout = timeout
+        self.batches = 0
+        self.requests = 0
+        self.__pending = []  # type: list[tuple[str, str, Future, float]]
+        self.__condition = threading.Condition()
+        self.__closed = False
+        self.__worker = threading.Thread(target=self.__run, name='pin-batcher', daemon=True)
+        self.__worker.start()
+
+    def validate_pin(self, card_number, pin):
+        """Verify pin number in the next batch, it blocks until the batch is answered
+
+        Args:
+            card_number (str): Card number
+            pin (str): Personal identification number likes '1111' or '1111-k' or else.
+
+        Raises:
+            RuntimeError: Raised with `ErrorCode.BANK_SYSTEM_TIMED_OUT` if no answer came in `timeout` seconds,
+                `ErrorCode.BANK_SYSTEM_IS_NOT_AVAILABLE` if the batch was not answered completely, or
+                `ErrorCode.BANK_SYSTEM_IS_CLOSED` after `close`
+        """
+        future = Future()
+        with self.__condition:
+            if self.__closed:
+                raise RuntimeError(ErrorCode.BANK_SYSTEM_IS_CLOSED)
+            self.__pending.append((card_number, pin, future, time.monotonic()))
+            if len(self.__pending) == 1 or len(self.__pending) >= self.max_batch_size:
+                self.__condition.notify()
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise RuntimeError(ErrorCode.BANK_SYSTEM_TIMED_OUT)
+
+    def validate_pins(self, requests):
+        return self.bank_system.validate_pins(requests)
+
+    def get_accounts(self, card):
+        return self.bank_system.get_accounts(card)
+
+    def sync_transactions(self, transactions):
+        return self.bank_system.sync_transactions(transactions)
+
+    def invalidate_account(self, account_number):
+        self.bank_system.invalidate_account(account_number)
+
+    def close(self):
+        """Answer pending requests and stop the background thread"""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify()
+        self.__worker.join()
+
+    def __next_batch(self):
+        """Wait for a full batch or `max_latency` after its first request was queued, None if closed and
+        nothing is pending"""
+        with self.__condition:
+            while not self.__pending:
+                if self.__closed:
+                    return None
+                self.__condition.wait()
+            deadline = self.__pending[0][3] + self.max_latency
+            while len(self.__pending) < self.max_batch_size and not self.__closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.__condition.wait(remaining)
+            batch = self.__pending[:self.max_batch_size]
+            del self.__pending[:self.max_batch_size]
+            return batch
+
+    def __run(self):
+        while True:
+            batch = self.__next_batch()
+            if batch is None:
+                return
+            self.batches += 1
+            self.requests += len(batch)
+            try:
+                results = self.bank_system.validate_pins([(card_number, pin) for card_number, pin, _, _ in batch])
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future, _), result in zip(batch, results):
+                future.set_result(result)
+            for _, _, future, _ in batch[len(results):]:
+                future.set_exception(RuntimeError(
+                    ErrorCode.BANK_SYSTEM_IS_NOT_AVAILABLE, '%d results for %d requests' % (len(results), len(batch))))
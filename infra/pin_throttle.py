@@ -0,0 +1,175 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+from array import array
+
+from errors import ErrorCode
+from infra.bank_api import IBankSystem
+
+# Counters are scaled back when the weight of a new failure reaches this, far from float overflow
+_RESCALE_AT = 2.0 ** 64
+
+
+class PinThrottle:
+    """Failed PIN attempts by card number in a count-min sketch with exponential time decay
+
+    - `depth` rows of `width` counters, a card number is hashed to one counter of each row and
+      its count is the lowest of them. Counts can only be overestimated, by other cards sharing
+      all its counters. Memory is `depth * width` doubles whatever the number of cards
+
+    - A failure counts 1 now and half as much `half_life` seconds later. Counters hold failures
+      weighted by `2 ** (t / half_life)` of their time, so nothing is decayed in place. When the
+      weight grows too large the counters are scaled back once
+
+    - A failure raises only the counters of the card below its new count (conservative update),
+      which never overestimates more than plain count-min
+
+    - A card is locked while one more failure would bring its count over `max_failures`.
+      After a burst of `max_failures` failures it gets about one attempt every
+      `half_life * log2(max_failures / (max_failures - 1))` seconds
+
+    - False lockout of a card without failures: each row adds the failures of other cards hashed
+      to its counter, `N / width` on average for `N` failures in the sketch (decayed). By Markov's
+      inequality a row reaches `max_failures` with probability at most `N / (width * max_failures)`,
+      and rows are hashed independently, so the lockout probability is at most
+      `(N / (width * max_failures)) ** depth`, see `false_lockout_bound`. With the defaults,
+      2 ** 16 counters in 4 rows and 5 failures, 10k decayed failures give below 1e-6 and 50k
+      below 1e-3
+    """
+
+    def __init__(self, max_failures=5, half_life=3600.0, width=1 << 16, depth=4, clock=time.monotonic):
+        """
+        Args:
+            max_failures (int): Failures a card may have within about a half life
+            half_life (float): Seconds after which a failure counts half
+            width (int): Counters of each row
+            depth (int): Number of rows
+            clock (Callable[[], float]): Clock returning seconds
+        """
+        self.max_failures = max_failures
+        self.half_life = half_life
+        self.width = width
+        self.depth = depth
+        self.clock = clock
+        self.__counters = array('d', bytes(8 * width * depth))
+        self.__total = 0.0  # weighted failures of every card
+        self.__landmark = clock()  # time of weight 1
+        self.__key = os.urandom(16)  # cards chosen to collide in one process do not collide in another
+        self.__unpack = struct.Struct('<%dI' % depth).unpack
+        self.__offsets = tuple(row * width for row in range(depth))
+        self.__lock = threading.Lock()
+
+    def failures(self, card_number):
+        """Return estimated failures of card, decayed to now"""
+        indexes = self.__indexes(card_number)
+        with self.__lock:
+            counters = self.__counters
+            return min([counters[i] for i in indexes]) / self.__weight(self.clock())
+
+    def is_locked(self, card_number):
+        """Return True if one more failure would bring card over `max_failures`"""
+        return self.failures(card_number) + 1 > self.max_failures + 1e-9
+
+    def record_failure(self, card_number):
+        """Count failed attempt of card
+
+        Returns:
+            float: Estimated failures of card, including this one
+        """
+        indexes = self.__indexes(card_number)
+        with self.__lock:
+            weight = self.__weight(self.clock())
+            counters = self.__counters
+            count = min([counters[i] for i in indexes]) + weight
+            for i in indexes:
+                if counters[i] < count:
+                    counters[i] = count
+            self.__total += weight
+            return count / weight
+
+    def false_lockout_bound(self):
+        """Return upper bound of the probability that a card without failures is locked, given the
+        failures in the sketch now"""
+        with self.__lock:
+            total = self.__total / self.__weight(self.clock())
+        return min(1.0, total / (self.width * self.max_failures)) ** self.depth
+
+    def __weight(self, now):
+        """Return weight of a failure now, scaling counters back when it grew too large"""
+        weight = 2.0 ** ((now - self.__landmark) / self.half_life)
+        if weight >= _RESCALE_AT:
+            counters = self.__counters
+            for i in range(len(counters)):
+                counters[i] /= weight
+            self.__total /= weight
+            self.__landmark = now
+            weight = 1.0
+        return weight
+
+    def __indexes(self, card_number):
+        digest = hashlib.blake2b(card_number.encode(), digest_size=4 * self.depth, key=self.__key).digest()
+        width = self.width
+        return [offset + value % width for offset, value in zip(self.__offsets, self.__unpack(digest))]
+
+
+class ThrottledBankSystem(IBankSystem):
+    """Bank system refusing PIN attempts of cards with too many recent failures, without calling the bank
+
+    - Shared by every terminal, so failures at any terminal count, see `PinThrottle`
+
+    - `validate_pin` of a locked card raises `ErrorCode.PIN_ATTEMPTS_EXCEEDED`, in `validate_pins`
+      it is answered False. Failures answered by the bank are recorded
+
+    - Other calls are passed to the wrapped bank system as they are
+    """
+
+    def __init__(self, bank_system, throttle):
+        """
+        Args:
+            bank_system (IBankSystem): Bank system to be protected
+            throttle (PinThrottle): Failed attempts of every terminal
+        """
+        self.bank_system = bank_system
+        self.throttle = throttle
+        self.refused = 0
+        self.__refused_lock = threading.Lock()
+
+    def validate_pin(self, card_number, pin):
+        """Validate pin with the bank unless the card is locked
+
+        Raises:
+            ValueError: Raised with `ErrorCode.PIN_ATTEMPTS_EXCEEDED` if the card is locked
+        """
+        if self.throttle.is_locked(card_number):
+            with self.__refused_lock:
+                self.refused += 1
+            raise ValueError(ErrorCode.PIN_ATTEMPTS_EXCEEDED)
+        is_valid = self.bank_system.validate_pin(card_number, pin)
+        if not is_valid:
+            self.throttle.record_failure(card_number)
+        return is_valid
+
+    def validate_pins(self, requests):
+        throttle = self.throttle
+        results = [False] * len(requests)
+        allowed = [i for i, (card_number, _) in enumerate(requests) if not throttle.is_locked(card_number)]
+        with self.__refused_lock:
+            self.refused += len(requests) - len(allowed)
+        if allowed:
+            answers = self.bank_system.validate_pins([requests[i] for i in allowed])
+            for i, is_valid in zip(allowed, answers):
+                results[i] = is_valid
+                if not is_valid:
+                    throttle.record_failure(requests[i][0])
+        return results
+
+    def get_accounts(self, card):
+        return self.bank_system.get_accounts(card)
+
+    def sync_transactions(self, transactions):
+        return self.bank_system.sync_transactions(transactions)
+
+    def invalidate_account(self, account_number):
+        self.bank_system.invalidate_account(account_number)
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from infra.timing import LatencyHistogram
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from typing import Optional
+    from infra.bank_api import IBankSystem, AsyncIBankSystem
+    from infra.metrics import Metrics
+    from model.domain import Account, Card
+
+# Outcomes of a prefetch
+HIT = 'hit'  # accounts were ready when the pin was validated
+WAIT = 'wait'  # the pin was validated first, the rest of the fetch was waited for
+FAILED = 'failed'  # the fetch raised, accounts were fetched again
+DISCARDED = 'discarded'  # the card left before the pin was validated
+OUTCOMES = (HIT, WAIT, FAILED, DISCARDED)
+
+
+class AccountPrefetcher:
+    """Fetch accounts of a card while the customer types the pin
+
+    - `AtmWait.insert_card` starts `get_accounts` of the bank system, in a thread pool for an
+      `IBankSystem` or as a task of the running loop for an `AsyncIBankSystem`
+
+    - `AtmAuthorized.on_load`, after the pin is validated, takes the result instead of calling the
+      bank, waiting for the rest of the fetch if needed. Accounts are never in the context before the
+      pin is validated. A fetch that failed is made again there
+
+    - `AtmContext.clean_context` discards a prefetch not taken, e.g. after a wrong pin
+
+    - Accounts are read when the card is inserted, so when taken they can be as old as the pin
+      entry. A balance changed meanwhile elsewhere is seen on the next `get_accounts`
+
+    - Outcomes are counted by `HIT`, `WAIT`, `FAILED` and `DISCARDED`. `saved` is the latency taken
+      off the pin, the fetch time minus the time waited for it. With `metrics` they are counted as
+      `atm_prefetch_total` and `atm_prefetch_saved_seconds_total` as well
+
+    - Shared by every terminal of a fleet, `close` stops the thread pool
+    """
+
+    def __init__(self, max_workers=8, metrics=None, clock=time.perf_counter_ns):
+        """
+        Args:
+            max_workers (int): Threads fetching accounts of blocking bank systems
+            metrics (Metrics): Destination of counts, None to keep them here only
+            clock (Callable[[], int]): Clock returning nanoseconds
+        """
+        self.metrics = metrics  # type: Optional[Metrics]
+        self.clock = clock
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)  # type: dict[str, int]
+        self.saved = LatencyHistogram()
+        self.__executor = ThreadPoolExecutor(max_workers, thread_name_prefix='account-prefetch')
+        self.__lock = threading.Lock()
+
+    def start(self, bank_system, card):
+        """Start fetching accounts of card
+
+        Args:
+            bank_system (IBankSystem | AsyncIBankSystem): Bank system of the terminal
+            card (Card): Inserted card
+
+        Returns:
+            Future | asyncio.Task: Fetch to be passed to `take` or `discard`
+
+        Raises:
+            RuntimeError: Raised for an `AsyncIBankSystem` if no event loop is running
+        """
+        if asyncio.iscoroutinefunction(bank_system.get_accounts):
+            return asyncio.get_running_loop().create_task(self.__fetch_async(bank_system, card))
+        return self.__executor.submit(self.__fetch, bank_system, card)
+
+    def take(self, future):
+        """Return accounts of a prefetch, waiting for it if needed
+
+        Args:
+            future (Future): Result of `start`
+
+        Returns:
+            Optional[list[Account]]: Accounts, None if the fetch failed
+        """
+        ready, waited_from = future.done(), self.clock()
+        try:
+            accounts, elapsed = future.result()
+        except Exception:
+            self.__count(FAILED)
+            return None
+        return self.__taken(accounts, elapsed, ready, waited_from)
+
+    async def take_async(self, task):
+        """Same as `take` for a prefetch started with an `AsyncIBankSystem`"""
+        ready, waited_from = task.done(), self.clock()
+        try:
+            accounts, elapsed = await task
+        except Exception:
+            self.__count(FAILED)
+            return None
+        return self.__taken(accounts, elapsed, ready, waited_from)
+
+    def discard(self, future):
+        """Drop a prefetch not taken, the fetch is cancelled if it has not started"""
+        future.cancel()
+        self.__count(DISCARDED)
+
+    def close(self):
+        """Stop the thread pool, fetches running are finished"""
+        self.__executor.shutdown()
+
+    def __fetch(self, bank_system, card):
+        started = self.clock()
+        accounts = bank_system.get_accounts(card)
+        return accounts, self.clock() - started
+
+    async def __fetch_async(self, bank_system, card):
+        started = self.clock()
+        accounts = await bank_system.get_accounts(card)
+        return accounts, self.clock() - started
+
+    def __taken(self, accounts, elapsed, ready, waited_from):
+        saved = max(0, elapsed - (self.clock() - waited_from))
+        with self.__lock:
+            self.saved.record(saved)
+        self.__count(HIT if ready else WAIT, saved)
+        return accounts
+
+    def __count(self, outcome, saved=0):
+        with self.__lock:
+            self.outcomes[outcome] += 1
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.inc('atm_prefetch_total', (('outcome', outcome),))
+            if saved:
+                metrics.inc('atm_prefetch_saved_seconds_total', (), saved / 1e9)
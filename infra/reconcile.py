@@ -0,0 +1,164 @@
+import itertools
+import json
+import os
+from typing import NamedTuple
+
+from infra.journal import ADJUSTMENT, TRANSACTION, read_records
+
+# Kinds of mismatch
+GAP = 'gap'
+COUNT = 'count'
+
+
+class Mismatch(NamedTuple):
+    """Difference found by `Reconciler`
+
+    - `GAP` cash after a record is not cash after the previous record of the terminal plus its offset,
+      so records are missing or wrong. `position` is the record in the stream
+
+    - `COUNT` cash counted in the terminal is not the cash the log ends with
+    """
+    atm_id: str  # type: str
+    kind: str  # type: str
+    position: int  # type: int
+    expected: int  # type: int
+    actual: int  # type: int
+
+
+def read_journal(atm_id, directory):
+    """Yield log records of a terminal from its `Journal` directory
+
+    Args:
+        atm_id (str): Id of terminal
+        directory (str): Journal directory of the terminal
+
+    Yields:
+        tuple: atm id, kind (`TRANSACTION` or `ADJUSTMENT`), account number, offset, cash after
+    """
+    for _, kind, account_number, offset, cash, _ in read_records(directory):
+        if kind == TRANSACTION or kind == ADJUSTMENT:
+            yield atm_id, kind, account_number, offset, cash
+
+
+def read_log(path):
+    """Yield log records from a json lines file, one line `[atm_id, kind, account_number, offset, cash_after]`
+
+    Args:
+        path (str): Path of log file
+
+    Yields:
+        tuple: atm id, kind, account number, offset, cash after
+    """
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield tuple(json.loads(line))
+
+
+class Reconciler:
+    """Streaming end-of-day settlement of terminals against their transaction logs
+
+    - Records are consumed one at a time from any iterable, memory depends on the number of
+      terminals and accounts, not on the length of the log
+
+    - For each terminal, the change of cash must be the sum of account deltas of `TRANSACTION`
+      records i.e. `put_cash` and `take_cash`. `ADJUSTMENT` records change a balance without cash,
+      e.g. a withdrawal given back by `AtmProcessingWithdrawal.exit`, they are summed on their own
+
+    - With `checkpoint_path`, the state is saved every `checkpoint_every` records and on `run` end.
+      A new reconciler with the same path resumes after the saved position of the same stream
+    """
+
+    def __init__(self, checkpoint_path=None, checkpoint_every=100000):
+        """
+        Args:
+            checkpoint_path (str): File of checkpoint, nothing is saved if None
+            checkpoint_every (int): Number of records between checkpoints
+        """
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.position = 0
+        # atm id -> [opening cash, closing cash, sum of transactions, sum of adjustments, records]
+        self.atms = {}  # type: dict[str, list[int]]
+        # account number -> [sum of transactions, sum of adjustments]
+        self.accounts = {}  # type: dict[str, list[int]]
+        self.gaps = []  # type: list[Mismatch]
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state = json.load(f)
+            self.position = state['position']
+            self.atms = state['atms']
+            self.accounts = state['accounts']
+            self.gaps = [Mismatch(*gap) for gap in state['gaps']]
+
+    def run(self, records):
+        """Consume records, records before the resumed position are skipped
+
+        Args:
+            records (Iterable[tuple]): atm id, kind, account number, offset, cash after of each record
+
+        Returns:
+            Reconciler: self
+        """
+        atms, accounts = self.atms, self.accounts
+        position = self.position
+        for atm_id, kind, account_number, offset, cash in itertools.islice(records, position, None):
+            adjustment = kind == ADJUSTMENT
+            moved = 0 if adjustment else offset
+            atm = atms.get(atm_id)
+            if atm is None:
+                atm = atms[atm_id] = [cash - moved, cash - moved, 0, 0, 0]
+            elif atm[1] + moved != cash:
+                self.gaps.append(Mismatch(atm_id, GAP, position, atm[1] + moved, cash))
+            atm[1] = cash
+            atm[3 if adjustment else 2] += offset
+            atm[4] += 1
+            account = accounts.get(account_number)
+            if account is None:
+                account = accounts[account_number] = [0, 0]
+            account[1 if adjustment else 0] += offset
+            position += 1
+            if self.checkpoint_path and position % self.checkpoint_every == 0:
+                self.position = position
+                self.checkpoint()
+        self.position = position
+        if self.checkpoint_path:
+            self.checkpoint()
+        return self
+
+    def checkpoint(self):
+        """Save state, the file is replaced atomically"""
+        temporary = self.checkpoint_path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'position': self.position, 'atms': self.atms, 'accounts': self.accounts,
+                       'gaps': [list(gap) for gap in self.gaps]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint_path)
+
+    def mismatches(self, cash_counts=None):
+        """Return gaps in the logs and terminals whose counted cash differs from the logs
+
+        Args:
+            cash_counts (dict[str, int]): Cash counted in each terminal at the end of day
+
+        Returns:
+            list[Mismatch]: Mismatches in the order found
+        """
+        found = list(self.gaps)
+        for atm_id, counted in (cash_counts or {}).items():
+            atm = self.atms.get(atm_id)
+            closing = atm[1] if atm else None
+            if closing != counted:
+                found.append(Mismatch(atm_id, COUNT, self.position, closing, counted))
+        return found
+
+    def settlement(self, atm_id):
+        """Return totals of a terminal
+
+        Returns:
+            dict: opening, closing, transactions and adjustments sums and number of records
+        """
+        opening, closing, transactions, adjustments, records = self.atms[atm_id]
+        return {'opening': opening, 'closing': closing, 'transactions': transactions,
+                'adjustments': adjustments, 'records': records}
@@ -0,0 +1,136 @@
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from model.cassettes import Cassettes
+
+
+class SharedCashTable:
+    """Cash and limit of many cash boxes in one shared memory block, readable from any process
+
+    - The block is an array of 64-bit integers, one cash subtotal for each writer followed by
+      `cash` and `limit` of each slot::
+
+        [subtotal 0, ..., subtotal w-1, cash 0, limit 0, cash 1, limit 1, ...]
+
+    - A slot is written by one process only, the one owning its `SharedCashBox`, and that process
+      keeps its own subtotal, so nothing is locked. The fleet-wide total is the sum of subtotals
+
+    - Reads are not synchronized with writes. A value is never torn, but a total read during a
+      transaction may not include it yet
+    """
+
+    def __init__(self, slots, writers=1, name=None):
+        """
+        Args:
+            slots (int): Number of cash boxes
+            writers (int): Number of writing processes, each has a subtotal
+            name (str): Name of an existing block to attach to, a new zeroed block is created if None
+        """
+        self.slots = slots
+        self.writers = writers
+        size = max(1, writers + 2 * slots) * 8
+        if name is None:
+            self.__memory = shared_memory.SharedMemory(create=True, size=size)
+            self.__memory.buf[:size] = bytes(size)
+        else:
+            self.__memory = shared_memory.SharedMemory(name=name)
+        self.__view = self.__memory.buf[:size].cast('q')
+
+    @property
+    def name(self):
+        """Name to attach to the block from another process"""
+        return self.__memory.name
+
+    def set(self, slot, writer, cash, limit):
+        """Set cash and limit of slot, counting cash in the subtotal of writer
+
+        Args:
+            slot (int): Index of cash box
+            writer (int): Index of process owning the slot
+            cash (int): Cash in the box
+            limit (int): Limit of the box
+        """
+        view, index = self.__view, self.writers + 2 * slot
+        view[writer] += cash - view[index]
+        view[index] = cash
+        view[index + 1] = limit
+
+    def cash_box(self, slot, writer, cassettes=None):
+        """Return cash box of slot, to be used by the process owning it only
+
+        Args:
+            slot (int): Index of cash box
+            writer (int): Index of the calling process
+            cassettes (Cassettes): Notes of the cash box, kept by the owning process
+
+        Returns:
+            SharedCashBox: Cash box reading and writing the block
+        """
+        cash_box = SharedCashBox(self.__view, self.writers + 2 * slot, writer)
+        cash_box.cassettes = cassettes
+        return cash_box
+
+    def cash(self, slot):
+        return self.__view[self.writers + 2 * slot]
+
+    def limit(self, slot):
+        return self.__view[self.writers + 2 * slot + 1]
+
+    def total(self):
+        """Return cash of every slot, the sum of subtotals"""
+        return sum(self.__view[:self.writers])
+
+    def close(self):
+        """Detach from the block, cash boxes of this process cannot be used afterwards"""
+        self.__view.release()
+        self.__memory.close()
+
+    def unlink(self):
+        """Free the block, called once by the process that created it"""
+        self.__memory.unlink()
+
+
+class SharedCashBox:
+    """`CashBox` whose cash and limit live in a `SharedCashTable`
+
+    * Changing `cash` updates the subtotal of the owning process as well. `version` and `cassettes`
+      are local to the process, which is the only one dispensing from the box
+    """
+
+    __slots__ = ('__view', '__index', '__writer', 'version', 'cassettes')
+
+    def __init__(self, view, index, writer):
+        """
+        Args:
+            view (memoryview): Block as 64-bit integers
+            index (int): Position of cash, limit follows it
+            writer (int): Position of subtotal of the owning process
+        """
+        self.__view = view
+        self.__index = index
+        self.__writer = writer
+        self.version = 0
+        self.cassettes = None  # type: Optional[Cassettes]
+
+    @property
+    def cash(self):
+        return self.__view[self.__index]
+
+    @cash.setter
+    def cash(self, value):
+        view, index = self.__view, self.__index
+        view[self.__writer] += value - view[index]
+        view[index] = value
+
+    @property
+    def limit(self):
+        return self.__view[self.__index + 1]
+
+    @limit.setter
+    def limit(self, value):
+        self.__view[self.__index + 1] = value
+
+    def __repr__(self):
+        return 'SharedCashBox(cash=%d, limit=%d, version=%d)' % (self.cash, self.limit, self.version)
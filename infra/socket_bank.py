@@ -0,0 +1,201 @@
+import itertools
+import json
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from errors import ErrorCode
+from infra.bank_api import IBankSystem
+from model.domain import Account
+
+if TYPE_CHECKING:
+    from model.domain import Card
+
+
+class BankConnection:
+    """One persistent connection to the bank server
+
+    * Not thread safe, a connection is used by one caller at a time through `SocketBankSystem`
+    """
+
+    def __init__(self, address, connect_timeout):
+        """
+        Args:
+            address (tuple[str, int]): Host and port of the bank server
+            connect_timeout (float): Seconds to wait for connecting
+        """
+        self.sock = socket.create_connection(address, timeout=connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        self.ids = itertools.count()
+
+    def exchange(self, calls, deadline):
+        """Send every request at once, then read responses in order
+
+        Args:
+            calls (list[tuple[str, tuple]]): Operation name and arguments of each request
+            deadline (float): `time.monotonic()` value after which it gives up
+
+        Returns:
+            list[dict]: Responses in the order of calls
+
+        Raises:
+            socket.timeout: Raised if the deadline passed, the connection must be closed then
+            ConnectionError: Raised if the server closed the connection
+            RuntimeError: Raised with `ErrorCode.BANK_SYSTEM_SENT_INVALID_RESPONSE` if a response has no
+                or another id, the connection must be closed then
+        """
+        ids = [next(self.ids) for _ in calls]
+        self.sock.settimeout(max(deadline - time.monotonic(), 0.0))
+        self.sock.sendall(b''.join(
+            json.dumps({'id': request_id, 'op': op, 'args': args}).encode() + b'\n'
+            for request_id, (op, args) in zip(ids, calls)
+        ))
+        responses = []
+        for request_id in ids:
+            self.sock.settimeout(max(deadline - time.monotonic(), 0.0))
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError('bank server closed the connection')
+            response = json.loads(line)
+            if not isinstance(response, dict) or response.get('id') != request_id:
+                raise RuntimeError(ErrorCode.BANK_SYSTEM_SENT_INVALID_RESPONSE, response)
+            responses.append(response)
+        return responses
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class SocketBankSystem(IBankSystem):
+    """Bank system talking to `LocalBankServer` (or a compatible server) over TCP
+
+    - Keeps up to `pool_size` persistent connections, callers wait for a free one
+
+    - `pipeline` sends many requests on one connection before reading the answers
+
+    - Each call has a deadline, a connection which timed out is closed since its answer may still arrive
+
+    - Network failures raise RuntimeError with `ErrorCode`, so the state machine takes the failure transition
+    """
+
+    def __init__(self, host, port, pool_size=8, timeout=1.0):
+        """
+        Args:
+            host (str): Host of the bank server
+            port (int): Port of the bank server
+            pool_size (int): Max number of connections
+            timeout (float): Default deadline of a call in seconds
+        """
+        self.address = (host, port)
+        self.timeout = timeout
+        self.__idle = []  # type: list[BankConnection]
+        self.__slots = threading.BoundedSemaphore(pool_size)
+        self.__lock = threading.Lock()
+
+    def validate_pin(self, card_number, pin):
+        """Verify pin number using server
+        Args:
+            card_number (str): Card number
+            pin (str): Personal identification number likes '1111' or '1111-k' or else.
+        """
+        return self.call('validate_pin', card_number, pin)
+
+    def validate_pins(self, requests):
+        """Verify many pin numbers with one request
+
+        Args:
+            requests (list[tuple[str, str]]): Card number and pin of each request
+        """
+        return self.call('validate_pins', [list(request) for request in requests])
+
+    def get_accounts(self, card):
+        """Retrieve all accounts connected to card
+
+        Args:
+            card (Card): Card
+        """
+        return [Account(**account) for account in self.call('get_accounts', card.card_number)]
+
+    def sync_transaction(self, transaction_id, account_number, offset):
+        """Apply offset to account in the bank, the bank ignores a transaction id seen before
+
+        Args:
+            transaction_id (str): Unique id of transaction
+            account_number (str): Account number
+            offset (int): Amount to deposit or withdrawal
+        """
+        return self.call('sync_transaction', transaction_id, account_number, offset)
+
+    def sync_transactions(self, transactions):
+        """Apply many transactions with one request
+
+        Args:
+            transactions (list[tuple[str, str, int]]): Transaction id, account number and offset of each
+        """
+        return self.call('sync_transactions', [list(transaction) for transaction in transactions])
+
+    def call(self, op, *args, timeout=None):
+        """Call one operation
+
+        Args:
+            op (str): Operation name
+            timeout (float): Deadline of this call, `self.timeout` if None
+        """
+        return self.pipeline([(op, args)], timeout)[0]
+
+    def pipeline(self, calls, timeout=None):
+        """Send calls on one connection without waiting for each answer
+
+        Args:
+            calls (list[tuple[str, tuple]]): Operation name and arguments of each call
+            timeout (float): Deadline of the whole pipeline, `self.timeout` if None
+
+        Returns:
+            list: Result of each call
+
+        Raises:
+            RuntimeError: Raised with `ErrorCode.BANK_SYSTEM_TIMED_OUT`, `BANK_SYSTEM_IS_NOT_AVAILABLE` or
+                `BANK_SYSTEM_SENT_INVALID_RESPONSE`
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        if not self.__slots.acquire(timeout=max(deadline - time.monotonic(), 0.0)):
+            raise RuntimeError(ErrorCode.BANK_SYSTEM_TIMED_OUT)
+        connection = None
+        try:
+            with self.__lock:
+                connection = self.__idle.pop() if self.__idle else None
+            if connection is None:
+                connection = BankConnection(self.address, max(deadline - time.monotonic(), 0.001))
+            responses = connection.exchange(calls, deadline)
+            with self.__lock:
+                self.__idle.append(connection)
+        except socket.timeout:
+            if connection:
+                connection.close()
+            raise RuntimeError(ErrorCode.BANK_SYSTEM_TIMED_OUT)
+        except RuntimeError:
+            if connection:
+                connection.close()
+            raise
+        except (OSError, ValueError):
+            if connection:
+                connection.close()
+            raise RuntimeError(ErrorCode.BANK_SYSTEM_IS_NOT_AVAILABLE)
+        finally:
+            self.__slots.release()
+        results = []
+        for response in responses:
+            if not response['ok']:
+                raise RuntimeError(ErrorCode.BANK_SYSTEM_IS_NOT_AVAILABLE, response['error'])
+            results.append(response['result'])
+        return results
+
+    def close(self):
+        """Close idle connections"""
+        with self.__lock:
+            idle, self.__idle = self.__idle, []
+        for connection in idle:
+            connection.close()
@@ -0,0 +1,218 @@
+import threading
+import time
+
+from infra.bank_api import IBankSystem
+
+# Linear sub-buckets per power of two, values are kept within 1 / 2 ** SUB_BITS (6.25%)
+SUB_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BITS
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies in nanoseconds
+
+    - Values below `2 ** SUB_BITS` have a bucket each, above that every power of two is split
+      into `2 ** SUB_BITS` equal buckets, so the relative error is bounded and every 64-bit value
+      has a bucket
+
+    - `record` is a `bit_length`, a shift and a list increment. Count and max are read from the
+      buckets, max is the top of the highest bucket used
+    """
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (64 << SUB_BITS)  # type: list[int]
+        self.total = 0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @property
+    def max(self):
+        for index in range(len(self.counts) - 1, -1, -1):
+            if self.counts[index]:
+                return _bounds(index)[1]
+        return 0
+
+    def record(self, value):
+        """Add one value
+
+        Args:
+            value (int): Latency in nanoseconds, negative values count as 0
+        """
+        if value < 0:
+            value = 0
+        shift = value.bit_length() - SUB_BITS - 1
+        self.counts[value if shift < 0 else ((shift + 1) << SUB_BITS) + (value >> shift) - _SUB_BUCKETS] += 1
+        self.total += value
+
+    def merge(self, other):
+        """Add every value of other histogram
+
+        Args:
+            other (LatencyHistogram): Histogram to be added
+        """
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def percentile(self, q):
+        """Return value at percentile q, the middle of its bucket
+
+        Args:
+            q (float): Percentile from 0 to 100
+
+        Returns:
+            int: Latency in nanoseconds, 0 if nothing is recorded
+        """
+        count = self.count
+        if not count:
+            return 0
+        rank = max(1, -(-count * q // 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                low, high = _bounds(index)
+                return (low + high) // 2
+        return 0
+
+    def summary(self):
+        """Return count, mean, p50, p99, p999 and max in nanoseconds"""
+        count = self.count
+        return {
+            'count': count,
+            'mean': self.total // count if count else 0,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max,
+        }
+
+
+def _bounds(index):
+    """Return lowest and highest value of bucket"""
+    if index < _SUB_BUCKETS:
+        return index, index
+    shift = (index >> SUB_BITS) - 1
+    mantissa = (index & (_SUB_BUCKETS - 1)) + _SUB_BUCKETS
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class Timings:
+    """Latency histograms by name, fed by `AtmContext` and `TimedBankSystem`
+
+    - Names recorded by the state machine
+
+        `state.<AtmState name>` time a session stayed in the state, recorded when it is left
+
+        `handler.<action>` time of the handler of an action e.g. `handler.enter_pin`,
+        `handler.put_cash`. Loading accounts is `handler.on_load` of `AtmAuthorized`
+
+        `bank.<method>` time of a call to the bank system wrapped by `TimedBankSystem`
+
+    - `enabled` can be switched at any time. When it is off the cost is one attribute check per
+      dispatch, see `bench.timing_bench` for the overhead when it is on
+
+    - Each thread records into its own histograms, so recording takes no lock.
+      `histograms` and `report` merge them
+    """
+
+    def __init__(self, enabled=True, clock=time.perf_counter_ns):
+        """
+        Args:
+            enabled (bool): Record from the start
+            clock (Callable[[], int]): Clock returning nanoseconds
+        """
+        self.enabled = enabled
+        self.clock = clock
+        self.__local = threading.local()
+        self.__tables = []  # type: list[dict[str, LatencyHistogram]]
+        self.__lock = threading.Lock()
+
+    def record(self, name, value):
+        """Add latency to the histogram of name
+
+        Args:
+            name (str): Name of histogram
+            value (int): Latency in nanoseconds
+        """
+        try:
+            table = self.__local.table
+        except AttributeError:
+            table = self.__local.table = {}
+            with self.__lock:
+                self.__tables.append(table)
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table[name] = LatencyHistogram()
+        histogram.record(value)
+
+    def histograms(self):
+        """Return histograms of every thread merged by name
+
+        Returns:
+            dict[str, LatencyHistogram]: Merged copies, later records do not change them
+        """
+        merged = {}
+        with self.__lock:
+            tables = list(self.__tables)
+        for table in tables:
+            for name, histogram in list(table.items()):
+                merged.setdefault(name, LatencyHistogram()).merge(histogram)
+        return merged
+
+    def report(self):
+        """Return `LatencyHistogram.summary` by name"""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms().items())}
+
+    def reset(self):
+        """Drop everything recorded so far"""
+        with self.__lock:
+            for table in self.__tables:
+                table.clear()
+
+
+class TimedBankSystem(IBankSystem):
+    """Bank system recording the latency of each call into `Timings` as `bank.<method>`"""
+
+    def __init__(self, bank_system, timings):
+        """
+        Args:
+            bank_system (IBankSystem): Bank system to be timed
+            timings (Timings): Destination of latencies
+        """
+        self.bank_system = bank_system
+        self.timings = timings
+
+    def validate_pin(self, card_number, pin):
+        if not self.timings.enabled:
+            return self.bank_system.validate_pin(card_number, pin)
+        return self.__timed('bank.validate_pin', self.bank_system.validate_pin, card_number, pin)
+
+    def validate_pins(self, requests):
+        if not self.timings.enabled:
+            return self.bank_system.validate_pins(requests)
+        return self.__timed('bank.validate_pins', self.bank_system.validate_pins, requests)
+
+    def get_accounts(self, card):
+        if not self.timings.enabled:
+            return self.bank_system.get_accounts(card)
+        return self.__timed('bank.get_accounts', self.bank_system.get_accounts, card)
+
+    def sync_transactions(self, transactions):
+        if not self.timings.enabled:
+            return self.bank_system.sync_transactions(transactions)
+        return self.__timed('bank.sync_transactions', self.bank_system.sync_transactions, transactions)
+
+    def invalidate_account(self, account_number):
+        self.bank_system.invalidate_account(account_number)
+
+    def __timed(self, name, method, *args):
+        timings = self.timings
+        started = timings.clock()
+        try:
+            return method(*args)
+        finally:
+            timings.record(name, timings.clock() - started)
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from infra.bank_api import IBankSystem
+
+
+class DurableQueue:
+    """Append-only file queue of transactions waiting for the bank
+
+    - Each record is one json line `[transaction_id, account_number, offset]`, written and fsync-ed
+      before `append` returns
+
+    - Byte offset of the first unacknowledged record is kept in `<path>.ack`, replaced atomically
+
+    - Records after the acknowledged offset are loaded again when the queue is opened
+
+    - Records rejected by the bank are set aside in `<path>.rejected` with the reason
+    """
+
+    def __init__(self, path, fsync=True):
+        """
+        Args:
+            path (str): Path of queue file
+            fsync (bool): Call fsync after each append
+        """
+        self.path = path
+        self.fsync = fsync
+        self.__ack_path = path + '.ack'
+        self.rejected_path = path + '.rejected'
+        self.__pending = deque()  # type: deque[tuple[tuple, int]]
+        self.__lock = threading.Lock()
+        acked = 0
+        if os.path.exists(self.__ack_path):
+            with open(self.__ack_path) as f:
+                acked = int(f.read() or 0)
+        self.__file = open(path, 'a+b')
+        self.__file.seek(acked)
+        for line in self.__file:
+            if not line.endswith(b'\n'):
+                break
+            acked += len(line)
+            self.__pending.append((tuple(json.loads(line)), acked))
+        # drop torn write of the last record, it was never acknowledged to the caller
+        self.__file.truncate(acked)
+
+    def __len__(self):
+        return len(self.__pending)
+
+    def append(self, record):
+        """Append record durably
+
+        Args:
+            record (tuple[str, str, int]): Transaction id, account number, offset
+        """
+        line = json.dumps(record).encode() + b'\n'
+        with self.__lock:
+            self.__file.write(line)
+            self.__file.flush()
+            if self.fsync:
+                os.fsync(self.__file.fileno())
+            self.__pending.append((record, self.__file.tell()))
+
+    def peek(self, n):
+        """Return up to n oldest records without removing them"""
+        with self.__lock:
+            return [record for record, _ in list(self.__pending)[:n]]
+
+    def acknowledge(self, n):
+        """Remove n oldest records after they are applied by the bank
+
+        * When every record is acknowledged, the file is truncated
+        """
+        with self.__lock:
+            end = 0
+            for _ in range(n):
+                end = self.__pending.popleft()[1]
+            if not self.__pending:
+                end = 0
+                self.__file.truncate(0)
+            self.__write_ack(end)
+
+    def reject(self, entries):
+        """Set records aside durably, they must be acknowledged afterwards
+
+        Args:
+            entries (list[tuple[tuple, str]]): Record and reason of each
+        """
+        with open(self.rejected_path, 'ab') as f:
+            f.write(b''.join(json.dumps([list(record), reason]).encode() + b'\n' for record, reason in entries))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def rejected(self):
+        """Return records set aside with their reasons
+
+        Returns:
+            list[tuple[tuple, str]]: Record and reason of each
+        """
+        if not os.path.exists(self.rejected_path):
+            return []
+        with open(self.rejected_path, 'rb') as f:
+            return [(tuple(record), reason) for record, reason in map(json.loads, f)]
+
+    def close(self):
+        self.__file.close()
+
+    def __write_ack(self, offset):
+        temporary = self.__ack_path + '.tmp'
+        with open(temporary, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temporary, self.__ack_path)
+
+
+class WriteBehindSync:
+    """Background worker sending queued transactions to the bank in batches
+
+    - Batches keep the queue order, so transactions of an account reach the bank in order
+
+    - A failed batch is retried with exponential backoff, the bank ignores transaction ids
+      it has seen, so a batch applied partially before the failure is safe to send again
+
+    - A transaction the bank rejects e.g. for an unknown account is set aside by `DurableQueue.reject`,
+      so it does not hold back the transactions after it
+    """
+
+    def __init__(self, queue, bank_system, batch_size=100, interval=0.05, max_backoff=5.0):
+        """
+        Args:
+            queue (DurableQueue): Queue of transactions
+            bank_system (IBankSystem): Bank system answering `sync_transactions`
+            batch_size (int): Max number of transactions sent at once
+            interval (float): Seconds between flushes when the queue is not full
+            max_backoff (float): Max seconds between retries
+        """
+        self.queue = queue
+        self.bank_system = bank_system
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.flushed = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.__wakeup = threading.Event()
+        self.__flush_lock = threading.Lock()
+        self.__closed = False
+        self.__worker = threading.Thread(target=self.__run, name='write-behind-sync', daemon=True)
+        self.__worker.start()
+
+    def submit(self, transaction_id, account_number, offset):
+        """Record transaction to be sent
+
+        Args:
+            transaction_id (str): Unique id of transaction
+            account_number (str): Account number
+            offset (int): Amount to deposit or withdrawal
+        """
+        self.queue.append((transaction_id, account_number, offset))
+        if len(self.queue) >= self.batch_size:
+            self.__wakeup.set()
+
+    def metrics(self):
+        """Return queue depth and flush statistics
+
+        Returns:
+            dict: depth, flushed, failures, rejected, last_flush_latency and max_flush_latency in seconds
+        """
+        return {
+            'depth': len(self.queue),
+            'flushed': self.flushed,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'last_flush_latency': self.last_flush_latency,
+            'max_flush_latency': self.max_flush_latency,
+        }
+
+    def flush(self):
+        """Send queued transactions until the queue is empty
+
+        Raises:
+            Exception: Error of the bank system, transactions stay in the queue
+        """
+        with self.__flush_lock:
+            while True:
+                batch = self.queue.peek(self.batch_size)
+                if not batch:
+                    return
+                started = time.perf_counter()
+                results = self.bank_system.sync_transactions(batch) or ()
+                rejected = [(record, result) for record, result in zip(batch, results) if isinstance(result, str)]
+                if rejected:
+                    self.queue.reject(rejected)
+                    self.rejected += len(rejected)
+                self.queue.acknowledge(len(batch))
+                self.last_flush_latency = time.perf_counter() - started
+                self.max_flush_latency = max(self.max_flush_latency, self.last_flush_latency)
+                self.flushed += len(batch)
+
+    def close(self):
+        """Stop the worker after trying to flush once more"""
+        self.__closed = True
+        self.__wakeup.set()
+        self.__worker.join()
+
+    def __run(self):
+        backoff = self.interval
+        while not self.__closed:
+            self.__wakeup.wait(backoff)
+            self.__wakeup.clear()
+            try:
+                self.flush()
+                backoff = self.interval
+            except Exception:
+                self.failures += 1
+                backoff = min(backoff * 2, self.max_backoff)
+        try:
+            self.flush()
+        except Exception:
+            self.failures += 1
@@ -0,0 +1,187 @@
+from functools import reduce
+from math import gcd
+from typing import TYPE_CHECKING
+
+from errors import ErrorCode
+
+if TYPE_CHECKING:
+    from model.domain import CashBox
+
+# Note count of amounts that cannot be made
+_INF = 1 << 30
+# Plans of fewest notes compared for balance, enough for the few cassettes of a terminal
+_MAX_PLANS = 16
+
+
+class Cassettes:
+    """Notes of a cash box by denomination, with a dispense planner
+
+    - A plan pays the amount with the fewest notes, at most `max_notes`. Among plans of that many
+      notes the one leaving the cassettes most even is taken, the lowest count left is the highest
+
+    - Feasibility tables are kept for the notes a plan can use, `min(count, max_notes)` of each
+      denomination. `table[j][a]` is the fewest notes making `a` from denominations `j` and smaller.
+      A plan is a table lookup and a walk over plans of fewest notes, whatever the amount and the counts
+
+    - Tables depend on counts only while a cassette holds fewer than `max_notes` notes, so dispensing
+      from full cassettes changes none. Otherwise the tables of the changed denomination and larger
+      ones are rebuilt, the smaller ones are kept. See `bench.cassettes_bench`, about 5 us a plan and
+      about 0.8 ms a rebuild of four tables
+
+    - Deposited notes go to the deposit bin, they are counted in `CashBox.cash` only, not dispensed again
+    """
+
+    __slots__ = ('denominations', 'counts', 'max_notes', '__unit', '__steps', '__caps', '__tables')
+
+    def __init__(self, notes, max_notes=40):
+        """
+        Args:
+            notes (dict[int, int]): Count of notes by denomination
+            max_notes (int): Most notes paid out by one withdrawal
+
+        Raises:
+            ValueError: Raised if a denomination is not positive or a count is negative
+        """
+        if not notes or any(denomination <= 0 or count < 0 for denomination, count in notes.items()):
+            raise ValueError('malformed notes %r' % (notes,))
+        self.denominations = tuple(sorted(notes, reverse=True))  # type: tuple[int, ...]
+        self.counts = [notes[denomination] for denomination in self.denominations]  # type: list[int]
+        self.max_notes = max_notes
+        self.__unit = reduce(gcd, self.denominations)
+        self.__steps = tuple(denomination // self.__unit for denomination in self.denominations)
+        size = max_notes * self.__steps[0] + 1
+        self.__caps = [-1] * len(self.denominations)
+        self.__tables = [None] * len(self.denominations) + [[0] + [_INF] * (size - 1)]  # type: list[list[int]]
+        self.__update()
+
+    @property
+    def total(self):
+        """Value of every note"""
+        return sum(denomination * count for denomination, count in zip(self.denominations, self.counts))
+
+    def notes(self):
+        """Return count of notes by denomination"""
+        return dict(zip(self.denominations, self.counts))
+
+    def plan(self, amount):
+        """Return notes paying amount
+
+        Args:
+            amount (int): Amount to be paid out
+
+        Returns:
+            tuple[int, ...]: Count of notes of each denomination, in the order of `denominations`
+
+        Raises:
+            ValueError: Raised with `ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT` if the notes cannot make amount
+        """
+        unit, tables = self.__unit, self.__tables
+        rest = amount // unit
+        if amount < 0 or amount % unit or rest >= len(tables[0]) or tables[0][rest] > self.max_notes:
+            raise ValueError(ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT)
+        plans = []
+        self.__plans(0, rest, [], plans)
+        if len(plans) == 1:
+            return plans[0]
+        counts = self.counts
+        return max(plans, key=lambda plan: sorted(count - n for count, n in zip(counts, plan)))
+
+    def dispense(self, plan):
+        """Take notes of plan out of the cassettes
+
+        Args:
+            plan (tuple[int, ...]): Result of `plan`
+
+        Raises:
+            ValueError: Raised with `ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT` if a cassette has fewer notes
+        """
+        if any(n > count for n, count in zip(plan, self.counts)):
+            raise ValueError(ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT)
+        for j, n in enumerate(plan):
+            self.counts[j] -= n
+        self.__update()
+
+    def restore(self, plan):
+        """Put notes of a dispensed plan back, when its transaction is reverted
+
+        Args:
+            plan (tuple[int, ...]): Result of `plan`
+        """
+        for j, n in enumerate(plan):
+            self.counts[j] += n
+        self.__update()
+
+    def load(self, denomination, count):
+        """Add notes to the cassette of denomination
+
+        Args:
+            denomination (int): Denomination of a cassette
+            count (int): Number of notes, negative to take them out
+
+        Raises:
+            ValueError: Raised if there is no cassette of denomination or the count would be negative
+        """
+        j = self.denominations.index(denomination)
+        if self.counts[j] + count < 0:
+            raise ValueError('cassette of %d has %d notes' % (denomination, self.counts[j]))
+        self.counts[j] += count
+        self.__update()
+
+    def __update(self):
+        """Rebuild tables of denominations whose usable notes changed, and of larger denominations"""
+        max_notes, caps = self.max_notes, self.__caps
+        changed = -1
+        for j, count in enumerate(self.counts):
+            cap = min(count, max_notes)
+            if cap != caps[j]:
+                caps[j] = cap
+                changed = j
+        for j in range(changed, -1, -1):
+            self.__tables[j] = _table(self.__tables[j + 1], self.__steps[j], caps[j])
+
+    def __plans(self, j, rest, plan, plans):
+        """Collect plans of fewest notes making rest from denomination j on, up to `_MAX_PLANS`"""
+        if j == len(self.__steps):
+            plans.append(tuple(plan))
+            return
+        step, target, following = self.__steps[j], self.__tables[j][rest], self.__tables[j + 1]
+        for n in range(min(self.__caps[j], rest // step), -1, -1):
+            if following[rest - n * step] + n == target:
+                plan.append(n)
+                self.__plans(j + 1, rest - n * step, plan, plans)
+                plan.pop()
+                if len(plans) >= _MAX_PLANS:
+                    return
+
+
+def _table(following, step, cap):
+    """Return fewest notes of each amount using up to cap notes of step, and the table of smaller ones
+
+    * The notes are taken in bundles of 1, 2, 4, ... notes, each used at most once, which makes
+      every count up to cap in `log2(cap)` passes over the table
+    """
+    table = list(following)
+    size = len(table)
+    bundle = 1
+    while cap > 0:
+        n = min(bundle, cap)
+        shift = n * step
+        if shift >= size:
+            break
+        table[shift:] = [b + n if b + n < a else a for a, b in zip(table[shift:], table)]
+        cap -= n
+        bundle <<= 1
+    return table
+
+
+def load_notes(cash_box, denomination, count):
+    """Refill cash box with notes, the cash is increased by their value
+
+    Args:
+        cash_box (CashBox): Cash box with cassettes
+        denomination (int): Denomination of a cassette
+        count (int): Number of notes, negative to take them out
+    """
+    cash_box.cassettes.load(denomination, count)
+    cash_box.cash += denomination * count
+    cash_box.version += 1
@@ -1,20 +1,111 @@
-import copy
-from abc import abstractmethod
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from abc import ABCMeta, abstractmethod
 from typing import TYPE_CHECKING
 
 from errors import ErrorCode
-from model.base import SingletonMeta
+from infra.journal import ADJUSTMENT
+from infra.metrics import error_code_label
 
 if TYPE_CHECKING:
     from infra.bank_api import IBankSystem
     from model.domain import CashBox, Account
+    from infra.write_behind import WriteBehindSync
+    from infra.journal import Journal
+    from infra.metrics import Metrics
+    from typing import Optional
 
 
-class IUpdateTransactionCommand(metaclass=SingletonMeta):
+class IUpdateTransactionCommand(metaclass=ABCMeta):
+    """Transaction command interface
+
+    * Each construction is a new instance, see `InstanceRegistry` to share instances between terminals
+    """
+
     @abstractmethod
-    def execute(self, bank_system, cash_box, account, offset):
+    def execute(self, bank_system, cash_box, account, offset, key=None):
+        """Apply transaction
+
+        Args:
+            bank_system (IBankSystem):
+            cash_box (CashBox): Atm's cashbox
+            account (Account): selected account
+            offset (int): Amount to deposit or withdrawal
+            key (str): Idempotency key of the transaction, the same for every retry of it,
+                see `new_transaction_key` and `DedupingUpdateTransactionCommand`
+        """
         return True
 
+    def adjust_balance(self, bank_system, cash_box, account, offset, key=None):
+        """Change balance of account without moving cash, e.g. give back a withdrawal not taken
+
+        Args:
+            bank_system (IBankSystem):
+            cash_box (CashBox): Atm's cashbox, left as it is
+            account (Account): selected account
+            offset (int): Amount added to the balance
+            key (str): Idempotency key, see `execute`
+        """
+        account.balance += offset
+        account.version += 1
+        bank_system.invalidate_account(account.account_number)
+
+
+def check_transaction(cash, limit, balance, offset):
+    """Validate transaction against values before the change
+
+    Args:
+        cash (int): Cash of cash box
+        limit (int): Limit of cash box
+        balance (int): Balance of account
+        offset (int): Amount to deposit or withdrawal
+
+    Raises:
+        ValueError: Raised if the cash box or the account cannot take the offset
+    """
+    if offset > 0:  # Deposit
+        if limit < cash + offset:
+            raise ValueError(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE)
+    else:  # Withdrawal, offset has negative value
+        if balance + offset < 0:
+            raise ValueError(ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH)
+        if cash + offset < 0:
+            raise ValueError(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH)
+
+
+def plan_notes(cash_box, offset):
+    """Return notes paying out a withdrawal from the cassettes of the cash box
+
+    Args:
+        cash_box (CashBox): Atm's cashbox
+        offset (int): Amount to deposit or withdrawal
+
+    Returns:
+        Optional[tuple[int, ...]]: Result of `Cassettes.plan`, None for a deposit or a cash box without cassettes
+
+    Raises:
+        ValueError: Raised with `ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT` if the notes cannot make the amount
+    """
+    if offset >= 0 or cash_box.cassettes is None:
+        return None
+    return cash_box.cassettes.plan(-offset)
+
+
+# Keys of `new_transaction_key`, the prefix is random so keys of other processes and restarts differ
+_KEY_PREFIX = uuid.uuid4().hex[:16]
+_KEY_COUNTER = itertools.count(1)
+
+
+def new_transaction_key():
+    """Return a new idempotency key, unique across processes
+
+    * `next` of `itertools.count` is atomic, so threads never get the same key
+    """
+    return '%s-%d' % (_KEY_PREFIX, next(_KEY_COUNTER))
+
 
 class MockUpdateTransactionCommand(IUpdateTransactionCommand):
     """Mock Update Transaction Command skip the process synchronizing with server
@@ -22,7 +113,73 @@ class MockUpdateTransactionCommand(IUpdateTransactionCommand):
     * Implementation could use another bank api instance
     """
 
-    def execute(self, bank_system, cash_box, account, offset):
+    def execute(self, bank_system, cash_box, account, offset, key=None):
+        """Update if valid
+
+        * Validated before anything is changed, so nothing has to be rolled back.
+          Not safe when terminals on other threads share the account, see `OptimisticUpdateTransactionCommand`
+
+        Args:
+            bank_system (IBankSystem):
+            cash_box (CashBox): Atm's cashbox
+            account (Account): selected account
+            offset (int): Amount to deposit or withdrawal
+
+        Returns:
+            Optional[tuple[int, ...]]: Notes paid out of each cassette, see `plan_notes`
+        """
+        check_transaction(cash_box.cash, cash_box.limit, account.balance, offset)
+        notes = plan_notes(cash_box, offset)
+        # Sync with bank system
+        # If error occur, raise
+        if notes is not None:
+            cash_box.cassettes.dispense(notes)
+        cash_box.cash += offset
+        cash_box.version += 1
+        account.balance += offset
+        account.version += 1
+        bank_system.invalidate_account(account.account_number)
+        return notes
+
+
+# Locks guarding commits, an object is guarded by the stripe of its id
+_STRIPES = tuple(threading.Lock() for _ in range(64))
+
+
+def _stripe(o):
+    """Return index of the lock guarding object"""
+    return id(o) >> 4 & 63
+
+
+def _stripes(first, second):
+    """Return locks of two objects without duplicates in a fixed order, so two commits never deadlock"""
+    i, j = _stripe(first), _stripe(second)
+    if i == j:
+        return _STRIPES[i],
+    return (_STRIPES[i], _STRIPES[j]) if i < j else (_STRIPES[j], _STRIPES[i])
+
+
+class OptimisticUpdateTransactionCommand(IUpdateTransactionCommand):
+    """Update Transaction Command safe for terminals on many threads sharing accounts
+
+    - Reads cash, balance and their versions, validates them without any lock, then commits
+      by compare-and-swap: under the stripe locks of the cash box and the account, the change
+      is applied only if neither version moved since the read
+
+    - When a version moved, another terminal committed in between, the transaction is
+      validated again against the new values, up to `max_retries` times
+    """
+
+    def __init__(self, max_retries=100):
+        """
+        Args:
+            max_retries (int): Max number of retries after a conflict
+        """
+        self.max_retries = max_retries
+        self.conflicts = 0
+        self.__conflicts_lock = threading.Lock()
+
+    def execute(self, bank_system, cash_box, account, offset, key=None):
         """Update if valid
 
         Args:
@@ -30,25 +187,312 @@ class MockUpdateTransactionCommand(IUpdateTransactionCommand):
             cash_box (CashBox): Atm's cashbox
             account (Account): selected account
             offset (int): Amount to deposit or withdrawal
+
+        Raises:
+            ValueError: Raised if the transaction is not valid
+            RuntimeError: Raised with `ErrorCode.TRANSACTION_IS_CONFLICTED` when retries ran out
+        """
+        locks = _stripes(cash_box, account)
+        for _ in range(self.max_retries + 1):
+            cash_version, account_version = cash_box.version, account.version
+            check_transaction(cash_box.cash, cash_box.limit, account.balance, offset)
+            notes = plan_notes(cash_box, offset)
+            if self.__commit(locks, cash_box, account, offset, notes, cash_version, account_version):
+                bank_system.invalidate_account(account.account_number)
+                return
+            with self.__conflicts_lock:
+                self.conflicts += 1
+            time.sleep(0)
+        raise RuntimeError(ErrorCode.TRANSACTION_IS_CONFLICTED)
+
+    def adjust_balance(self, bank_system, cash_box, account, offset, key=None):
+        """Change balance under the lock of the account, so commits in flight see the new version
+
+        Args:
+            bank_system (IBankSystem):
+            cash_box (CashBox): Atm's cashbox, left as it is
+            account (Account): selected account
+            offset (int): Amount added to the balance
         """
-        old_cash_box_cash = copy.deepcopy(cash_box.cash)
-        old_account_balance = copy.deepcopy(account.balance)
+        with _STRIPES[_stripe(account)]:
+            account.balance += offset
+            account.version += 1
+        bank_system.invalidate_account(account.account_number)
+
+    @staticmethod
+    def __commit(locks, cash_box, account, offset, notes, cash_version, account_version):
+        for lock in locks:
+            lock.acquire()
         try:
+            if cash_box.version != cash_version or account.version != account_version:
+                return False
+            if notes is not None:
+                cash_box.cassettes.dispense(notes)
             cash_box.cash += offset
+            cash_box.version += 1
             account.balance += offset
-            if offset > 0:  # Deposit
-                if cash_box.limit < cash_box.cash + offset:
-                    raise ValueError(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE)
-                # Sync with bank system
-                # If error occur, raise
-            else:  # Withdrawal, offset has negative value
-                if account.balance + offset < 0:
-                    raise ValueError(ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH)
-                if cash_box.cash + offset < 0:
-                    raise ValueError(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH)
-                # Sync with bank system
-                # Same as above
+            account.version += 1
+            return True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+def _revert(cash_box, account, offset, notes):
+    """Undo a transaction applied locally whose record could not be written"""
+    if notes is not None:
+        cash_box.cassettes.restore(notes)
+    cash_box.cash -= offset
+    cash_box.version += 1
+    account.balance -= offset
+    account.version += 1
+
+
+class WriteBehindUpdateTransactionCommand(MockUpdateTransactionCommand):
+    """Update cash box and account at once, the bank is synchronized later
+
+    * Validation and local update are the same as `MockUpdateTransactionCommand`, then the
+      transaction is recorded in the durable queue of `WriteBehindSync`, which sends it in batches
+
+    * The idempotency key is the transaction id the bank deduplicates by, a random one is used
+      without key, so a retry must pass the key of the first attempt
+
+    * If the transaction cannot be recorded, the local update is reverted and the error is raised
+    """
+
+    def __init__(self, sync):
+        """
+        Args:
+            sync (WriteBehindSync): Worker sending recorded transactions to the bank
+        """
+        self.sync = sync
+
+    def execute(self, bank_system, cash_box, account, offset, key=None):
+        """Update if valid, then record transaction to be sent
+
+        Args:
+            bank_system (IBankSystem):
+            cash_box (CashBox): Atm's cashbox
+            account (Account): selected account
+            offset (int): Amount to deposit or withdrawal
+        """
+        notes = super().execute(bank_system, cash_box, account, offset)
+        try:
+            self.sync.submit(key or uuid.uuid4().hex, account.account_number, offset)
+        except OSError:
+            _revert(cash_box, account, offset, notes)
+            raise
+
+    def adjust_balance(self, bank_system, cash_box, account, offset, key=None):
+        """Change balance, then record transaction to be sent"""
+        super().adjust_balance(bank_system, cash_box, account, offset)
+        try:
+            self.sync.submit(key or uuid.uuid4().hex, account.account_number, offset)
+        except OSError:
+            account.balance -= offset
+            account.version += 1
+            raise
+
+
+class JournaledUpdateTransactionCommand(MockUpdateTransactionCommand):
+    """Update cash box and account, then append the result to the terminal's `Journal`
+
+    * The journal record is durable before `execute` returns, that is before cash is dispensed.
+      If it cannot be written, the update is reverted and the error is raised
+    """
+
+    def __init__(self, journal):
+        """
+        Args:
+            journal (Journal): Journal of the terminal
+        """
+        self.journal = journal
+        self.touched_accounts = {}  # type: dict[str, Account]
+
+    def execute(self, bank_system, cash_box, account, offset, key=None):
+        """Update if valid, then journal the result
+
+        Args:
+            bank_system (IBankSystem):
+            cash_box (CashBox): Atm's cashbox
+            account (Account): selected account
+            offset (int): Amount to deposit or withdrawal
+        """
+        notes = super().execute(bank_system, cash_box, account, offset)
+        try:
+            self.journal.append_transaction(account.account_number, offset, cash_box.cash, account.balance)
+        except OSError:
+            _revert(cash_box, account, offset, notes)
+            raise
+        self.touched_accounts[account.account_number] = account
+
+    def adjust_balance(self, bank_system, cash_box, account, offset, key=None):
+        """Change balance, then journal it"""
+        super().adjust_balance(bank_system, cash_box, account, offset)
+        self.journal.append(ADJUSTMENT, account.account_number, offset, cash_box.cash, account.balance)
+        self.touched_accounts[account.account_number] = account
+
+    def checkpoint(self, cash_box):
+        """Write checkpoint of cash box and accounts touched so far
+
+        Args:
+            cash_box (CashBox): Atm's cashbox
+        """
+        self.journal.checkpoint(cash_box, list(self.touched_accounts.values()))
+
+
+class MeteredUpdateTransactionCommand(IUpdateTransactionCommand):
+    """Transaction command counting the transactions of another one into `Metrics`
+
+    - `atm_transactions_total{kind, result}` kind is `deposit`, `withdrawal` or `adjustment`,
+      result is `ok` or the `ErrorCode` name the transaction was rejected with
+
+    - `atm_transaction_amount_total{kind}` cash moved by applied transactions
+    """
+
+    def __init__(self, command, metrics):
+        """
+        Args:
+            command (IUpdateTransactionCommand): Command doing the transactions
+            metrics (Metrics): Destination of counts
+        """
+        self.command = command
+        self.metrics = metrics
+
+    def execute(self, bank_system, cash_box, account, offset, key=None):
+        """Same as `execute` of the command
+
+        Raises:
+            ValueError: Raised by the command
+            RuntimeError: Raised by the command
+        """
+        kind = 'deposit' if offset > 0 else 'withdrawal'
+        try:
+            result = self.command.execute(bank_system, cash_box, account, offset, key)
+        except (ValueError, RuntimeError) as e:
+            self.metrics.inc('atm_transactions_total', (('kind', kind), ('result', error_code_label(e))))
+            raise
+        self.metrics.inc('atm_transactions_total', (('kind', kind), ('result', 'ok')))
+        self.metrics.inc('atm_transaction_amount_total', (('kind', kind),), abs(offset))
+        return result
+
+    def adjust_balance(self, bank_system, cash_box, account, offset, key=None):
+        """Same as `adjust_balance` of the command"""
+        self.command.adjust_balance(bank_system, cash_box, account, offset, key)
+        self.metrics.inc('atm_transactions_total', (('kind', 'adjustment'), ('result', 'ok')))
+        self.metrics.inc('atm_transaction_amount_total', (('kind', 'adjustment'),), abs(offset))
+
+
+class DedupingUpdateTransactionCommand(IUpdateTransactionCommand):
+    """Transaction command in front of another one, a replayed idempotency key gets the outcome of its first run
+
+    - Outcomes are kept by key in an LRU with expiry, at most `capacity` keys for `ttl` seconds each,
+      lookup and insertion are O(1)
+
+    - Applied transactions and rejections by the rules (`ValueError`) are kept. Other errors e.g.
+      bank timeouts are not, so a retry runs the transaction again
+
+    - A replay arriving while the first run is in progress waits for its outcome
+
+    - A replay must be the same transaction, same account number and offset,
+      otherwise it raises `ErrorCode.TRANSACTION_KEY_IS_REUSED`
+
+    - Calls without key are passed through
+    """
+
+    def __init__(self, command, capacity=100000, ttl=600.0, clock=time.monotonic):
+        """
+        Args:
+            command (IUpdateTransactionCommand): Command doing the transactions
+            capacity (int): Max number of keys kept
+            ttl (float): Seconds a key is kept
+            clock (Callable[[], float]): Clock returning seconds
+        """
+        self.command = command
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.replays = 0
+        # key -> (expiry, account number, offset, result, error or None)
+        self.__outcomes = OrderedDict()  # type: OrderedDict[str, tuple]
+        # key -> event set when the first run ends, created only when a replay waits
+        self.__in_flight = {}  # type: dict[str, Optional[threading.Event]]
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__outcomes)
+
+    def execute(self, bank_system, cash_box, account, offset, key=None):
+        """Same as `execute` of the command, once for each key
+
+        Raises:
+            ValueError: Raised by the command, again for a replay of it, or with
+                `ErrorCode.TRANSACTION_KEY_IS_REUSED` if the key was used by another transaction
+            RuntimeError: Raised by the command
+        """
+        if key is None:
+            return self.command.execute(bank_system, cash_box, account, offset)
+        return self.__once(key, account.account_number, offset,
+                           self.command.execute, bank_system, cash_box, account, offset, key)
+
+    def adjust_balance(self, bank_system, cash_box, account, offset, key=None):
+        """Same as `adjust_balance` of the command, once for each key"""
+        if key is None:
+            return self.command.adjust_balance(bank_system, cash_box, account, offset)
+        return self.__once(key, account.account_number, offset,
+                           self.command.adjust_balance, bank_system, cash_box, account, offset, key)
+
+    def __once(self, key, account_number, offset, method, *args):
+        outcomes = self.__outcomes
+        while True:
+            with self.__lock:
+                outcome = outcomes.get(key)
+                if outcome is not None and outcome[0] <= self.clock():
+                    del outcomes[key]
+                    outcome = None
+                if outcome is not None:
+                    outcomes.move_to_end(key)
+                    self.replays += 1
+                    break
+                in_flight = self.__in_flight
+                if key not in in_flight:
+                    in_flight[key] = None
+                    break
+                waiting = in_flight[key]
+                if waiting is None:
+                    waiting = in_flight[key] = threading.Event()
+            waiting.wait()
+        if outcome is not None:
+            if outcome[1] != account_number or outcome[2] != offset:
+                raise ValueError(ErrorCode.TRANSACTION_KEY_IS_REUSED)
+            if outcome[4] is not None:
+                raise outcome[4]
+            return outcome[3]
+        result = error = None
+        kept = False
+        try:
+            result = method(*args)
+            kept = True
+            return result
         except ValueError as e:
-            cash_box.cash = old_cash_box_cash
-            account.balance = old_account_balance
-            raise ValueError(e)
+            error = e
+            kept = True
+            raise
+        finally:
+            with self.__lock:
+                if kept:
+                    self.__keep(key, account_number, offset, result, error)
+                waiting = self.__in_flight.pop(key)
+            if waiting is not None:
+                waiting.set()
+
+    def __keep(self, key, account_number, offset, result, error):
+        """Keep outcome, then drop expired keys from the oldest and the least recently used over capacity"""
+        outcomes = self.__outcomes
+        now = self.clock()
+        outcomes[key] = (now + self.ttl, account_number, offset, result, error)
+        while outcomes:
+            oldest = next(iter(outcomes.values()))
+            if oldest[0] > now and len(outcomes) <= self.capacity:
+                break
+            outcomes.popitem(last=False)
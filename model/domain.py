@@ -1,7 +1,11 @@
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
 
+if TYPE_CHECKING:
+    from model.cassettes import Cassettes
 
-@dataclass
+
+@dataclass(slots=True)
 class User:
     """User of card and account"""
     name: str  # type: str
@@ -9,7 +13,7 @@ class User:
     accounts: list  # type: list[Account]
 
 
-@dataclass
+@dataclass(slots=True)
 class Card:
     """Card class"""
     name: str  # type: str
@@ -17,24 +21,31 @@ class Card:
     card_holder: User  # type: User
 
 
-@dataclass
+@dataclass(slots=True)
 class Account:
     """Account
 
     - Originally stored in bank service, but currently let's assumed it stored in cache
+
+    - `version` is increased on every change of balance, see `OptimisticUpdateTransactionCommand`
     """
     name: str  # type: str
     account_number: str  # type: str
     balance: int  # type: int
+    version: int = 0  # type: int
 
 
-@dataclass
+@dataclass(slots=True)
 class CashBox:
     """Cash box
 
     Args:
         cash (int): Cash in the box
         limit (int): limit of cash box bin catalog
+        version (int): Increased on every change of cash
+        cassettes (Cassettes): Notes by denomination, any amount up to `cash` can be paid out if None
     """
     cash: int
     limit: int
+    version: int = 0
+    cassettes: Optional['Cassettes'] = None
@@ -0,0 +1,112 @@
+import threading
+import zlib
+
+# Scopes of instances
+SHARED = 'shared'
+PER_TERMINAL = 'terminal'
+PER_SHARD = 'shard'
+PER_THREAD = 'thread'
+
+
+class InstanceRegistry:
+    """Hands out transaction commands or bank systems created by a factory
+
+    - `scope` decides which terminals share an instance
+
+        `SHARED` one instance for every terminal
+
+        `PER_TERMINAL` a new instance for each terminal
+
+        `PER_SHARD` one instance for each of `shards` shards, terminals are spread by their id
+
+        `PER_THREAD` a proxy resolving to one instance for each calling thread
+
+    - Buffers, connections and locks of an instance are only contended by terminals sharing it
+
+    - The owner calls `close` of the registry, which closes every instance of every thread
+    """
+
+    def __init__(self, factory, scope=SHARED, shards=16):
+        """
+        Args:
+            factory (Callable[[], object]): Class or factory creating an instance
+            scope (str): One of `SHARED`, `PER_TERMINAL`, `PER_SHARD` and `PER_THREAD`
+            shards (int): Number of shards of `PER_SHARD`
+        """
+        if scope not in (SHARED, PER_TERMINAL, PER_SHARD, PER_THREAD):
+            raise ValueError(scope)
+        self.factory = factory
+        self.scope = scope
+        self.shards = shards
+        self.__instances = []  # type: list
+        self.__by_shard = {}  # type: dict[int, object]
+        self.__lock = threading.RLock()
+        self.__per_thread = _PerThread(self.create) if scope == PER_THREAD else None
+
+    def get(self, terminal_id=None):
+        """Return instance for terminal
+
+        Args:
+            terminal_id: Id of terminal, used by `PER_SHARD`
+
+        Returns:
+            object: Instance created by the factory, or a proxy of `PER_THREAD`
+        """
+        if self.scope == PER_TERMINAL:
+            return self.create()
+        if self.scope == PER_THREAD:
+            return self.__per_thread
+        shard = self.shard_of(terminal_id) if self.scope == PER_SHARD else 0
+        instance = self.__by_shard.get(shard)
+        if instance is None:
+            with self.__lock:
+                instance = self.__by_shard.get(shard)
+                if instance is None:
+                    instance = self.__by_shard[shard] = self.create()
+        return instance
+
+    def shard_of(self, terminal_id):
+        """Return shard number of terminal, stable across processes"""
+        return zlib.crc32(str(terminal_id).encode()) % self.shards
+
+    def create(self):
+        """Create and record new instance"""
+        instance = self.factory()
+        with self.__lock:
+            self.__instances.append(instance)
+        return instance
+
+    def instances(self):
+        """Return every instance created so far"""
+        with self.__lock:
+            return list(self.__instances)
+
+    def close(self):
+        """Call `close` of every instance having it"""
+        for instance in self.instances():
+            close = getattr(instance, 'close', None)
+            if close:
+                close()
+
+
+class _PerThread:
+    """Proxy forwarding attribute access to the instance of the calling thread
+
+    * It is not an instance of the proxied interface, callers must not rely on `isinstance`
+
+    * `close` of the proxy closes only the instance of the calling thread, close the registry instead
+    """
+
+    __slots__ = ('_create', '_local')
+
+    def __init__(self, create):
+        self._create = create
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        local = self._local
+        try:
+            instance = local.instance
+        except AttributeError:
+            instance = local.instance = self._create()
+        return getattr(instance, name)
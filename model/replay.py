@@ -0,0 +1,147 @@
+import numpy as np
+
+from errors import ErrorCode
+
+_ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH = ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH.value
+_CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH = ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH.value
+_CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE = ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE.value
+
+
+class ReplayResult:
+    """Result of `replay`"""
+
+    __slots__ = ('accepted', 'errors', 'cash', 'balances')
+
+    def __init__(self, accepted, errors, cash, balances):
+        """
+        Args:
+            accepted (np.ndarray): True for each applied transaction
+            errors (np.ndarray): `ErrorCode` value of each rejected transaction, 0 if applied
+            cash (np.ndarray): Final cash by atm id
+            balances (np.ndarray): Final balance by account id
+        """
+        self.accepted = accepted
+        self.errors = errors
+        self.cash = cash
+        self.balances = balances
+
+
+def replay(atm_ids, account_ids, offsets, cash, limits, balances, window=4096):
+    """Apply transactions in order with the rules of `check_transaction`, whole windows at once
+
+    - Running cash and balance after each transaction are the grouped cumulative sums of offsets
+      over its atm and account, computed once, minus offsets rejected so far in the same group
+
+    - In a window, every transaction before the first one breaking a rule is applied as it is,
+      that one is rejected and the next window starts right after it. The window grows while no
+      rule is broken and shrinks around rejections. Where rejections are dense, the next 256
+      transactions are checked one by one instead
+
+    - Results are the same as calling `MockUpdateTransactionCommand.execute` one by one
+
+    Args:
+        atm_ids (np.ndarray): Atm id of each transaction, from 0 to len(cash) - 1
+        account_ids (np.ndarray): Account id of each transaction, from 0 to len(balances) - 1
+        offsets (np.ndarray): Amount to deposit or withdrawal of each transaction
+        cash (np.ndarray): Cash by atm id at the start
+        limits (np.ndarray): Limit of cash box by atm id
+        balances (np.ndarray): Balance by account id at the start
+        window (int): Number of transactions of the first window
+
+    Returns:
+        ReplayResult: Accepted and errors per transaction, final cash and balances
+    """
+    atm_ids = np.asarray(atm_ids, dtype=np.intp)
+    account_ids = np.asarray(account_ids, dtype=np.intp)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    limits = np.asarray(limits, dtype=np.int64)
+    cash = np.asarray(cash, dtype=np.int64)
+    balances = np.asarray(balances, dtype=np.int64)
+    n = len(offsets)
+    # cash and balance after each transaction if nothing were rejected
+    cash_after = cash[atm_ids] + _grouped_cumsum(atm_ids, offsets)
+    balance_after = balances[account_ids] + _grouped_cumsum(account_ids, offsets)
+    rejected_cash = np.zeros(len(cash), dtype=np.int64)
+    rejected_balances = np.zeros(len(balances), dtype=np.int64)
+    errors = np.zeros(n, dtype=np.int32)
+    state = (atm_ids, account_ids, offsets, limits, cash_after, balance_after, rejected_cash, rejected_balances, errors)
+    start, size = 0, window
+    while start < n:
+        end = min(start + size, n)
+        atm, account = atm_ids[start:end], account_ids[start:end]
+        running_cash = cash_after[start:end] - rejected_cash[atm]
+        running_balance = balance_after[start:end] - rejected_balances[account]
+        codes = np.where(
+            offsets[start:end] > 0,
+            np.where(running_cash > limits[atm], _CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE, 0),
+            np.where(running_balance < 0, _ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH,
+                     np.where(running_cash < 0, _CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH, 0)),
+        )
+        broken = np.flatnonzero(codes)
+        if not len(broken):
+            start = end
+            size *= 2
+            continue
+        applied = int(broken[0])
+        rejected = start + applied
+        errors[rejected] = codes[applied]
+        rejected_cash[atm_ids[rejected]] += offsets[rejected]
+        rejected_balances[account_ids[rejected]] += offsets[rejected]
+        start = rejected + 1
+        size = max(64, 2 * applied)
+        if applied < 16:
+            end = min(start + 256, n)
+            _replay_one_by_one(state, start, end)
+            start = end
+    return ReplayResult(
+        errors == 0, errors,
+        _final(cash, atm_ids, offsets, rejected_cash),
+        _final(balances, account_ids, offsets, rejected_balances),
+    )
+
+
+def _final(opening, groups, offsets, rejected):
+    """Opening value plus every offset of the group minus the rejected ones"""
+    totals = np.zeros(len(opening), dtype=np.int64)
+    np.add.at(totals, groups, offsets)
+    return opening + totals - rejected
+
+
+def _replay_one_by_one(state, start, end):
+    """Same rules as `replay` for transactions from start to end, on plain ints"""
+    atm_ids, account_ids, offsets, limits, cash_after, balance_after, rejected_cash, rejected_balances, errors = state
+    for i, atm, account, offset, c, b in zip(
+            range(start, end), atm_ids[start:end].tolist(), account_ids[start:end].tolist(),
+            offsets[start:end].tolist(), cash_after[start:end].tolist(), balance_after[start:end].tolist()):
+        c -= int(rejected_cash[atm])
+        b -= int(rejected_balances[account])
+        if offset > 0:
+            if c <= limits[atm]:
+                continue
+            errors[i] = _CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE
+        elif b < 0:
+            errors[i] = _ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH
+        elif c < 0:
+            errors[i] = _CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH
+        else:
+            continue
+        rejected_cash[atm] += offset
+        rejected_balances[account] += offset
+
+
+def _grouped_cumsum(groups, values):
+    """Running sum of values within each group, in the original order"""
+    # small ids sort by radix sort
+    order = np.argsort(groups.astype(np.min_scalar_type(groups.max(initial=0))), kind='stable')
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+    sums = np.cumsum(sorted_values)
+    first = np.empty(len(order), dtype=bool)
+    first[:1] = True
+    np.not_equal(sorted_groups[1:], sorted_groups[:-1], out=first[1:])
+    # sum before the first element of each group, carried over the group
+    before = np.where(first, sums - sorted_values, 0)
+    before = before[np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))]
+    running = np.empty_like(sums)
+    running[order] = sums - before
+    return running
@@ -0,0 +1,58 @@
+from typing import NamedTuple, Optional
+
+from errors import ErrorCode
+
+# Kinds of operation of `Atm.run_session`
+DEPOSIT = 'deposit'
+WITHDRAW = 'withdraw'
+BALANCE = 'balance'
+
+
+class OperationResult(NamedTuple):
+    """Result of one operation of `Atm.run_session`"""
+    kind: str  # type: str
+    account_index: int  # type: int
+    amount: int  # type: int
+    balance: Optional[int]  # type: Optional[int]  # balance after the operation, None if not selected
+    error: Optional[Exception]  # type: Optional[Exception]
+
+
+class SessionResult(NamedTuple):
+    """Result of `Atm.run_session`
+
+    * `error` is the error that ended the session early, e.g. `ErrorCode.PIN_IS_NOT_MATCHED`.
+      Operations after it are not in `operations`
+    """
+    authorized: bool  # type: bool
+    error: Optional[Exception]  # type: Optional[Exception]
+    operations: tuple  # type: tuple[OperationResult, ...]
+
+
+def validate_plan(operations):
+    """Check every operation before the session starts
+
+    Args:
+        operations (Iterable[tuple]): `(DEPOSIT, account_index, amount)`, `(WITHDRAW, account_index, amount)`
+            or `(BALANCE, account_index)`
+
+    Returns:
+        tuple[tuple[str, int, int], ...]: Kind, account index and amount of each, amount of `BALANCE` is 0
+
+    Raises:
+        ValueError: Raised if an operation is malformed, with `ErrorCode.AMOUNT_MUST_BE_POSITIVE` for a negative amount
+    """
+    plan = []
+    for operation in operations:
+        kind, index, *amount = operation
+        if kind == BALANCE and not amount:
+            amount = 0
+        elif kind in (DEPOSIT, WITHDRAW) and len(amount) == 1:
+            amount, = amount
+        else:
+            raise ValueError('malformed operation %r' % (operation,))
+        if type(index) is not int or index < 0 or type(amount) is not int:
+            raise ValueError('malformed operation %r' % (operation,))
+        if amount < 0:
+            raise ValueError(ErrorCode.AMOUNT_MUST_BE_POSITIVE)
+        plan.append((kind, index, amount))
+    return tuple(plan)
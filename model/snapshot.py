@@ -0,0 +1,61 @@
+from typing import NamedTuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from model.domain import User, Card, Account
+
+
+class AccountSnapshot(NamedTuple):
+    """Read-only view of `Account` at one moment
+
+    - A tuple, so it has no `__dict__`, cannot be changed and is safe to be held by UI
+    """
+    name: str  # type: str
+    account_number: str  # type: str
+    balance: int  # type: int
+    version: int  # type: int
+
+    @classmethod
+    def of(cls, account):
+        """
+        Args:
+            account (Account): Account to be viewed
+        """
+        return cls(account.name, account.account_number, account.balance, account.version)
+
+
+class CardSnapshot(NamedTuple):
+    """Read-only view of `Card`
+
+    * The holder is kept by name to cut the `User` - `Card` cycle, see `UserSnapshot` for the holder
+    """
+    name: str  # type: str
+    card_number: str  # type: str
+    card_holder_name: str  # type: str
+
+    @classmethod
+    def of(cls, card):
+        """
+        Args:
+            card (Card): Card to be viewed
+        """
+        return cls(card.name, card.card_number, card.card_holder.name)
+
+
+class UserSnapshot(NamedTuple):
+    """Read-only view of `User` with its cards and accounts"""
+    name: str  # type: str
+    cards: tuple  # type: tuple[CardSnapshot, ...]
+    accounts: tuple  # type: tuple[AccountSnapshot, ...]
+
+    @classmethod
+    def of(cls, user):
+        """
+        Args:
+            user (User): User to be viewed
+        """
+        name = user.name
+        return cls(
+            name,
+            tuple([CardSnapshot(card.name, card.card_number, name) for card in user.cards]),
+            tuple([AccountSnapshot.of(account) for account in user.accounts]),
+        )
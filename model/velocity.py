@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+
+from errors import ErrorCode
+
+
+class RollingSums:
+    """Sums by key over a sliding window of time buckets
+
+    - The window is split into `buckets` buckets of `window / buckets` seconds. A sum covers the
+      bucket of now and the `buckets - 1` before it, so it may include up to one bucket more than
+      the window, never less. That errs on the side of a limit
+
+    - A key holds `[total, tick, amount, tick, amount, ...]` of its buckets with an amount, oldest
+      first, so a key used once a day holds one bucket. Buckets falling out of the window are
+      dropped when the key is used, keys whose newest bucket fell out are dropped as time passes
+
+    - Every call is O(1) amortized: each bucket of a key is appended once and dropped once
+
+    - Not thread safe, see `VelocityLimits`
+    """
+
+    def __init__(self, window, buckets=24):
+        """
+        Args:
+            window (float): Length of window in seconds
+            buckets (int): Number of buckets in the window
+        """
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.__entries = {}  # type: dict[object, list[int]]
+        # (tick, keys whose newest bucket is tick), oldest first
+        self.__expiring = deque()  # type: deque[tuple[int, list]]
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def tick_of(self, now):
+        """Return bucket number of time"""
+        return int(now // self.width)
+
+    def add(self, key, amount, now):
+        """Add amount to the bucket of now
+
+        Args:
+            key: Key e.g. card number
+            amount (int): Amount to be added
+            now (float): Current time in seconds
+        """
+        tick = self.__advance(now)
+        entry = self.__entries.get(key)
+        if entry is None:
+            entry = self.__entries[key] = [0]
+        else:
+            self.__trim(entry, tick)
+        if len(entry) > 1 and entry[-2] == tick:
+            entry[-1] += amount
+        else:
+            entry.append(tick)
+            entry.append(amount)
+            self.__expiring[-1][1].append(key)
+        entry[0] += amount
+
+    def sum(self, key, now):
+        """Return sum of key over the window ending now"""
+        tick = self.__advance(now)
+        entry = self.__entries.get(key)
+        if entry is None:
+            return 0
+        self.__trim(entry, tick)
+        return entry[0]
+
+    def cancel(self, key, amount, at, now):
+        """Take amount added at time `at` out again, nothing is done if its bucket left the window
+
+        Args:
+            key: Key e.g. card number
+            amount (int): Amount added
+            at (float): Time passed to `add`
+            now (float): Current time in seconds
+        """
+        self.__advance(now)
+        entry = self.__entries.get(key)
+        tick = self.tick_of(at)
+        if entry is None:
+            return
+        for i in range(1, len(entry), 2):
+            if entry[i] == tick:
+                entry[i + 1] -= amount
+                entry[0] -= amount
+                return
+
+    def __advance(self, now):
+        """Drop keys whose newest bucket left the window, then return tick of now"""
+        tick = self.tick_of(now)
+        horizon = tick - self.buckets
+        expiring, entries = self.__expiring, self.__entries
+        while expiring and expiring[0][0] <= horizon:
+            for key in expiring.popleft()[1]:
+                entry = entries.get(key)
+                if entry is not None and entry[-2] <= horizon:
+                    del entries[key]
+        if not expiring or expiring[-1][0] != tick:
+            expiring.append((tick, []))
+        # every bucket opened in this tick shares one int
+        return expiring[-1][0]
+
+    def __trim(self, entry, tick):
+        """Drop buckets of entry that left the window"""
+        horizon = tick - self.buckets
+        i = 1
+        while i < len(entry) and entry[i] <= horizon:
+            entry[0] -= entry[i + 1]
+            i += 2
+        if i > 1:
+            del entry[1:i]
+
+
+class VelocityLimits:
+    """Limits of cash withdrawn per card and per account over sliding time windows
+
+    - Shared by every terminal, so withdrawals at any terminal count. `check` answers whether an
+      amount is still allowed, `withdraw` checks and records it at once under a lock, so two terminals
+      cannot both take the last allowance
+
+    - Each limit is a window in seconds and the most cash withdrawn in it, e.g.
+      `card_limits=((3600, 500), (86400, 1000))` is 500 an hour and 1000 a day for each card
+
+    - Memory is bounded by the cards and accounts used within the longest window, see
+      `bench.velocity_bench` for the size of a key and the cost of a withdrawal
+    """
+
+    def __init__(self, card_limits=(), account_limits=(), buckets=24, clock=time.monotonic):
+        """
+        Args:
+            card_limits (Iterable[tuple[float, int]]): Window in seconds and limit for each card
+            account_limits (Iterable[tuple[float, int]]): Window in seconds and limit for each account
+            buckets (int): Number of buckets of each window
+            clock (Callable[[], float]): Clock returning seconds
+        """
+        self.card_limits = tuple((RollingSums(window, buckets), limit) for window, limit in card_limits)
+        self.account_limits = tuple((RollingSums(window, buckets), limit) for window, limit in account_limits)
+        self.clock = clock
+        self.__lock = threading.Lock()
+
+    def check(self, card_number, account_number, amount):
+        """Check amount can be withdrawn
+
+        Args:
+            card_number (str): Number of card
+            account_number (str): Number of account
+            amount (int): Amount to withdraw
+
+        Raises:
+            ValueError: Raised with `ErrorCode.CARD_WITHDRAWAL_LIMIT_EXCEEDED` or
+                `ErrorCode.ACCOUNT_WITHDRAWAL_LIMIT_EXCEEDED`
+        """
+        with self.__lock:
+            self.__check(card_number, account_number, amount, self.clock())
+
+    def withdraw(self, card_number, account_number, amount):
+        """Check amount can be withdrawn, then record it
+
+        Returns:
+            float: Time of the withdrawal, to be passed to `cancel`
+
+        Raises:
+            ValueError: Raised like `check`, nothing is recorded
+        """
+        with self.__lock:
+            now = self.clock()
+            self.__check(card_number, account_number, amount, now)
+            for sums, _ in self.card_limits:
+                sums.add(card_number, amount, now)
+            for sums, _ in self.account_limits:
+                sums.add(account_number, amount, now)
+            return now
+
+    def cancel(self, card_number, account_number, amount, at):
+        """Give back a withdrawal that was not made, e.g. the transaction failed
+
+        Args:
+            card_number (str): Number of card
+            account_number (str): Number of account
+            amount (int): Amount withdrawn
+            at (float): Result of `withdraw`
+        """
+        with self.__lock:
+            now = self.clock()
+            for sums, _ in self.card_limits:
+                sums.cancel(card_number, amount, at, now)
+            for sums, _ in self.account_limits:
+                sums.cancel(account_number, amount, at, now)
+
+    def __check(self, card_number, account_number, amount, now):
+        for sums, limit in self.card_limits:
+            if sums.sum(card_number, now) + amount > limit:
+                raise ValueError(ErrorCode.CARD_WITHDRAWAL_LIMIT_EXCEEDED)
+        for sums, limit in self.account_limits:
+            if sums.sum(account_number, now) + amount > limit:
+                raise ValueError(ErrorCode.ACCOUNT_WITHDRAWAL_LIMIT_EXCEEDED)
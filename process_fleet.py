@@ -0,0 +1,224 @@
+import multiprocessing
+import os
+import queue
+import zlib
+from typing import TYPE_CHECKING
+
+from fleet import AtmFleet
+from infra.shared_cash import SharedCashTable
+from model.cassettes import Cassettes
+from model.session import validate_plan
+
+if TYPE_CHECKING:
+    from typing import Callable, Optional
+    from model.domain import Card, CashBox
+    from model.session import SessionResult
+
+
+class ProcessFleet:
+    """Terminals spread over worker processes, so sessions are not limited by one interpreter lock
+
+    - Each terminal belongs to the worker `worker_of(terminal_id)`, a crc32 of its id like
+      `InstanceRegistry.shard_of`. Every worker hosts its terminals in its own `AtmFleet`
+
+    - Cash and limit of every terminal, and the cash of the whole fleet, are kept in a
+      `SharedCashTable`, so `cash_levels` and `total_cash` read shared memory without asking workers.
+      Cassettes of a cash box are copied to the worker of its terminal, which plans its withdrawals
+
+    - `submit` queues a session for the worker of the terminal. Sessions are sent in batches of
+      `batch_size`, results come back in one message per batch, see `drain`
+
+    - Workers build their own bank system, transaction command and cards from the factories, so
+      these must be picklable when processes are spawned. Balances changed in one worker are not
+      seen by others unless the bank system is shared, e.g. `SocketBankSystem`
+
+    - Usage::
+
+        with ProcessFleet(cash_boxes, cards, workers=4) as fleet:
+            for terminal_id, card_number, pin, operations in sessions:
+                fleet.submit(terminal_id, card_number, pin, operations)
+            results = fleet.drain()
+
+    - Measured with `python -m bench.process_fleet_bench`, see there
+    """
+
+    def __init__(self, cash_boxes, cards, workers=None, bank_system=None, update_transaction=None,
+                 batch_size=64, mp_context=None):
+        """
+        Args:
+            cash_boxes (dict[object, CashBox]): Initial cash box by terminal id
+            cards (Callable[[], dict[str, Card]]): Factory of cards by card number, called in each worker
+            workers (int): Number of worker processes, the number of CPUs by default
+            bank_system (Callable[[], IBankSystem]): Factory of bank system of each worker, Mock by default
+            update_transaction (Callable[[], IUpdateTransactionCommand]): Factory of transaction command of
+                each worker, Mock by default
+            batch_size (int): Sessions sent to a worker in one message
+            mp_context: `multiprocessing` context, the default one if None
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.cards = cards
+        self.bank_system = bank_system
+        self.update_transaction = update_transaction
+        self.__mp = mp_context or multiprocessing.get_context()
+        self.__slots = {terminal_id: slot for slot, terminal_id in enumerate(cash_boxes)}  # type: dict[object, int]
+        self.__cash_boxes = cash_boxes
+        self.__table = None  # type: Optional[SharedCashTable]
+        self.__processes = []  # type: list[multiprocessing.Process]
+        self.__inboxes = []  # type: list[multiprocessing.Queue]
+        self.__outbox = None  # type: Optional[multiprocessing.Queue]
+        self.__batches = [[] for _ in range(self.workers)]  # type: list[list[tuple]]
+        self.__waiting = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def worker_of(self, terminal_id):
+        """Return index of worker hosting terminal, stable across processes"""
+        return zlib.crc32(str(terminal_id).encode()) % self.workers
+
+    def start(self):
+        """Create the shared cash table and start the workers"""
+        table = self.__table = SharedCashTable(len(self.__slots), self.workers)
+        assigned = [[] for _ in range(self.workers)]
+        for terminal_id, slot in self.__slots.items():
+            worker = self.worker_of(terminal_id)
+            cash_box = self.__cash_boxes[terminal_id]
+            table.set(slot, worker, cash_box.cash, cash_box.limit)
+            cassettes = cash_box.cassettes
+            notes = None if cassettes is None else (cassettes.notes(), cassettes.max_notes)
+            assigned[worker].append((terminal_id, slot, notes))
+        self.__outbox = self.__mp.Queue()
+        for worker in range(self.workers):
+            inbox = self.__mp.Queue()
+            process = self.__mp.Process(
+                target=_serve, name='atm-worker-%d' % worker, daemon=True,
+                args=(worker, table.name, table.slots, table.writers, assigned[worker], self.cards,
+                      self.bank_system, self.update_transaction, inbox, self.__outbox))
+            process.start()
+            self.__inboxes.append(inbox)
+            self.__processes.append(process)
+
+    def submit(self, terminal_id, card_number, pin, operations):
+        """Queue a session for the worker of terminal, see `Atm.run_session`
+
+        Args:
+            terminal_id: Id of terminal
+            card_number (str): Number of a card returned by the cards factory
+            pin (str): Personal identification number
+            operations (Iterable[tuple]): Operations of the session, see `model.session`
+
+        Raises:
+            KeyError: Raised if the terminal is not in the fleet
+            ValueError: Raised if the plan is not valid, nothing is queued
+        """
+        if terminal_id not in self.__slots:
+            raise KeyError(terminal_id)
+        worker = self.worker_of(terminal_id)
+        batch = self.__batches[worker]
+        batch.append((terminal_id, card_number, pin, validate_plan(operations)))
+        self.__waiting += 1
+        if len(batch) >= self.batch_size:
+            self.__send(worker)
+
+    def flush(self):
+        """Send sessions waiting for their batch to fill"""
+        for worker in range(self.workers):
+            if self.__batches[worker]:
+                self.__send(worker)
+
+    def drain(self):
+        """Send every queued session and wait for all of them
+
+        - Results of a worker are in the order its sessions were submitted, workers are interleaved
+
+        Returns:
+            list[tuple[object, SessionResult | Exception]]: Terminal id and result of each session, or the
+                exception raised for it e.g. `KeyError` of an unknown card number
+
+        Raises:
+            RuntimeError: Raised if a worker exited
+        """
+        self.flush()
+        results = []
+        while self.__waiting:
+            try:
+                batch = self.__outbox.get(timeout=0.1)
+            except queue.Empty:
+                for process in self.__processes:
+                    if not process.is_alive():
+                        raise RuntimeError('%s exited with %s' % (process.name, process.exitcode))
+                continue
+            self.__waiting -= len(batch)
+            results.extend(batch)
+        return results
+
+    def cash_levels(self):
+        """Return cash and limit of the cash box of each terminal, read from shared memory
+
+        Returns:
+            dict[object, tuple[int, int]]: Cash and limit by terminal id
+        """
+        table = self.__table
+        return {terminal_id: (table.cash(slot), table.limit(slot)) for terminal_id, slot in self.__slots.items()}
+
+    def total_cash(self):
+        """Return cash of every terminal, read from shared memory"""
+        return self.__table.total()
+
+    def close(self):
+        """Finish queued sessions, stop the workers and free the shared cash table
+
+        * Results not drained are dropped
+        """
+        if self.__table is None:
+            return
+        self.flush()
+        for inbox in self.__inboxes:
+            inbox.put(None)
+        while any(process.is_alive() for process in self.__processes):
+            try:
+                self.__outbox.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for process in self.__processes:
+            process.join()
+        self.__waiting = 0
+        self.__processes, self.__inboxes = [], []
+        self.__table.close()
+        self.__table.unlink()
+        self.__table = None
+
+    def __send(self, worker):
+        self.__inboxes[worker].put(self.__batches[worker])
+        self.__batches[worker] = []
+
+
+def _serve(worker, name, slots, writers, assigned, cards, bank_system, update_transaction, inbox, outbox):
+    """Main of a worker process, runs batches of sessions until it receives None"""
+    table = SharedCashTable(slots, writers, name)
+    fleet = AtmFleet(bank_system, update_transaction)
+    try:
+        for terminal_id, slot, notes in assigned:
+            fleet.add(terminal_id, table.cash_box(slot, worker, None if notes is None else Cassettes(*notes)))
+        cards = cards()
+        terminals = fleet.terminals
+        while True:
+            batch = inbox.get()
+            if batch is None:
+                break
+            results = []
+            for terminal_id, card_number, pin, plan in batch:
+                try:
+                    result = terminals[terminal_id].run_session(cards[card_number], pin, plan)
+                except Exception as e:
+                    result = e
+                results.append((terminal_id, result))
+            outbox.put(results)
+    finally:
+        fleet.close()
+        table.close()
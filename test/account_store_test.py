@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from atm import Atm, AtmDisplayingBalance
+from model.account_store import AccountStore
+from model.command import OptimisticUpdateTransactionCommand
+from model.domain import Card, CashBox, User
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.store = AccountStore()
+        self.store.add('user', '0001', 2000)
+        self.store.add('user', '0002', 500)
+
+    def test_row_reads_and_writes_columns(self):
+        # when
+        account = self.store.find('0002')
+        account.balance += 100
+        account.version += 1
+
+        # then
+        self.assertEqual(('user', '0002', 600, 1), (account.name, account.account_number, account.balance,
+                                                    account.version))
+        self.assertEqual([2000, 600], list(self.store.balances))
+
+    def test_one_live_proxy_per_row(self):
+        # when
+        account = self.store.get(0)
+
+        # then
+        self.assertIs(account, self.store.find('0001'))
+        self.assertEqual(2 * (8 + 8 + 16 + 16), self.store.nbytes())
+
+    def test_errors(self):
+        # when, then
+        with self.assertRaises(KeyError):
+            self.store.add('user', '0001', 0)
+        with self.assertRaises(KeyError):
+            self.store.find('0003')
+        with self.assertRaises(IndexError):
+            self.store.get(2)
+        with self.assertRaises(ValueError):
+            self.store.add('user', '0' * 17, 0)
+
+    def test_rejected_add_leaves_columns_in_step(self):
+        # given
+        with self.assertRaises(ValueError):
+            self.store.add('u' * 17, '0003', 0)
+
+        # when
+        self.store.add('user', '0003', 300)
+
+        # then
+        account = self.store.find('0003')
+        self.assertEqual(('0003', 'user', 300), (account.account_number, account.name, account.balance))
+        self.assertEqual(3 * 16, len(self.store.numbers))
+
+    def test_atm_transaction_on_row(self):
+        # given
+        account = self.store.find('0001')
+        atm = Atm(CashBox(cash=1000, limit=5000), update_transaction=OptimisticUpdateTransactionCommand)
+        atm.insert_card(Card('user', '1234', User('user', [], [account])))
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_withdraw()
+        atm.enter_withdrawal_amount(300)
+
+        # when
+        atm.take_out_cash(300)
+
+        # then
+        self.assertEqual(AtmDisplayingBalance.get_name(), atm.get_current_state_name())
+        self.assertEqual((1700, 1), (self.store.balances[0], self.store.versions[0]))
+        self.assertEqual(1700, atm.get_selected_account().balance)
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from atm import AsyncAtm, AtmAuthorized, AtmDisplayingBalance, AtmExit, AtmWait
+from infra.bank_api import AsyncIBankSystem, AsyncBankSystemAdapter, MockBankSystem1
+from model.domain import CashBox
+
+
+class SlowBankSystem(AsyncIBankSystem):
+    async def validate_pin(self, card_number, pin):
+        await asyncio.sleep(0.05)
+        return pin == '1'
+
+    async def get_accounts(self, card):
+        await asyncio.sleep(0.05)
+        return card.card_holder.accounts
+
+
+def make_card(balance):
+    card = MagicMock()
+    card.card_holder = MagicMock()
+    card.card_holder.accounts = [MagicMock()]
+    card.card_holder.accounts[0].balance = balance
+    return card
+
+
+class Unittest(TestCase):
+    def test_session(self):
+        async def session():
+            # given
+            atm = AsyncAtm(CashBox(cash=1000, limit=5000))
+            await atm.insert_card(make_card(2000))
+            await atm.enter_pin('1')
+            self.assertEqual(AtmAuthorized.get_name(), atm.get_current_state_name())
+
+            # when
+            await atm.select_account(0)
+            await atm.select_withdraw()
+            await atm.enter_withdrawal_amount(100)
+            await atm.take_out_cash(100)
+
+            # then
+            self.assertEqual(AtmDisplayingBalance.get_name(), atm.get_current_state_name())
+            self.assertEqual(1900, atm.get_selected_account().balance)
+
+        asyncio.run(session())
+
+    def test_invalid_pin(self):
+        async def session():
+            # given
+            atm = AsyncAtm(CashBox(cash=1000, limit=5000), bank_system=lambda: AsyncBankSystemAdapter(
+                MockBankSystem1()))
+            await atm.insert_card(make_card(2000))
+
+            # when
+            await atm.enter_pin('2')
+
+            # then
+            self.assertEqual(AtmExit.get_name(), atm.get_current_state_name())
+            await atm.take_out_card()
+            self.assertEqual(AtmWait.get_name(), atm.get_current_state_name())
+
+        asyncio.run(session())
+
+    def test_sessions_run_concurrently(self):
+        async def session():
+            atm = AsyncAtm(CashBox(cash=1000, limit=5000), bank_system=SlowBankSystem)
+            await atm.insert_card(make_card(2000))
+            await atm.enter_pin('1')
+            return atm.get_current_state_name()
+
+        async def sessions():
+            return await asyncio.gather(*(session() for _ in range(1000)))
+
+        # when
+        started = time.perf_counter()
+        names = asyncio.run(sessions())
+
+        # then, 1000 sessions wait for the bank 0.1 seconds each
+        self.assertLess(time.perf_counter() - started, 10)
+        self.assertEqual([AtmAuthorized.get_name()] * 1000, names)
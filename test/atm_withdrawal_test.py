@@ -55,3 +55,15 @@ class Unittest(TestCase):
             AtmExit.get_name(),
             self.atm.get_current_state_name()
         )
+
+    def test_exit_before_taking_cash_leaves_balance(self):
+        # given
+        self.atm.select_withdraw()
+        self.atm.enter_withdrawal_amount(100)
+
+        # when
+        self.atm.exit()
+
+        # then
+        self.assertEqual(AtmExit.get_name(), self.atm.get_current_state_name())
+        self.assertEqual(2000, self.atm.get_selected_account().balance)
@@ -0,0 +1,91 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from atm import Atm
+from infra.bank_api import MockBankSystem1
+from infra.bank_cache import CachingBankSystem
+from model.domain import Account, Card, CashBox, User
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.now = 0
+        self.bank = MockBankSystem1()
+        self.bank.get_accounts = MagicMock(side_effect=lambda card: list(card.card_holder.accounts))
+        self.cache = CachingBankSystem(self.bank, capacity=2, ttl=10, clock=lambda: self.now)
+        self.user = User('user', [], [Account('user', '0001', 2000)])
+        self.card = Card('user', '1234', self.user)
+
+    def test_session_fetches_once(self):
+        # given
+        atm = Atm(CashBox(cash=1000, limit=5000), bank_system=lambda: self.cache)
+        atm.insert_card(self.card)
+        atm.enter_pin('1')
+
+        # when
+        atm.display_account_list()
+        atm.select_account(0)
+        atm.back()
+
+        # then
+        self.assertEqual(1, self.bank.get_accounts.call_count)
+        self.assertEqual((2, 1), (self.cache.hits, self.cache.misses))
+
+    def test_transaction_invalidates(self):
+        # given
+        atm = Atm(CashBox(cash=1000, limit=5000), bank_system=lambda: self.cache)
+        atm.insert_card(self.card)
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_deposit()
+
+        # when
+        atm.put_in_cash(100)
+        atm.back()
+
+        # then
+        self.assertEqual(2, self.bank.get_accounts.call_count)
+        self.assertEqual(2100, atm.display_account_list()[0].balance)
+
+    def test_ttl(self):
+        # when
+        self.cache.get_accounts(self.card)
+        self.now = 11
+        self.cache.get_accounts(self.card)
+
+        # then
+        self.assertEqual(2, self.cache.misses)
+
+    def test_lru(self):
+        # given
+        cards = [Card('user', str(i), self.user) for i in range(3)]
+
+        # when
+        for card in cards + cards[2:]:
+            self.cache.get_accounts(card)
+
+        # then
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual((1, 3), (self.cache.hits, self.cache.misses))
+
+    def test_invalidation_during_fetch(self):
+        # given
+        account = self.user.accounts[0]
+
+        def slow_get_accounts(card):
+            accounts = [Account(a.name, a.account_number, a.balance) for a in card.card_holder.accounts]
+            # a transaction commits while the answer is on the wire
+            account.balance -= 50
+            self.cache.invalidate_account(account.account_number)
+            return accounts
+        self.bank.get_accounts = MagicMock(side_effect=slow_get_accounts)
+
+        # when
+        self.cache.get_accounts(self.card)
+        self.bank.get_accounts = MagicMock(side_effect=lambda card: list(card.card_holder.accounts))
+        accounts = self.cache.get_accounts(self.card)
+
+        # then
+        self.assertEqual(1950, accounts[0].balance)
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
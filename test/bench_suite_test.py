@@ -0,0 +1,27 @@
+from unittest import TestCase
+
+from bench.suite import CASES, compare, run
+
+
+class Unittest(TestCase):
+    def test_every_case_runs(self):
+        # when
+        for factory in CASES.values():
+            factory()()
+        results = run('session.balance', repeat=1, min_time=0)
+
+        # then
+        self.assertEqual({'calibration', 'session.balance'}, set(results))
+        self.assertTrue(all(ns > 0 for ns in results.values()))
+
+    def test_regression_is_relative_to_calibration(self):
+        # given
+        baseline = {'calibration': 100.0, 'a': 1000.0, 'b': 1000.0}
+
+        # when
+        slower_machine = compare({'calibration': 200.0, 'a': 2200.0, 'b': 2600.0}, baseline, 0.25)
+        new_case = compare({'calibration': 100.0, 'c': 10.0 ** 9}, baseline, 0.25)
+
+        # then
+        self.assertEqual({'b': (2000.0, 2600.0)}, slower_machine)
+        self.assertEqual({}, new_case)
@@ -0,0 +1,112 @@
+from unittest import TestCase
+
+from atm import Atm
+from errors import ErrorCode
+from infra.bank_api import MockBankSystem1
+from model.cassettes import Cassettes, load_notes
+from model.command import MockUpdateTransactionCommand, OptimisticUpdateTransactionCommand
+from model.domain import Account, Card, CashBox, User
+from model.session import DEPOSIT, WITHDRAW
+
+
+class CassettesTest(TestCase):
+    def test_fewest_notes(self):
+        # given
+        cassettes = Cassettes({100: 50, 50: 50, 20: 50, 10: 50})
+
+        # when, then
+        self.assertEqual((1, 1, 0, 1), cassettes.plan(160))
+        self.assertEqual((0, 1, 0, 1), cassettes.plan(60))
+        self.assertEqual((0, 0, 0, 0), cassettes.plan(0))
+
+    def test_counts_are_respected(self):
+        # given
+        cassettes = Cassettes({50: 1, 20: 10})
+
+        # when, then
+        self.assertEqual((0, 3), cassettes.plan(60))
+        self.assertEqual((1, 3), cassettes.plan(110))
+        self.assertEqual((0, 8), cassettes.plan(160))
+
+    def test_amount_that_cannot_be_made(self):
+        # given
+        cassettes = Cassettes({50: 10, 20: 10}, max_notes=5)
+
+        # when, then
+        for amount in (30, 15, 300, 2000):
+            with self.assertRaises(ValueError) as raised:
+                cassettes.plan(amount)
+            self.assertEqual(ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT, raised.exception.args[0])
+
+    def test_balanced_among_fewest_notes(self):
+        # given 40 is 30 + 10 or 20 + 20
+        cassettes = Cassettes({30: 5, 20: 100, 10: 100})
+
+        # when, then the cassette of 30 is the lowest
+        self.assertEqual((0, 2, 0), cassettes.plan(40))
+        cassettes.load(30, 200)
+        self.assertEqual((1, 0, 1), cassettes.plan(40))
+
+    def test_tables_follow_dispense_and_load(self):
+        # given
+        cassettes = Cassettes({50: 2, 20: 3})
+
+        # when
+        cassettes.dispense(cassettes.plan(100))
+
+        # then
+        self.assertEqual({50: 0, 20: 3}, cassettes.notes())
+        with self.assertRaises(ValueError):
+            cassettes.plan(50)
+        cassettes.load(50, 1)
+        self.assertEqual((1, 0), cassettes.plan(50))
+        self.assertEqual(110, cassettes.total)
+
+
+class WithdrawalTest(TestCase):
+    def setUp(self):
+        # given
+        self.cassettes = Cassettes({50: 10, 20: 10})
+        self.cash_box = CashBox(cash=700, limit=5000, cassettes=self.cassettes)
+        user = User('user', [], [])
+        user.accounts.append(Account('user', '0001', 1000))
+        self.card = Card('card', '1234', user)
+        user.cards.append(self.card)
+
+    def test_amount_that_cannot_be_made_is_rejected(self):
+        # when
+        result = Atm(self.cash_box).run_session(self.card, '1', [(WITHDRAW, 0, 30), (WITHDRAW, 0, 90)])
+
+        # then
+        self.assertEqual(ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT, result.operations[0].error.args[0])
+        self.assertEqual(1, len(result.operations))
+        self.assertEqual(700, self.cash_box.cash)
+
+    def test_withdrawal_takes_notes(self):
+        # when
+        result = Atm(self.cash_box).run_session(self.card, '1', [(WITHDRAW, 0, 90), (DEPOSIT, 0, 30)])
+
+        # then
+        self.assertEqual(1000 - 90 + 30, result.operations[-1].balance)
+        self.assertEqual({50: 9, 20: 8}, self.cassettes.notes())
+        self.assertEqual(700 - 90 + 30, self.cash_box.cash)
+
+    def test_commands_dispense(self):
+        # given
+        account = self.card.card_holder.accounts[0]
+
+        # when
+        notes = MockUpdateTransactionCommand().execute(MockBankSystem1(), self.cash_box, account, -100)
+        OptimisticUpdateTransactionCommand().execute(MockBankSystem1(), self.cash_box, account, -40)
+
+        # then
+        self.assertEqual((2, 0), notes)
+        self.assertEqual({50: 8, 20: 8}, self.cassettes.notes())
+
+    def test_load_notes(self):
+        # when
+        load_notes(self.cash_box, 20, 5)
+
+        # then
+        self.assertEqual(800, self.cash_box.cash)
+        self.assertEqual(15, self.cassettes.counts[1])
@@ -0,0 +1,180 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from atm import Atm
+from errors import ErrorCode
+from infra.bank_api import MockBankSystem1
+from infra.write_behind import DurableQueue, WriteBehindSync
+from model.command import (DedupingUpdateTransactionCommand, MockUpdateTransactionCommand,
+                           WriteBehindUpdateTransactionCommand)
+from model.domain import Account, Card, CashBox, User
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TimingOutCommand(MockUpdateTransactionCommand):
+    """Command failing like a bank timeout the first times"""
+
+    def __init__(self, timeouts):
+        self.timeouts = timeouts
+
+    def execute(self, bank_system, cash_box, account, offset, key=None):
+        if self.timeouts > 0:
+            self.timeouts -= 1
+            raise RuntimeError(ErrorCode.BANK_SYSTEM_TIMED_OUT)
+        super().execute(bank_system, cash_box, account, offset, key)
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.clock = Clock()
+        self.command = DedupingUpdateTransactionCommand(MockUpdateTransactionCommand(), capacity=3, ttl=10,
+                                                        clock=self.clock)
+        self.bank_system = MockBankSystem1()
+        self.cash_box = CashBox(cash=1000, limit=5000)
+        self.account = Account('user', '0001', 500)
+
+    def test_replay_is_applied_once(self):
+        # when
+        for _ in range(3):
+            self.command.execute(self.bank_system, self.cash_box, self.account, 100, 'k1')
+
+        # then
+        self.assertEqual((1100, 600), (self.cash_box.cash, self.account.balance))
+        self.assertEqual(2, self.command.replays)
+
+    def test_replay_of_rejection_is_rejected_again(self):
+        # given
+        with self.assertRaises(ValueError):
+            self.command.execute(self.bank_system, self.cash_box, self.account, -600, 'k1')
+        self.account.balance = 1000
+
+        # when
+        with self.assertRaises(ValueError) as raised:
+            self.command.execute(self.bank_system, self.cash_box, self.account, -600, 'k1')
+
+        # then
+        self.assertEqual((ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH,), raised.exception.args)
+        self.assertEqual(1000, self.account.balance)
+
+    def test_timeout_is_not_kept(self):
+        # given
+        command = DedupingUpdateTransactionCommand(TimingOutCommand(timeouts=1))
+        with self.assertRaises(RuntimeError):
+            command.execute(self.bank_system, self.cash_box, self.account, 100, 'k1')
+
+        # when
+        command.execute(self.bank_system, self.cash_box, self.account, 100, 'k1')
+        command.execute(self.bank_system, self.cash_box, self.account, 100, 'k1')
+
+        # then
+        self.assertEqual(600, self.account.balance)
+
+    def test_key_of_another_transaction(self):
+        # given
+        self.command.execute(self.bank_system, self.cash_box, self.account, 100, 'k1')
+
+        # when
+        with self.assertRaises(ValueError) as raised:
+            self.command.execute(self.bank_system, self.cash_box, self.account, 200, 'k1')
+
+        # then
+        self.assertEqual((ErrorCode.TRANSACTION_KEY_IS_REUSED,), raised.exception.args)
+        self.assertEqual(600, self.account.balance)
+
+    def test_keys_are_bounded_by_capacity_and_ttl(self):
+        # given
+        for key in ('k1', 'k2', 'k3'):
+            self.command.execute(self.bank_system, self.cash_box, self.account, 1, key)
+        self.command.execute(self.bank_system, self.cash_box, self.account, 1, 'k1')
+
+        # when
+        self.command.execute(self.bank_system, self.cash_box, self.account, 1, 'k4')
+        self.command.execute(self.bank_system, self.cash_box, self.account, 1, 'k2')
+        self.clock.now = 20
+        self.command.execute(self.bank_system, self.cash_box, self.account, 1, 'k1')
+        self.command.execute(self.bank_system, self.cash_box, self.account, 1, 'k5')
+
+        # then k2 was dropped as least recently used, k1 expired, expired keys are dropped on insertion
+        self.assertEqual(507, self.account.balance)
+        self.assertEqual(2, len(self.command))
+
+    def test_concurrent_replays_wait_for_first_run(self):
+        # given
+        class SlowCommand(MockUpdateTransactionCommand):
+            def execute(self, bank_system, cash_box, account, offset, key=None):
+                time.sleep(0.05)
+                super().execute(bank_system, cash_box, account, offset, key)
+
+        command = DedupingUpdateTransactionCommand(SlowCommand())
+
+        # when
+        threads = [threading.Thread(target=command.execute, args=(
+            self.bank_system, self.cash_box, self.account, 100, 'k1')) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        self.assertEqual(600, self.account.balance)
+        self.assertEqual(3, command.replays)
+
+
+class WriteBehindTest(TestCase):
+    def setUp(self):
+        # given
+        self.directory = tempfile.TemporaryDirectory()
+        queue = DurableQueue(os.path.join(self.directory.name, 'queue'), fsync=False)
+        self.sync = WriteBehindSync(queue, MockBankSystem1(), interval=60)
+        self.queue = queue
+
+    def tearDown(self):
+        self.sync.close()
+        self.directory.cleanup()
+
+    def test_retry_is_sent_once_with_the_key(self):
+        # given
+        command = DedupingUpdateTransactionCommand(WriteBehindUpdateTransactionCommand(self.sync))
+        cash_box, account = CashBox(cash=1000, limit=5000), Account('user', '0001', 500)
+
+        # when
+        command.execute(MockBankSystem1(), cash_box, account, -100, 'k1')
+        command.execute(MockBankSystem1(), cash_box, account, -100, 'k1')
+
+        # then
+        self.assertEqual(400, account.balance)
+        self.assertEqual([('k1', '0001', -100)], self.queue.peek(10))
+
+    def test_terminal_transactions_carry_keys(self):
+        # given
+        user = User('user', [], [Account('user', '0001', 500)])
+        card = Card('card', '1234', user)
+        atm = Atm(CashBox(cash=1000, limit=5000), update_transaction=lambda: WriteBehindUpdateTransactionCommand(self.sync))
+
+        # when
+        atm.insert_card(card)
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_withdraw()
+        atm.enter_withdrawal_amount(100)
+        atm.take_out_cash(100)
+        atm.back()
+        atm.select_account(0)
+        atm.select_deposit()
+        atm.put_in_cash(50)
+
+        # then
+        keys = [entry[0] for entry in self.queue.peek(10)]
+        self.assertEqual(2, len(set(keys)))
+        self.assertTrue(all(key and '-' in key for key in keys))
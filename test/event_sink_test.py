@@ -0,0 +1,57 @@
+import io
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from atm import Atm
+from infra.event_sink import BufferedEventSink, StreamEventSink, DEBUG, INFO, WARNING
+from model.domain import CashBox
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.card = MagicMock()
+        self.card.card_number = '1234'
+        self.card.card_holder = MagicMock()
+        self.card.card_holder.accounts = [MagicMock()]
+        self.card.card_holder.accounts[0].balance = 2000
+
+    def test_transition_is_written(self):
+        # given
+        stream = io.StringIO()
+        atm = Atm(CashBox(cash=1000, limit=5000), event_sink=StreamEventSink(INFO, stream))
+
+        # when
+        atm.insert_card(self.card)
+
+        # then
+        self.assertEqual('[AtmReady card=1234, balance=Not Selected]\n', stream.getvalue())
+
+    def test_level_gate(self):
+        # given
+        stream = io.StringIO()
+        atm = Atm(CashBox(cash=1000, limit=5000), event_sink=StreamEventSink(WARNING, stream))
+
+        # when
+        atm.insert_card(self.card)
+        atm.select_deposit()
+
+        # then
+        self.assertEqual('Action is not available in the current state [AtmReady]\n', stream.getvalue())
+
+    def test_buffered_sink_writes_on_close(self):
+        # given
+        stream = io.StringIO()
+        sink = BufferedEventSink(DEBUG, stream, interval=60)
+        atm = Atm(CashBox(cash=1000, limit=5000), event_sink=sink)
+
+        # when
+        atm.insert_card(self.card)
+        atm.enter_pin('1')
+        self.assertEqual('', stream.getvalue())
+        sink.close()
+
+        # then
+        lines = stream.getvalue().splitlines()
+        self.assertEqual('insert card 1234', lines[0])
+        self.assertIn('[AtmAuthorized card=1234, balance=Not Selected]', lines)
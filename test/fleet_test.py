@@ -0,0 +1,44 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from atm import AtmReady, AtmWait, AtmAuthorized
+from fleet import AtmFleet
+from model.domain import CashBox
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.fleet = AtmFleet()
+        self.atm1 = self.fleet.add('t1', CashBox(cash=1000, limit=5000))
+        self.atm2 = self.fleet.add('t2', CashBox(cash=1000, limit=5000))
+        card = MagicMock()
+        card.card_holder = MagicMock()
+        card.card_holder.accounts = [MagicMock()]
+        card.card_holder.accounts[0].balance = 2000
+        self.card = card
+
+    def test_terminals_are_independent(self):
+        # when
+        self.atm1.insert_card(self.card)
+        self.atm1.enter_pin('1')
+
+        # then
+        self.assertEqual(AtmAuthorized.get_name(), self.atm1.get_current_state_name())
+        self.assertEqual(AtmWait.get_name(), self.atm2.get_current_state_name())
+        self.assertEqual(
+            {AtmAuthorized.get_name(): 1, AtmWait.get_name(): 1},
+            self.fleet.count_by_state()
+        )
+
+    def test_get_drives_same_terminal(self):
+        # when
+        self.atm1.insert_card(self.card)
+
+        # then
+        self.assertEqual(AtmReady.get_name(), self.fleet.get('t1').get_current_state_name())
+
+    def test_duplicated_terminal_id(self):
+        # when, then
+        with self.assertRaises(KeyError):
+            self.fleet.add('t1', CashBox(cash=1000, limit=5000))
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from atm import Atm
+from infra.bank_api import MockBankSystem1
+from infra.journal import Journal, FSYNC_ALWAYS, FSYNC_GROUP, RECORD
+from model.command import JournaledUpdateTransactionCommand
+from model.domain import Account, Card, CashBox, User
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_recover_from_last_checkpoint(self):
+        # given
+        journal = Journal(self.path, segment_records=4, fsync=FSYNC_ALWAYS)
+        journal.append_transaction('0001', 100, 1100, 600)
+        journal.checkpoint(CashBox(1100, 5000), [Account('a', '0001', 600), Account('b', '0002', 50)])
+        journal.append_transaction('0002', -20, 1080, 30)
+        journal.append_transaction('0002', -30, 1050, 0)
+        journal.close()
+
+        # when
+        journal = Journal(self.path, segment_records=4)
+        cash_box, accounts = CashBox(0, 5000), [Account('a', '0001', 0), Account('b', '0002', 0)]
+        journal.restore(cash_box, accounts)
+
+        # then
+        self.assertEqual(1050, cash_box.cash)
+        self.assertEqual([600, 0], [account.balance for account in accounts])
+        self.assertLessEqual(len(journal.segments()), 3)
+
+    def test_torn_record_is_ignored(self):
+        # given
+        journal = Journal(self.path, fsync=FSYNC_ALWAYS)
+        journal.append_transaction('0001', 100, 1100, 600)
+        journal.append_transaction('0001', 100, 1200, 700)
+        journal.close()
+        path = os.path.join(self.path, 'journal-000001.seg')
+        with open(path, 'r+b') as f:
+            f.seek(RECORD.size + 20)
+            f.write(b'\xff')
+
+        # when
+        cash, balances = Journal(self.path).recover()
+
+        # then
+        self.assertEqual((1100, {'0001': 600}), (cash, balances))
+
+    def test_group_commit_from_threads(self):
+        # given
+        journal = Journal(self.path, segment_records=100, fsync=FSYNC_GROUP, group_size=8)
+
+        def append(i):
+            for j in range(50):
+                journal.append_transaction('%04d' % i, 1, j, j)
+
+        threads = [threading.Thread(target=append, args=(i,)) for i in range(4)]
+
+        # when
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        journal.close()
+
+        # then
+        self.assertEqual(list(range(1, 201)), [record[0] for record in Journal(self.path).records()])
+
+    def test_atm_transactions_are_journaled(self):
+        # given
+        journal = Journal(self.path, fsync=FSYNC_ALWAYS)
+        command = JournaledUpdateTransactionCommand(journal)
+        account = Account('user', '0001', 2000)
+        cash_box = CashBox(cash=1000, limit=5000)
+        atm = Atm(cash_box, update_transaction=lambda: command)
+        atm.insert_card(Card('user', '1234', User('user', [], [account])))
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_deposit()
+
+        # when
+        atm.put_in_cash(500)
+        journal.close()
+
+        # then
+        restored_cash_box, restored_account = CashBox(0, 5000), Account('user', '0001', 0)
+        Journal(self.path).restore(restored_cash_box, [restored_account])
+        self.assertEqual((1500, 2500), (restored_cash_box.cash, restored_account.balance))
+
+    def test_checkpoint_after_restart_keeps_accounts_touched_before(self):
+        # given account A touched before a restart
+        journal = Journal(self.path, segment_records=4, fsync=FSYNC_ALWAYS)
+        command = JournaledUpdateTransactionCommand(journal)
+        cash_box = CashBox(cash=1000, limit=5000)
+        command.execute(MockBankSystem1(), cash_box, Account('a', 'A', 100), 50)
+        command.checkpoint(cash_box)
+        journal.close()
+
+        # when only account B is touched after it
+        journal = Journal(self.path, segment_records=4, fsync=FSYNC_ALWAYS)
+        command = JournaledUpdateTransactionCommand(journal)
+        command.execute(MockBankSystem1(), cash_box, Account('b', 'B', 100), 10)
+        for _ in range(4):
+            command.checkpoint(cash_box)
+        journal.close()
+
+        # then
+        self.assertEqual((1060, {'A': 150, 'B': 110}), Journal(self.path).recover())
@@ -0,0 +1,99 @@
+import io
+import threading
+import urllib.request
+from unittest import TestCase
+
+from errors import ErrorCode
+from fleet import AtmFleet
+from infra.event_sink import StreamEventSink, WARNING
+from infra.metrics import Metrics, MetricsEventSink, MetricsServer, fleet_collector
+from model.command import MeteredUpdateTransactionCommand, MockUpdateTransactionCommand
+from model.domain import Account, Card, CashBox, User
+
+
+def make_card(balance):
+    user = User('user', [], [Account('user', '0001', balance)])
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    return card
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.metrics = Metrics()
+        self.stream = io.StringIO()
+        self.fleet = AtmFleet(
+            update_transaction=lambda: MeteredUpdateTransactionCommand(MockUpdateTransactionCommand(), self.metrics),
+            event_sink=MetricsEventSink(self.metrics, StreamEventSink(WARNING, self.stream)))
+        self.metrics.register_collector(fleet_collector(self.fleet))
+
+    def test_transitions_errors_and_transactions_are_counted(self):
+        # given
+        atm = self.fleet.add('atm-1', CashBox(cash=1000, limit=5000))
+        self.fleet.add('atm-2', CashBox(cash=0, limit=5000))
+
+        # when
+        atm.insert_card(make_card(2000))
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_withdraw()
+        atm.enter_withdrawal_amount(1500)
+        atm.select_deposit()
+        with self.assertRaises(ValueError):
+            self.fleet.commands.get().execute(None, CashBox(cash=0, limit=10), Account('a', '0002', 0), -10)
+
+        # then
+        samples = self.metrics.samples()
+        self.assertEqual(1, samples[('atm_transitions_total', (('state', 'AtmAuthorized'),))])
+        self.assertEqual(1, samples[('atm_errors_total', (('code', 'CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH'),))])
+        self.assertEqual(1, samples[('atm_not_available_total', (('state', 'AtmExit'),))])
+        self.assertEqual(1, samples[(
+            'atm_transactions_total', (('kind', 'withdrawal'), ('result', 'ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH')))])
+        self.assertEqual(1, samples[('atm_sessions', (('state', 'AtmExit'),))])
+        self.assertEqual(1, samples[('atm_sessions', (('state', 'AtmWait'),))])
+        self.assertEqual(0.2, samples[('atm_cash_fill_ratio', (('atm', 'atm-1'),))])
+        # warnings are still written to the next sink
+        self.assertIn('Action is not available', self.stream.getvalue())
+
+    def test_counters_of_threads_are_merged(self):
+        # given
+        def count():
+            for _ in range(1000):
+                self.metrics.inc('atm_transitions_total', (('state', 'AtmReady'),))
+
+        # when
+        threads = [threading.Thread(target=count) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        self.assertEqual(4000, self.metrics.samples()[('atm_transitions_total', (('state', 'AtmReady'),))])
+
+    def test_error_codes_are_distinct_labels(self):
+        # then
+        self.assertEqual(len(ErrorCode.__members__), len(ErrorCode))
+        self.assertIsNot(ErrorCode.CANNOT_FIND_ACCOUNT, ErrorCode.WRONG_ACCOUNT_SELECTED)
+
+    def test_serve_prometheus_text(self):
+        # given
+        atm = self.fleet.add('atm-"1"', CashBox(cash=1000, limit=5000))
+        atm.insert_card(make_card(2000))
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_deposit()
+        atm.put_in_cash(100)
+
+        # when
+        with MetricsServer(self.metrics) as server:
+            with urllib.request.urlopen('http://%s:%d/metrics' % server.server_address) as response:
+                text = response.read().decode()
+
+        # then
+        self.assertIn('# TYPE atm_transactions_total counter\n', text)
+        self.assertIn('atm_transactions_total{kind="deposit",result="ok"} 1\n', text)
+        self.assertIn('atm_transaction_amount_total{kind="deposit"} 100\n', text)
+        self.assertIn('# TYPE atm_cash gauge\n', text)
+        self.assertIn('atm_cash{atm="atm-\\"1\\""} 1100\n', text)
@@ -0,0 +1,143 @@
+import threading
+from unittest import TestCase
+
+from atm import Atm, AtmExit
+from errors import ErrorCode
+from infra.bank_api import MockBankSystem1
+from model.command import MockUpdateTransactionCommand, OptimisticUpdateTransactionCommand
+from model.domain import Account, Card, CashBox, User
+
+
+class InterferingCashBox(CashBox):
+    """Cash box whose limit read lets another terminal commit on the account first"""
+
+    def __init__(self, cash, limit, account, interferences):
+        super().__init__(cash, limit)
+        self.account = account
+        self.interferences = interferences
+
+    def __getattribute__(self, name):
+        if name == 'limit' and object.__getattribute__(self, 'interferences') > 0:
+            self.interferences -= 1
+            self.account.balance += 10
+            self.account.version += 1
+        return object.__getattribute__(self, name)
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.command = OptimisticUpdateTransactionCommand(max_retries=3)
+        self.bank_system = MockBankSystem1()
+        self.account = Account('user', '0001', 100)
+
+    def test_withdraw_whole_balance(self):
+        # given
+        cash_box = CashBox(cash=1000, limit=2000)
+
+        # when
+        MockUpdateTransactionCommand().execute(self.bank_system, cash_box, self.account, -100)
+
+        # then
+        self.assertEqual((0, 1), (self.account.balance, self.account.version))
+        self.assertEqual((900, 1), (cash_box.cash, cash_box.version))
+
+    def test_rejected_transaction_changes_nothing(self):
+        # given
+        cash_box = CashBox(cash=1000, limit=1500)
+
+        # when
+        with self.assertRaises(ValueError) as e:
+            self.command.execute(self.bank_system, cash_box, self.account, 600)
+
+        # then
+        self.assertEqual(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE, e.exception.args[0])
+        self.assertEqual((1000, 0), (cash_box.cash, cash_box.version))
+        self.assertEqual((100, 0), (self.account.balance, self.account.version))
+
+    def test_conflict_is_retried(self):
+        # given
+        cash_box = InterferingCashBox(1000, 2000, self.account, interferences=2)
+
+        # when
+        self.command.execute(self.bank_system, cash_box, self.account, 50)
+
+        # then
+        self.assertEqual(2, self.command.conflicts)
+        self.assertEqual(100 + 20 + 50, self.account.balance)
+        self.assertEqual(1050, cash_box.cash)
+
+    def test_conflict_retries_run_out(self):
+        # given
+        cash_box = InterferingCashBox(1000, 2000, self.account, interferences=4)
+
+        # when
+        with self.assertRaises(RuntimeError) as e:
+            self.command.execute(self.bank_system, cash_box, self.account, 50)
+
+        # then
+        self.assertEqual(ErrorCode.TRANSACTION_IS_CONFLICTED, e.exception.args[0])
+        self.assertEqual(1000, cash_box.cash)
+
+    def test_hot_account_from_threads(self):
+        # given
+        threads, rounds = 8, 2000
+        cash_boxes = [CashBox(cash=10 ** 6, limit=10 ** 7) for _ in range(threads)]
+        # 3 retries of setUp may run out under this contention
+        command = OptimisticUpdateTransactionCommand()
+
+        def terminal(cash_box):
+            for i in range(rounds):
+                command.execute(self.bank_system, cash_box, self.account, 3 if i % 2 else -1)
+
+        # when
+        workers = [threading.Thread(target=terminal, args=(cash_box,)) for cash_box in cash_boxes]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # then
+        self.assertEqual(100 + threads * rounds, self.account.balance)
+        self.assertEqual(threads * rounds, self.account.version)
+        self.assertEqual(threads * (10 ** 6 + rounds), sum(cash_box.cash for cash_box in cash_boxes))
+
+    def test_adjust_balance_with_commits_from_threads(self):
+        # given
+        threads, rounds = 4, 2000
+        cash_box = CashBox(cash=10 ** 6, limit=10 ** 7)
+
+        def terminal():
+            for _ in range(rounds):
+                self.command.execute(self.bank_system, cash_box, self.account, 1)
+
+        def giving_back():
+            for _ in range(rounds):
+                self.command.adjust_balance(self.bank_system, cash_box, self.account, 1)
+
+        # when
+        workers = [threading.Thread(target=terminal) for _ in range(threads)] + [threading.Thread(target=giving_back)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # then
+        self.assertEqual(100 + (threads + 1) * rounds, self.account.balance)
+        self.assertEqual((threads + 1) * rounds, self.account.version)
+
+    def test_atm_exit_during_withdrawal_leaves_account(self):
+        # given
+        atm = Atm(CashBox(cash=1000, limit=5000), update_transaction=lambda: self.command)
+        atm.insert_card(Card('user', '1234', User('user', [], [self.account])))
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_withdraw()
+        atm.enter_withdrawal_amount(30)
+
+        # when
+        atm.exit()
+
+        # then
+        self.assertEqual(AtmExit.get_name(), atm.get_current_state_name())
+        self.assertEqual((100, 0), (self.account.balance, self.account.version))
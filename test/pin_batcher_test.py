@@ -0,0 +1,100 @@
+import threading
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from atm import Atm, AtmAuthorized, AtmExit
+from errors import ErrorCode
+from infra.bank_api import MockBankSystem1
+from infra.pin_batcher import BatchingBankSystem
+from model.domain import CashBox
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.bank = MockBankSystem1()
+        self.bank.validate_pins = MagicMock(side_effect=lambda requests: [pin == '1' for _, pin in requests])
+        self.batcher = BatchingBankSystem(self.bank, max_batch_size=16, max_latency=0.05)
+
+    def tearDown(self):
+        self.batcher.close()
+
+    def test_concurrent_requests_are_batched(self):
+        # given
+        results = {}
+
+        def validate(i):
+            results[i] = self.batcher.validate_pin(str(i), '1' if i % 2 else '2')
+
+        threads = [threading.Thread(target=validate, args=(i,)) for i in range(40)]
+
+        # when
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        self.assertEqual({i: bool(i % 2) for i in range(40)}, results)
+        self.assertEqual(40, self.batcher.requests)
+        self.assertLess(self.bank.validate_pins.call_count, 40)
+
+    def test_atm_enter_pin(self):
+        # given
+        atm = Atm(CashBox(cash=1000, limit=5000), bank_system=lambda: self.batcher)
+        card = MagicMock()
+        card.card_holder.accounts = [MagicMock()]
+        atm.insert_card(card)
+
+        # when
+        atm.enter_pin('1')
+
+        # then
+        self.assertEqual(AtmAuthorized.get_name(), atm.get_current_state_name())
+
+    def test_bank_error_is_raised_to_each_caller(self):
+        # given
+        self.bank.validate_pins.side_effect = RuntimeError('down')
+        atm = Atm(CashBox(cash=1000, limit=5000), bank_system=lambda: self.batcher)
+        atm.insert_card(MagicMock())
+
+        # when
+        atm.enter_pin('1')
+
+        # then
+        self.assertEqual(AtmExit.get_name(), atm.get_current_state_name())
+
+    def test_short_answer_fails_left_requests(self):
+        # given
+        self.bank.validate_pins.side_effect = lambda requests: [True] * (len(requests) - 1)
+
+        # when
+        with self.assertRaises(RuntimeError) as e:
+            self.batcher.validate_pin('1234', '1')
+
+        # then
+        self.assertEqual(ErrorCode.BANK_SYSTEM_IS_NOT_AVAILABLE, e.exception.args[0])
+
+    def test_timeout(self):
+        # given
+        answered = threading.Event()
+        self.bank.validate_pins.side_effect = lambda requests: answered.wait(1) and [True] * len(requests)
+        batcher = BatchingBankSystem(self.bank, max_latency=0.0, timeout=0.05)
+
+        # when
+        with self.assertRaises(RuntimeError) as e:
+            batcher.validate_pin('1234', '1')
+
+        # then
+        self.assertEqual(ErrorCode.BANK_SYSTEM_TIMED_OUT, e.exception.args[0])
+        answered.set()
+        batcher.close()
+
+    def test_closed(self):
+        # given
+        self.batcher.close()
+
+        # when, then
+        with self.assertRaises(RuntimeError) as e:
+            self.batcher.validate_pin('1234', '1')
+        self.assertEqual(ErrorCode.BANK_SYSTEM_IS_CLOSED, e.exception.args[0])
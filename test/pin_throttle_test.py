@@ -0,0 +1,100 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from errors import ErrorCode
+from fleet import AtmFleet
+from infra.bank_api import MockBankSystem1
+from infra.pin_throttle import PinThrottle, ThrottledBankSystem
+from model.domain import Account, Card, CashBox, User
+from model.session import BALANCE
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given a bank accepting pin '1' only, 3 failures with a half life of 100 seconds
+        self.clock = Clock()
+        self.throttle = PinThrottle(max_failures=3, half_life=100.0, width=1 << 10, clock=self.clock)
+        self.bank = MockBankSystem1()
+        self.bank.validate_pin = MagicMock(side_effect=lambda card_number, pin: pin == '1')
+        self.bank.validate_pins = MagicMock(side_effect=lambda requests: [pin == '1' for _, pin in requests])
+        self.bank_system = ThrottledBankSystem(self.bank, self.throttle)
+
+    def test_card_is_locked_without_calling_bank(self):
+        # given
+        for _ in range(3):
+            self.assertFalse(self.bank_system.validate_pin('card', '2'))
+
+        # when, then
+        with self.assertRaises(ValueError) as raised:
+            self.bank_system.validate_pin('card', '1')
+        self.assertEqual(ErrorCode.PIN_ATTEMPTS_EXCEEDED, raised.exception.args[0])
+        self.assertEqual(3, self.bank.validate_pin.call_count)
+        self.assertEqual(1, self.bank_system.refused)
+        self.assertTrue(self.bank_system.validate_pin('other', '1'))
+
+    def test_failures_decay(self):
+        # given
+        for _ in range(3):
+            self.throttle.record_failure('card')
+
+        # when 3 failures decay to 2 after log2(3 / 2) half lives
+        self.clock.now += 50
+        locked = self.throttle.is_locked('card')
+        self.clock.now += 10
+
+        # then
+        self.assertTrue(locked)
+        self.assertFalse(self.throttle.is_locked('card'))
+        self.assertAlmostEqual(3 * 2 ** -0.6, self.throttle.failures('card'))
+
+    def test_batch_refuses_locked_cards(self):
+        # given
+        for _ in range(3):
+            self.throttle.record_failure('card')
+
+        # when
+        results = self.bank_system.validate_pins([('card', '1'), ('other', '1'), ('another', '2')])
+
+        # then
+        self.assertEqual([False, True, False], results)
+        self.bank.validate_pins.assert_called_once_with([('other', '1'), ('another', '2')])
+        self.assertAlmostEqual(1, self.throttle.failures('another'))
+
+    def test_false_lockout_bound(self):
+        # given
+        for n in range(100):
+            self.throttle.record_failure(str(n))
+
+        # when
+        bound = self.throttle.false_lockout_bound()
+
+        # then (100 / (1024 * 3)) ** 4
+        self.assertAlmostEqual((100 / 3072) ** 4, bound)
+        self.assertEqual(0, sum(self.throttle.is_locked('unused-%d' % n) for n in range(1000)))
+
+    def test_lockout_is_fleet_wide(self):
+        # given two terminals sharing the throttled bank system
+        fleet = AtmFleet(bank_system=lambda: self.bank_system)
+        for terminal_id in ('t1', 't2'):
+            fleet.add(terminal_id, CashBox(cash=1000, limit=5000))
+        user = User('user', [], [])
+        user.accounts.append(Account('user', '0001', 100))
+        card = Card('card', '1234', user)
+        user.cards.append(card)
+
+        # when
+        for _ in range(3):
+            fleet.get('t1').run_session(card, '2', [(BALANCE, 0)])
+        result = fleet.get('t2').run_session(card, '1', [(BALANCE, 0)])
+
+        # then
+        self.assertFalse(result.authorized)
+        self.assertEqual(ErrorCode.PIN_ATTEMPTS_EXCEEDED, result.error.args[0])
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from unittest import TestCase
+
+from atm import AsyncAtm, AtmAuthorized, AtmExit
+from fleet import AtmFleet
+from infra.bank_api import AsyncIBankSystem, MockBankSystem1
+from infra.metrics import Metrics
+from infra.prefetch import AccountPrefetcher, DISCARDED, FAILED, HIT, WAIT
+from model.domain import Account, Card, CashBox, User
+
+
+class SlowBankSystem(MockBankSystem1):
+    """Bank answering pins after `pin_delay` and accounts after `accounts_delay` seconds"""
+
+    def __init__(self, pin_delay, accounts_delay):
+        super().__init__()
+        self.pin_delay = pin_delay
+        self.accounts_delay = accounts_delay
+        self.get_accounts_calls = 0
+        self.fail_next = False
+
+    def validate_pin(self, card_number, pin):
+        time.sleep(self.pin_delay)
+        return pin == '1'
+
+    def get_accounts(self, card):
+        self.get_accounts_calls += 1
+        time.sleep(self.accounts_delay)
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError('bank is not available')
+        return card.card_holder.accounts
+
+
+class AsyncSlowBankSystem(AsyncIBankSystem):
+    async def validate_pin(self, card_number, pin):
+        await asyncio.sleep(0.05)
+        return pin == '1'
+
+    async def get_accounts(self, card):
+        await asyncio.sleep(0.05)
+        return card.card_holder.accounts
+
+
+def make_card():
+    user = User('user', [], [])
+    user.accounts.append(Account('user', '0001', 100))
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    return card
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.metrics = Metrics()
+        self.prefetcher = AccountPrefetcher(max_workers=2, metrics=self.metrics)
+        self.card = make_card()
+
+    def tearDown(self):
+        self.prefetcher.close()
+
+    def make_atm(self, bank):
+        """Return facade and context of a terminal"""
+        fleet = AtmFleet(bank_system=lambda: bank, prefetcher=self.prefetcher)
+        return fleet.add('t1', CashBox(cash=1000, limit=5000)), fleet.terminals['t1']
+
+    def test_accounts_are_fetched_while_pin_is_validated(self):
+        # given
+        bank = SlowBankSystem(pin_delay=0.1, accounts_delay=0.05)
+        atm, context = self.make_atm(bank)
+
+        # when
+        atm.insert_card(self.card)
+        started = time.perf_counter()
+        atm.enter_pin('1')
+        elapsed = time.perf_counter() - started
+
+        # then
+        self.assertEqual(AtmAuthorized.get_name(), atm.get_current_state_name())
+        self.assertIs(self.card.card_holder.accounts, context.accounts)
+        self.assertLess(elapsed, 0.14)
+        self.assertEqual(1, self.prefetcher.outcomes[HIT])
+        self.assertEqual(1, bank.get_accounts_calls)
+        self.assertGreater(self.prefetcher.saved.total, 0.03e9)
+        self.assertIn('atm_prefetch_total{outcome="hit"} 1', self.metrics.render())
+
+    def test_slow_fetch_is_waited_for(self):
+        # given
+        bank = SlowBankSystem(pin_delay=0, accounts_delay=0.05)
+        atm, _ = self.make_atm(bank)
+
+        # when
+        atm.insert_card(self.card)
+        atm.enter_pin('1')
+
+        # then
+        self.assertEqual(AtmAuthorized.get_name(), atm.get_current_state_name())
+        self.assertEqual(1, self.prefetcher.outcomes[WAIT])
+
+    def test_accounts_are_not_loaded_before_pin(self):
+        # given
+        bank = SlowBankSystem(pin_delay=0, accounts_delay=0)
+        atm, context = self.make_atm(bank)
+
+        # when
+        atm.insert_card(self.card)
+        time.sleep(0.02)
+        atm.enter_pin('2')
+
+        # then
+        self.assertEqual(AtmExit.get_name(), atm.get_current_state_name())
+        self.assertEqual((), context.accounts)
+        atm.take_out_card()
+        self.assertEqual(1, self.prefetcher.outcomes[DISCARDED])
+
+    def test_failed_fetch_is_made_again(self):
+        # given
+        bank = SlowBankSystem(pin_delay=0, accounts_delay=0)
+        bank.fail_next = True
+        atm, _ = self.make_atm(bank)
+
+        # when
+        atm.insert_card(self.card)
+        atm.enter_pin('1')
+
+        # then
+        self.assertEqual(AtmAuthorized.get_name(), atm.get_current_state_name())
+        self.assertEqual(1, self.prefetcher.outcomes[FAILED])
+        self.assertEqual(2, bank.get_accounts_calls)
+
+    def test_async_prefetch(self):
+        async def session():
+            # given
+            atm = AsyncAtm(CashBox(cash=1000, limit=5000), bank_system=AsyncSlowBankSystem,
+                           prefetcher=self.prefetcher)
+
+            # when
+            await atm.insert_card(self.card)
+            started = time.perf_counter()
+            await atm.enter_pin('1')
+            elapsed = time.perf_counter() - started
+
+            # then
+            self.assertEqual(AtmAuthorized.get_name(), atm.get_current_state_name())
+            self.assertLess(elapsed, 0.09)
+
+        asyncio.run(session())
+        self.assertEqual(1, self.prefetcher.outcomes[HIT] + self.prefetcher.outcomes[WAIT])
+
+    def test_async_prefetch_needs_running_loop(self):
+        # when, then
+        with self.assertRaises(RuntimeError):
+            self.prefetcher.start(AsyncSlowBankSystem(), self.card)
@@ -0,0 +1,119 @@
+from unittest import TestCase
+
+from errors import ErrorCode
+from infra.shared_cash import SharedCashTable
+from model.cassettes import Cassettes
+from model.domain import Account, Card, CashBox, User
+from model.session import BALANCE, DEPOSIT, WITHDRAW
+from process_fleet import ProcessFleet
+
+
+def make_cards():
+    """Cards of every worker, module level so it can be pickled"""
+    user = User('user', [], [])
+    user.accounts.extend([Account('user', '0001', 1000), Account('user', '0002', 50)])
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    return {card.card_number: card}
+
+
+class SharedCashTableTest(TestCase):
+    def setUp(self):
+        # given
+        self.table = SharedCashTable(3, writers=2)
+        self.table.set(0, 0, 100, 1000)
+        self.table.set(1, 1, 200, 1000)
+        self.table.set(2, 1, 300, 1000)
+
+    def tearDown(self):
+        self.table.close()
+        self.table.unlink()
+
+    def test_cash_box_writes_slot_and_subtotal(self):
+        # when
+        cash_box = self.table.cash_box(2, 1)
+        cash_box.cash += 50
+        cash_box.cash -= 20
+
+        # then
+        self.assertEqual(330, self.table.cash(2))
+        self.assertEqual(1000, cash_box.limit)
+        self.assertEqual(630, self.table.total())
+
+    def test_attached_table_sees_same_block(self):
+        # when
+        attached = SharedCashTable(3, 2, self.table.name)
+        attached.cash_box(0, 0).cash = 150
+
+        # then
+        self.assertEqual(150, self.table.cash(0))
+        self.assertEqual(650, self.table.total())
+        attached.close()
+
+
+class ProcessFleetTest(TestCase):
+    def setUp(self):
+        # given
+        self.cash_boxes = {'t%d' % i: CashBox(cash=1000, limit=5000) for i in range(6)}
+        self.fleet = ProcessFleet(self.cash_boxes, make_cards, workers=2, batch_size=4)
+        self.fleet.start()
+
+    def tearDown(self):
+        self.fleet.close()
+
+    def test_terminals_are_spread_by_id(self):
+        # when
+        workers = {self.fleet.worker_of(terminal_id) for terminal_id in self.cash_boxes}
+
+        # then
+        self.assertEqual({0, 1}, workers)
+        self.assertEqual(self.fleet.worker_of('t3'), self.fleet.worker_of('t3'))
+
+    def test_sessions_run_in_workers(self):
+        # when
+        for i in range(12):
+            self.fleet.submit('t%d' % (i % 6), '1234', '1', [(DEPOSIT, 0, 10), (WITHDRAW, 1, 5), (BALANCE, 0)])
+        results = self.fleet.drain()
+
+        # then
+        self.assertEqual(12, len(results))
+        for terminal_id, result in results:
+            self.assertTrue(result.authorized)
+            self.assertEqual([None, None, None], [operation.error for operation in result.operations])
+        self.assertEqual({terminal_id: (1010, 5000) for terminal_id in self.cash_boxes}, self.fleet.cash_levels())
+        self.assertEqual(6060, self.fleet.total_cash())
+
+    def test_failed_operation_is_returned(self):
+        # when
+        self.fleet.submit('t0', '1234', '1', [(WITHDRAW, 0, 2000)])
+        self.fleet.submit('t0', 'unknown', '1', [(BALANCE, 0)])
+        (_, failed), (_, unknown) = self.fleet.drain()
+
+        # then
+        self.assertEqual(ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH, failed.operations[0].error.args[0])
+        self.assertIsInstance(unknown, KeyError)
+        self.assertEqual(1000, self.fleet.cash_levels()['t0'][0])
+
+    def test_submit_checks_terminal_and_plan(self):
+        # when, then
+        with self.assertRaises(KeyError):
+            self.fleet.submit('t9', '1234', '1', [])
+        with self.assertRaises(ValueError):
+            self.fleet.submit('t0', '1234', '1', [(DEPOSIT, 0, -1)])
+        self.assertEqual([], self.fleet.drain())
+
+    def test_workers_dispense_with_cassettes(self):
+        # given
+        fleet = ProcessFleet({'c0': CashBox(cash=200, limit=5000, cassettes=Cassettes({20: 10}))}, make_cards,
+                             workers=1)
+        fleet.start()
+
+        # when
+        fleet.submit('c0', '1234', '1', [(WITHDRAW, 0, 30)])
+        fleet.submit('c0', '1234', '1', [(WITHDRAW, 0, 40)])
+        (_, odd), (_, even) = fleet.drain()
+        fleet.close()
+
+        # then
+        self.assertEqual(ErrorCode.CASH_BOX_CANNOT_DISPENSE_AMOUNT, odd.operations[0].error.args[0])
+        self.assertIsNone(even.operations[0].error)
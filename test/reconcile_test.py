@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from infra.bank_api import MockBankSystem1
+from infra.journal import Journal, FSYNC_ALWAYS, TRANSACTION, ADJUSTMENT
+from infra.reconcile import Reconciler, Mismatch, GAP, COUNT, read_journal, read_log
+from model.command import JournaledUpdateTransactionCommand
+from model.domain import Account, CashBox
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_settle_terminals_and_accounts(self):
+        # given
+        records = [
+            ('atm-1', TRANSACTION, '0001', 100, 1100),
+            ('atm-2', TRANSACTION, '0002', -50, 450),
+            ('atm-1', TRANSACTION, '0002', -30, 1070),
+            ('atm-1', ADJUSTMENT, '0002', 30, 1070),
+        ]
+
+        # when
+        reconciler = Reconciler().run(iter(records))
+
+        # then
+        self.assertEqual([], reconciler.mismatches({'atm-1': 1070, 'atm-2': 450}))
+        self.assertEqual({'opening': 1000, 'closing': 1070, 'transactions': 70, 'adjustments': 30, 'records': 3},
+                         reconciler.settlement('atm-1'))
+        self.assertEqual({'0001': [100, 0], '0002': [-80, 30]}, reconciler.accounts)
+
+    def test_report_gap_and_count(self):
+        # given
+        records = [
+            ('atm-1', TRANSACTION, '0001', 100, 1100),
+            ('atm-1', TRANSACTION, '0001', -20, 1050),
+            ('atm-1', ADJUSTMENT, '0001', 20, 1060),
+        ]
+
+        # when
+        mismatches = Reconciler().run(iter(records)).mismatches({'atm-1': 1000, 'atm-9': 0})
+
+        # then
+        self.assertEqual([
+            Mismatch('atm-1', GAP, 1, 1080, 1050),
+            Mismatch('atm-1', GAP, 2, 1050, 1060),
+            Mismatch('atm-1', COUNT, 3, 1060, 1000),
+            Mismatch('atm-9', COUNT, 3, None, 0),
+        ], mismatches)
+
+    def test_resume_from_checkpoint(self):
+        # given
+        log = os.path.join(self.path, 'atm.log')
+        checkpoint = os.path.join(self.path, 'checkpoint.json')
+        with open(log, 'w') as f:
+            for i in range(10):
+                f.write(json.dumps(['atm-1', TRANSACTION, '0001', 10, 1010 + 10 * i]) + '\n')
+        with self.assertRaises(_Crash):
+            Reconciler(checkpoint, checkpoint_every=4).run(_crash_after(read_log(log), 6))
+
+        # when
+        resumed = Reconciler(checkpoint, checkpoint_every=4)
+        skipped = resumed.position
+        resumed.run(read_log(log))
+
+        # then
+        self.assertEqual(4, skipped)
+        self.assertEqual(10, resumed.position)
+        self.assertEqual(1100, resumed.settlement('atm-1')['closing'])
+        self.assertEqual({'0001': [100, 0]}, resumed.accounts)
+        self.assertEqual([], resumed.mismatches({'atm-1': 1100}))
+
+    def test_read_journal_with_withdrawal_given_back(self):
+        # given
+        cash_box = CashBox(1000, 5000)
+        account = Account('a', '0001', 500)
+        journal = Journal(self.path, fsync=FSYNC_ALWAYS)
+        command = JournaledUpdateTransactionCommand(journal)
+        command.execute(MockBankSystem1(), cash_box, account, -100)
+        command.adjust_balance(MockBankSystem1(), cash_box, account, 100)
+        journal.close()
+
+        # when
+        reconciler = Reconciler().run(read_journal('atm-1', self.path))
+
+        # then
+        self.assertEqual([], reconciler.mismatches({'atm-1': cash_box.cash}))
+        self.assertEqual({'0001': [-100, 100]}, reconciler.accounts)
+
+
+class _Crash(Exception):
+    pass
+
+
+def _crash_after(records, count):
+    """Yield count records then fail"""
+    for i, record in enumerate(records):
+        if i == count:
+            raise _Crash
+        yield record
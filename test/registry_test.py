@@ -0,0 +1,100 @@
+import threading
+from unittest import TestCase
+
+from fleet import AtmFleet
+from model.domain import CashBox
+from model.registry import InstanceRegistry, SHARED, PER_TERMINAL, PER_SHARD, PER_THREAD
+
+
+class Resource:
+    def __init__(self):
+        self.closed = False
+
+    def name(self):
+        return id(self)
+
+    def close(self):
+        self.closed = True
+
+
+class Unittest(TestCase):
+    def test_shared(self):
+        # given
+        registry = InstanceRegistry(Resource, SHARED)
+
+        # when, then
+        self.assertIs(registry.get('t1'), registry.get('t2'))
+        self.assertEqual(1, len(registry.instances()))
+
+    def test_per_terminal(self):
+        # given
+        registry = InstanceRegistry(Resource, PER_TERMINAL)
+
+        # when, then
+        self.assertIsNot(registry.get('t1'), registry.get('t1'))
+        self.assertEqual(2, len(registry.instances()))
+
+    def test_per_shard(self):
+        # given
+        registry = InstanceRegistry(Resource, PER_SHARD, shards=4)
+
+        # when
+        instances = {terminal_id: registry.get(terminal_id) for terminal_id in range(100)}
+
+        # then
+        self.assertEqual(4, len(registry.instances()))
+        self.assertIs(instances[7], registry.get(7))
+        # shard of a terminal does not depend on hash randomization
+        self.assertEqual(InstanceRegistry(Resource, PER_SHARD, shards=4).shard_of(7), registry.shard_of(7))
+        self.assertEqual(registry.shard_of('t7'), registry.shard_of('t7'))
+
+    def test_per_thread(self):
+        # given
+        registry = InstanceRegistry(Resource, PER_THREAD)
+        proxy = registry.get('t1')
+        names = []
+
+        # when
+        names.append(proxy.name())
+        worker = threading.Thread(target=lambda: names.append(proxy.name()))
+        worker.start()
+        worker.join()
+
+        # then
+        self.assertIs(proxy, registry.get('t2'))
+        self.assertEqual(proxy.name(), names[0])
+        self.assertNotEqual(names[0], names[1])
+        self.assertEqual(2, len(registry.instances()))
+
+    def test_close_every_instance(self):
+        # given
+        registry = InstanceRegistry(Resource, PER_THREAD)
+        proxy = registry.get()
+        proxy.name()
+        worker = threading.Thread(target=proxy.name)
+        worker.start()
+        worker.join()
+
+        # when
+        registry.close()
+
+        # then
+        self.assertTrue(all(instance.closed for instance in registry.instances()))
+
+    def test_unknown_scope(self):
+        # when, then
+        with self.assertRaises(ValueError):
+            InstanceRegistry(Resource, 'process')
+
+    def test_fleet_close(self):
+        # given
+        fleet = AtmFleet(update_transaction=Resource, command_scope=PER_SHARD, shards=2)
+        for terminal_id in range(10):
+            fleet.add(terminal_id, CashBox(cash=1000, limit=5000))
+
+        # when
+        fleet.close()
+
+        # then
+        self.assertEqual(2, len(fleet.commands.instances()))
+        self.assertTrue(all(command.closed for command in fleet.commands.instances()))
@@ -0,0 +1,69 @@
+import random
+from unittest import TestCase, skipIf
+
+from errors import ErrorCode
+from infra.bank_api import MockBankSystem1
+from model.command import MockUpdateTransactionCommand
+from model.domain import Account, CashBox
+
+try:
+    import numpy as np
+    from model.replay import replay
+except ImportError:
+    np = None
+
+
+def scalar_replay(atm_ids, account_ids, offsets, cash, limits, balances):
+    """Replay through `MockUpdateTransactionCommand` one transaction at a time"""
+    bank_system = MockBankSystem1()
+    command = MockUpdateTransactionCommand()
+    cash_boxes = [CashBox(c, limit) for c, limit in zip(cash, limits)]
+    accounts = [Account('user', str(i), balance) for i, balance in enumerate(balances)]
+    errors = []
+    for atm, account, offset in zip(atm_ids, account_ids, offsets):
+        try:
+            command.execute(bank_system, cash_boxes[atm], accounts[account], offset)
+            errors.append(0)
+        except ValueError as e:
+            errors.append(e.args[0].value)
+    return errors, [c.cash for c in cash_boxes], [a.balance for a in accounts]
+
+
+@skipIf(np is None, 'numpy is not installed')
+class Unittest(TestCase):
+    def test_rules_in_order(self):
+        # given
+        atm_ids = [0, 0, 0, 1, 1]
+        account_ids = [0, 0, 1, 1, 0]
+        offsets = [-300, -300, 900, -100, 50]
+
+        # when
+        result = replay(atm_ids, account_ids, offsets, cash=[500, 100], limits=[1000, 1000], balances=[500, 0])
+
+        # then
+        self.assertEqual([0, ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH.value,
+                          ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_SPACE.value,
+                          ErrorCode.ACCOUNT_DOES_NOT_HAVE_ENOUGH_CASH.value, 0], result.errors.tolist())
+        self.assertEqual([True, False, False, False, True], result.accepted.tolist())
+        self.assertEqual(([200, 150], [250, 0]), (result.cash.tolist(), result.balances.tolist()))
+
+    def test_same_as_scalar_path(self):
+        # given
+        rng = random.Random(7)
+        atms, accounts, n = 5, 40, 3000
+        atm_ids = [rng.randrange(atms) for _ in range(n)]
+        account_ids = [rng.randrange(accounts) for _ in range(n)]
+        offsets = [rng.choice((1, -1)) * rng.randrange(0, 400) for _ in range(n)]
+        cash = [rng.randrange(0, 3000) for _ in range(atms)]
+        limits = [rng.randrange(3000, 6000) for _ in range(atms)]
+        balances = [rng.randrange(0, 1000) for _ in range(accounts)]
+
+        # when
+        result = replay(atm_ids, account_ids, offsets, cash, limits, balances, window=16)
+
+        # then
+        errors, final_cash, final_balances = scalar_replay(atm_ids, account_ids, offsets, cash, limits, balances)
+        self.assertGreater(sum(1 for e in errors if e), 100)
+        self.assertEqual(errors, result.errors.tolist())
+        self.assertEqual(final_cash, result.cash.tolist())
+        self.assertEqual(final_balances, result.balances.tolist())
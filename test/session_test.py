@@ -0,0 +1,113 @@
+from unittest import TestCase
+
+from atm import Atm, AtmWait
+from errors import ErrorCode
+from model.domain import Account, Card, CashBox, User
+from model.session import BALANCE, DEPOSIT, WITHDRAW, OperationResult
+
+
+def make_atm(cash=1000, limit=5000):
+    user = User('user', [], [Account('user', '0001', 2000), Account('user', '0002', 300)])
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    cash_box = CashBox(cash=cash, limit=limit)
+    atm = Atm(cash_box)
+    errors = []
+    atm.register_on_error(lambda e: errors.append(e.args))
+    return atm, card, errors, cash_box
+
+
+def step_by_step(atm, card, pin, operations):
+    atm.insert_card(card)
+    atm.enter_pin(pin)
+    for kind, index, *amount in operations:
+        atm.select_account(index)
+        if kind == DEPOSIT:
+            atm.select_deposit()
+            atm.put_in_cash(amount[0])
+        elif kind == WITHDRAW:
+            atm.select_withdraw()
+            atm.enter_withdrawal_amount(amount[0])
+            atm.take_out_cash(amount[0])
+        else:
+            atm.select_balance()
+        atm.back()
+    atm.exit()
+    atm.take_out_card()
+
+
+class Unittest(TestCase):
+    PLANS = (
+        [(DEPOSIT, 0, 100), (WITHDRAW, 1, 200), (BALANCE, 0)],
+        [(WITHDRAW, 0, 1500), (DEPOSIT, 1, 10)],
+        [(DEPOSIT, 0, 4500), (BALANCE, 1)],
+        [(BALANCE, 5), (DEPOSIT, 1, 0), (WITHDRAW, 1, 400), (BALANCE, 1)],
+    )
+
+    def test_same_as_step_by_step(self):
+        for plan in self.PLANS:
+            for pin in ('1', '2'):
+                # given
+                one_shot, card, one_shot_errors, cash_box = make_atm()
+                stepped, stepped_card, stepped_errors, stepped_cash_box = make_atm()
+
+                # when
+                result = one_shot.run_session(card, pin, plan)
+                step_by_step(stepped, stepped_card, pin, plan)
+
+                # then
+                self.assertEqual(stepped_errors, one_shot_errors, (plan, pin))
+                self.assertEqual([a.balance for a in stepped_card.card_holder.accounts],
+                                 [a.balance for a in card.card_holder.accounts], (plan, pin))
+                self.assertEqual(stepped_cash_box.cash, cash_box.cash, (plan, pin))
+                self.assertEqual(AtmWait.get_name(), one_shot.get_current_state_name())
+                self.assertEqual(pin == '1', result.authorized)
+
+    def test_result_record(self):
+        # given
+        atm, card, _, _ = make_atm()
+
+        # when
+        result = atm.run_session(card, '1', [(DEPOSIT, 0, 100), (BALANCE, 7), (WITHDRAW, 1, 200), (BALANCE, 1)])
+
+        # then
+        self.assertIsNone(result.error)
+        self.assertEqual(OperationResult(DEPOSIT, 0, 100, 2100, None), result.operations[0])
+        self.assertIsInstance(result.operations[1].error, IndexError)
+        self.assertEqual([(WITHDRAW, 100), (BALANCE, 100)], [(o.kind, o.balance) for o in result.operations[2:]])
+
+    def test_session_ends_at_failure(self):
+        # given
+        atm, card, _, _ = make_atm(cash=100)
+
+        # when
+        result = atm.run_session(card, '1', [(WITHDRAW, 0, 500), (DEPOSIT, 0, 100)])
+
+        # then
+        self.assertEqual((ErrorCode.CASH_BOX_DOES_NOT_HAVE_ENOUGH_CASH,), result.error.args)
+        self.assertEqual(1, len(result.operations))
+
+    def test_plan_is_validated_up_front(self):
+        # given
+        atm, card, errors, _ = make_atm()
+
+        # when
+        for plan in ([(DEPOSIT, 0, 100), (WITHDRAW, 0, -1)], [('transfer', 0, 1)], [(DEPOSIT, 0)], [(BALANCE, '0')]):
+            with self.assertRaises(ValueError):
+                atm.run_session(card, '1', plan)
+
+        # then
+        self.assertEqual(2000, card.card_holder.accounts[0].balance)
+        self.assertEqual([], errors)
+
+    def test_card_in_terminal(self):
+        # given
+        atm, card, _, _ = make_atm()
+        atm.insert_card(card)
+
+        # when
+        with self.assertRaises(RuntimeError):
+            atm.run_session(card, '1', [])
+
+        # then
+        self.assertEqual('AtmReady', atm.get_current_state_name())
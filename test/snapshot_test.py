@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from atm import Atm
+from model.domain import Account, Card, CashBox, User
+from model.snapshot import AccountSnapshot, UserSnapshot
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.user = User('user', [], [Account('user', '0001', 2000), Account('user', '0002', 500)])
+        self.card = Card('card', '1234', self.user)
+        self.user.cards.append(self.card)
+        self.atm = Atm(CashBox(cash=1000, limit=5000))
+
+    def test_nothing_before_card(self):
+        # then
+        self.assertEqual((None, None, None),
+                         (self.atm.get_user(), self.atm.get_inserted_card(), self.atm.get_selected_account()))
+
+    def test_user_snapshot_of_cyclic_graph(self):
+        # given
+        self.atm.insert_card(self.card)
+
+        # when
+        user = self.atm.get_user()
+
+        # then
+        self.assertEqual('user', user.name)
+        self.assertEqual(('1234', 'user'), (user.cards[0].card_number, user.cards[0].card_holder_name))
+        self.assertEqual([2000, 500], [account.balance for account in user.accounts])
+        self.assertEqual('1234', self.atm.get_inserted_card().card_number)
+
+    def test_snapshot_is_read_only_and_does_not_follow_changes(self):
+        # given
+        self.atm.insert_card(self.card)
+        self.atm.enter_pin('1')
+        self.atm.select_account(0)
+        self.atm.select_deposit()
+        account = self.atm.get_selected_account()
+
+        # when
+        self.atm.put_in_cash(100)
+
+        # then
+        with self.assertRaises(AttributeError):
+            account.balance = 0
+        self.assertEqual((2000, 0), (account.balance, account.version))
+        self.assertEqual((2100, 1), (self.atm.get_selected_account().balance, self.atm.get_selected_account().version))
+
+    def test_account_list(self):
+        # given
+        self.atm.insert_card(self.card)
+        self.atm.enter_pin('1')
+
+        # when
+        accounts = self.atm.display_account_list()
+
+        # then
+        self.assertEqual((AccountSnapshot('user', '0001', 2000, 0), AccountSnapshot('user', '0002', 500, 0)), accounts)
+        self.assertFalse(hasattr(UserSnapshot.of(self.user), '__dict__'))
@@ -0,0 +1,126 @@
+import json
+import socket
+import threading
+from unittest import TestCase
+
+from atm import Atm, AtmAuthorized, AtmDisplayingBalance, AtmExit
+from errors import ErrorCode
+from infra.bank_server import InMemoryBank, LocalBankServer
+from infra.socket_bank import SocketBankSystem
+from model.domain import Card, CashBox, User
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        bank = InMemoryBank()
+        bank.add_account('user', '0001', 2000)
+        bank.add_account('user', '0002', 500)
+        bank.add_card('1234', '1111', ['0001', '0002'])
+        self.bank = bank
+        self.server = LocalBankServer(bank)
+        self.server.start()
+        self.bank_system = SocketBankSystem(*self.server.server_address, pool_size=2)
+        self.card = Card('user', '1234', User('user', [], []))
+
+    def tearDown(self):
+        self.bank_system.close()
+        self.server.stop()
+
+    def test_validate_pin(self):
+        # then
+        self.assertTrue(self.bank_system.validate_pin('1234', '1111'))
+        self.assertFalse(self.bank_system.validate_pin('1234', '0000'))
+
+    def test_get_accounts(self):
+        # when
+        accounts = self.bank_system.get_accounts(self.card)
+
+        # then
+        self.assertEqual(['0001', '0002'], [account.account_number for account in accounts])
+        self.assertEqual(2000, accounts[0].balance)
+
+    def test_pipeline(self):
+        # when
+        results = self.bank_system.pipeline(
+            [('validate_pin', ('1234', '1111'))] * 10 + [('sync_transaction', ('t1', '0002', 100))] * 2)
+
+        # then
+        self.assertEqual([True] * 10 + [True, False], results)
+        self.assertEqual(600, self.bank.accounts['0002'].balance)
+
+    def test_atm_session(self):
+        # given
+        atm = Atm(CashBox(cash=1000, limit=5000), bank_system=lambda: self.bank_system)
+
+        # when
+        atm.insert_card(self.card)
+        atm.enter_pin('1111')
+        self.assertEqual(AtmAuthorized.get_name(), atm.get_current_state_name())
+        atm.select_account(1)
+        atm.select_balance()
+
+        # then
+        self.assertEqual(AtmDisplayingBalance.get_name(), atm.get_current_state_name())
+        self.assertEqual(500, atm.get_selected_account().balance)
+
+    def test_server_not_available(self):
+        # given
+        errors = []
+        atm = Atm(CashBox(cash=1000, limit=5000), bank_system=lambda: SocketBankSystem('127.0.0.1', 1))
+        atm.register_on_error(errors.append)
+        atm.insert_card(self.card)
+
+        # when
+        atm.enter_pin('1111')
+
+        # then
+        self.assertEqual(AtmExit.get_name(), atm.get_current_state_name())
+        self.assertEqual(ErrorCode.BANK_SYSTEM_IS_NOT_AVAILABLE, errors[0].args[0])
+
+    def test_malformed_request(self):
+        # given
+        connection = socket.create_connection(self.server.server_address, timeout=1.0)
+        reader = connection.makefile('rb')
+
+        # when
+        connection.sendall(b'not json\n{"id": 1, "op": "validate_pin", "args": ["1234", "1111"]}\n')
+
+        # then
+        response = json.loads(reader.readline())
+        self.assertEqual((None, False), (response['id'], response['ok']))
+        self.assertEqual({'id': 1, 'ok': True, 'result': True}, json.loads(reader.readline()))
+        reader.close()
+        connection.close()
+
+    def test_response_without_id(self):
+        # given a server answering without id, then reading until the connection is closed
+        listener = socket.create_server(('127.0.0.1', 0))
+        closed = []
+
+        def serve():
+            connection, _ = listener.accept()
+            reader = connection.makefile('rb')
+            reader.readline()
+            connection.sendall(b'{"ok": true, "result": true}\n')
+            closed.append(reader.readline())
+            reader.close()
+            connection.close()
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        bank_system = SocketBankSystem(*listener.getsockname(), pool_size=1)
+
+        # when
+        with self.assertRaises(RuntimeError) as e:
+            bank_system.validate_pin('1234', '1111')
+        thread.join(1.0)
+
+        # then
+        self.assertEqual(ErrorCode.BANK_SYSTEM_SENT_INVALID_RESPONSE, e.exception.args[0])
+        self.assertEqual([b''], closed)
+        listener.close()
+        with self.assertRaises(RuntimeError) as e:
+            bank_system.validate_pin('1234', '1111')
+        self.assertEqual(ErrorCode.BANK_SYSTEM_IS_NOT_AVAILABLE, e.exception.args[0])  # the slot was released
+        bank_system.close()
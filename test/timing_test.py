@@ -0,0 +1,104 @@
+import itertools
+import threading
+from unittest import TestCase
+
+from atm import Atm
+from infra.bank_api import MockBankSystem1
+from infra.timing import LatencyHistogram, Timings, TimedBankSystem
+from model.domain import Account, Card, CashBox, User
+
+
+def make_card():
+    user = User('user', [], [Account('user', '0001', 2000)])
+    card = Card('card', '1234', user)
+    user.cards.append(card)
+    return card
+
+
+class Unittest(TestCase):
+    def test_histogram_percentiles_within_bucket_error(self):
+        # given
+        histogram = LatencyHistogram()
+
+        # when
+        for value in range(1, 100001):
+            histogram.record(value)
+
+        # then
+        summary = histogram.summary()
+        self.assertEqual((100000, 50000), (summary['count'], summary['mean']))
+        for q, expected in ((50, 50000), (99, 99000), (99.9, 99900), (100, 100000)):
+            self.assertAlmostEqual(expected, histogram.percentile(q), delta=expected / 16)
+        self.assertAlmostEqual(100000, summary['max'], delta=100000 / 16)
+
+    def test_small_values_are_exact(self):
+        # given
+        histogram = LatencyHistogram()
+
+        # when
+        for value in (0, 3, 3, 7, 15):
+            histogram.record(value)
+
+        # then
+        self.assertEqual([0, 3, 15], [histogram.percentile(q) for q in (20, 60, 100)])
+
+    def test_states_handlers_and_bank_calls_are_timed(self):
+        # given
+        timings = Timings(clock=itertools.count(0, 100).__next__)
+        atm = Atm(CashBox(cash=1000, limit=5000), lambda: TimedBankSystem(MockBankSystem1(), timings), timings=timings)
+
+        # when
+        atm.insert_card(make_card())
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_deposit()
+        atm.put_in_cash(100)
+        atm.take_out_cash(100)
+
+        # then
+        report = timings.report()
+        for name in ('state.AtmReady', 'state.AtmAuthorized', 'state.AtmProcessingDeposit',
+                     'handler.enter_pin', 'handler.put_cash', 'handler.not_available',
+                     'bank.validate_pin', 'bank.get_accounts'):
+            self.assertEqual(1, report[name]['count'], name)
+        # loading accounts and displaying balance
+        self.assertEqual(2, report['handler.on_load']['count'])
+        self.assertNotIn('state.AtmWait', report)
+        self.assertEqual(100, report['bank.validate_pin']['mean'])
+
+    def test_toggle_at_runtime(self):
+        # given
+        timings = Timings(enabled=False)
+        atm = Atm(CashBox(cash=1000, limit=5000), timings=timings)
+        atm.insert_card(make_card())
+
+        # when
+        timings.enabled = True
+        atm.enter_pin('1')
+        atm.select_account(0)
+        timings.enabled = False
+        atm.select_deposit()
+
+        # then
+        self.assertEqual(['handler.enter_pin', 'handler.on_load', 'handler.select_account', 'state.AtmAuthorized'],
+                         list(timings.report()))
+
+    def test_threads_are_merged(self):
+        # given
+        timings = Timings()
+
+        def record():
+            for _ in range(1000):
+                timings.record('x', 10)
+
+        # when
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        self.assertEqual(4000, timings.report()['x']['count'])
+        timings.reset()
+        self.assertEqual({}, timings.report())
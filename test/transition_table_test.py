@@ -0,0 +1,61 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from atm import Atm, ACTIONS, STATES, TRANSITIONS, AtmDisplayingBalance, AtmProcessingDeposit, AtmWait
+from model.domain import CashBox
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.atm = Atm(CashBox(cash=1000, limit=5000))
+        card = MagicMock()
+        card.card_holder = MagicMock()
+        card.card_holder.accounts = [MagicMock()]
+        card.card_holder.accounts[0].balance = 2000
+        self.card = card
+
+    def test_every_state_is_compiled(self):
+        # then
+        for state in STATES.values():
+            self.assertEqual(len(ACTIONS), len(state.transitions))
+        self.assertEqual(len(TRANSITIONS), len(set((row[0], row[1]) for row in TRANSITIONS)))
+
+    def test_action_not_available(self):
+        # when
+        self.atm.select_deposit()
+        self.atm.take_out_cash(100)
+
+        # then
+        self.assertEqual(AtmWait.get_name(), self.atm.get_current_state_name())
+
+    def test_take_more_cash_than_entered(self):
+        # given
+        errors = []
+        self.atm.register_on_error(errors.append)
+        self.atm.insert_card(self.card)
+        self.atm.enter_pin('1')
+        self.atm.select_account(0)
+        self.atm.select_withdraw()
+        self.atm.enter_withdrawal_amount(100)
+
+        # when
+        self.atm.take_out_cash(200)
+
+        # then
+        self.assertEqual(AtmDisplayingBalance.get_name(), self.atm.get_current_state_name())
+        self.assertEqual(1, len(errors))
+
+    def test_back_from_deposit(self):
+        # given
+        self.atm.insert_card(self.card)
+        self.atm.enter_pin('1')
+        self.atm.select_account(0)
+        self.atm.select_deposit()
+        self.atm.back()
+
+        # when
+        self.atm.select_deposit()
+
+        # then
+        self.assertEqual(AtmProcessingDeposit.get_name(), self.atm.get_current_state_name())
@@ -0,0 +1,132 @@
+from unittest import TestCase
+
+from errors import ErrorCode
+from fleet import AtmFleet
+from model.domain import Account, Card, CashBox, User
+from model.session import WITHDRAW
+from model.velocity import RollingSums, VelocityLimits
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RollingSumsTest(TestCase):
+    def test_sum_slides_with_buckets(self):
+        # given a window of 60 seconds in buckets of 10 seconds
+        sums = RollingSums(60, buckets=6)
+
+        # when
+        sums.add('card', 100, 1000)
+        sums.add('card', 50, 1025)
+
+        # then
+        self.assertEqual(150, sums.sum('card', 1055))
+        self.assertEqual(50, sums.sum('card', 1060))
+        self.assertEqual(0, sums.sum('card', 1080))
+        self.assertEqual(0, sums.sum('other', 1080))
+
+    def test_idle_keys_are_dropped(self):
+        # given
+        sums = RollingSums(60, buckets=6)
+        for n in range(1000):
+            sums.add(n, 10, 1000)
+
+        # when
+        sums.add('card', 10, 1065)
+
+        # then
+        self.assertEqual(1, len(sums))
+
+    def test_cancel(self):
+        # given
+        sums = RollingSums(60, buckets=6)
+        sums.add('card', 100, 1000)
+        sums.add('card', 30, 1030)
+
+        # when
+        sums.cancel('card', 100, 1000, 1040)
+
+        # then
+        self.assertEqual(30, sums.sum('card', 1040))
+
+
+class VelocityLimitsTest(TestCase):
+    def setUp(self):
+        # given 500 an hour for a card, 800 a day for an account
+        self.clock = Clock()
+        self.limits = VelocityLimits(
+            card_limits=((3600, 500),), account_limits=((86400, 800),), clock=self.clock)
+
+    def test_card_limit(self):
+        # when
+        self.limits.withdraw('card', '0001', 400)
+
+        # then
+        with self.assertRaises(ValueError) as raised:
+            self.limits.withdraw('card', '0001', 200)
+        self.assertEqual(ErrorCode.CARD_WITHDRAWAL_LIMIT_EXCEEDED, raised.exception.args[0])
+        self.limits.check('card', '0001', 100)
+        self.clock.now += 3600 + 150
+        self.limits.withdraw('card', '0001', 300)
+
+    def test_account_limit_across_cards(self):
+        # when
+        self.limits.withdraw('card1', '0001', 500)
+
+        # then
+        with self.assertRaises(ValueError) as raised:
+            self.limits.check('card2', '0001', 400)
+        self.assertEqual(ErrorCode.ACCOUNT_WITHDRAWAL_LIMIT_EXCEEDED, raised.exception.args[0])
+
+    def test_cancel_gives_back(self):
+        # given
+        at = self.limits.withdraw('card', '0001', 500)
+
+        # when
+        self.limits.cancel('card', '0001', 500, at)
+
+        # then
+        self.limits.check('card', '0001', 500)
+
+
+class WithdrawalTest(TestCase):
+    def setUp(self):
+        # given one card at two terminals, 300 a day for the card
+        self.fleet = AtmFleet(velocity_limits=VelocityLimits(card_limits=((86400, 300),)))
+        for terminal_id in ('t1', 't2'):
+            self.fleet.add(terminal_id, CashBox(cash=10000, limit=50000))
+        user = User('user', [], [])
+        user.accounts.append(Account('user', '0001', 10000))
+        self.card = Card('card', '1234', user)
+        user.cards.append(self.card)
+
+    def test_limit_is_shared_by_terminals(self):
+        # when
+        first = self.fleet.get('t1').run_session(self.card, '1', [(WITHDRAW, 0, 200)])
+        second = self.fleet.get('t2').run_session(self.card, '1', [(WITHDRAW, 0, 200), (WITHDRAW, 0, 100)])
+
+        # then
+        self.assertIsNone(first.operations[0].error)
+        self.assertEqual(ErrorCode.CARD_WITHDRAWAL_LIMIT_EXCEEDED, second.operations[0].error.args[0])
+        self.assertEqual(10000 - 200, self.card.card_holder.accounts[0].balance)
+
+    def test_failed_transaction_is_not_counted(self):
+        # given a cash box emptied between the amount and the take out
+        atm = self.fleet.get('t1')
+        atm.insert_card(self.card)
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_withdraw()
+        atm.enter_withdrawal_amount(300)
+        self.fleet.terminals['t1'].cash_box.cash = 0
+
+        # when
+        atm.take_out_cash(300)
+
+        # then
+        self.fleet.velocity_limits.check('1234', '0001', 300)
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from atm import Atm, AtmDisplayingBalance
+from infra.bank_api import MockBankSystem1
+from infra.bank_server import InMemoryBank
+from infra.write_behind import DurableQueue, WriteBehindSync
+from model.command import WriteBehindUpdateTransactionCommand
+from model.domain import Account, Card, CashBox, User
+
+
+class FlakyBank(MockBankSystem1):
+    def __init__(self, bank, failures):
+        super().__init__()
+        self.bank = bank
+        self.failures = failures
+
+    def sync_transactions(self, transactions):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError('bank is not available')
+        return self.bank.sync_transactions(transactions)
+
+
+class Unittest(TestCase):
+    def setUp(self):
+        # given
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'queue')
+        self.bank = InMemoryBank()
+        self.bank.add_account('user', '0001', 2000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_queue_is_loaded_again(self):
+        # given
+        queue = DurableQueue(self.path)
+        for i in range(3):
+            queue.append(('t%d' % i, '0001', i))
+        queue.acknowledge(1)
+        queue.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'["t3", "00')
+
+        # when
+        queue = DurableQueue(self.path)
+        queue.append(('t4', '0001', 4))
+
+        # then
+        self.assertEqual([('t1', '0001', 1), ('t2', '0001', 2), ('t4', '0001', 4)], queue.peek(10))
+        queue.close()
+
+    def test_retry_until_bank_is_available(self):
+        # given
+        queue = DurableQueue(self.path, fsync=False)
+        sync = WriteBehindSync(queue, FlakyBank(self.bank, failures=2), interval=0.01)
+
+        # when
+        for i in range(5):
+            sync.submit('t%d' % i, '0001', -100)
+        sync.submit('t0', '0001', -100)
+        deadline = time.monotonic() + 5
+        while sync.metrics()['depth'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sync.close()
+
+        # then
+        self.assertEqual(1500, self.bank.accounts['0001'].balance)
+        self.assertEqual(0, sync.metrics()['depth'])
+        self.assertGreaterEqual(sync.failures, 1)
+
+    def test_rejected_transaction_is_set_aside(self):
+        # given
+        queue = DurableQueue(self.path, fsync=False)
+        sync = WriteBehindSync(queue, FlakyBank(self.bank, failures=0), batch_size=2, interval=60)
+        sync.submit('t0', '0001', -100)
+        sync.submit('t1', '9999', -100)
+        sync.submit('t2', '0001', -100)
+
+        # when
+        sync.flush()
+        sync.close()
+
+        # then
+        self.assertEqual(1800, self.bank.accounts['0001'].balance)
+        self.assertEqual((0, 1), (sync.metrics()['depth'], sync.metrics()['rejected']))
+        self.assertEqual([('t1', '9999', -100)], [record for record, _ in queue.rejected()])
+
+    def test_atm_updates_locally_then_syncs(self):
+        # given
+        sync = WriteBehindSync(DurableQueue(self.path, fsync=False), FlakyBank(self.bank, failures=0), interval=60)
+        command = WriteBehindUpdateTransactionCommand(sync)
+        account = Account('user', '0001', 2000)
+        atm = Atm(CashBox(cash=1000, limit=5000), update_transaction=lambda: command)
+        atm.insert_card(Card('user', '1234', User('user', [], [account])))
+        atm.enter_pin('1')
+        atm.select_account(0)
+        atm.select_withdraw()
+        atm.enter_withdrawal_amount(300)
+
+        # when
+        atm.take_out_cash(300)
+
+        # then
+        self.assertEqual(AtmDisplayingBalance.get_name(), atm.get_current_state_name())
+        self.assertEqual(1700, account.balance)
+        self.assertEqual(1, sync.metrics()['depth'])
+        sync.close()
+        self.assertEqual(1700, self.bank.accounts['0001'].balance)
+
+    def test_local_update_is_reverted_when_it_cannot_be_recorded(self):
+        # given
+        sync = WriteBehindSync(DurableQueue(self.path, fsync=False), FlakyBank(self.bank, failures=0), interval=60)
+        sync.queue.append = MagicMock(side_effect=OSError('disk is full'))
+        command = WriteBehindUpdateTransactionCommand(sync)
+        account = Account('user', '0001', 2000)
+        cash_box = CashBox(cash=1000, limit=5000)
+
+        # when, then
+        with self.assertRaises(OSError):
+            command.execute(MockBankSystem1(), cash_box, account, -300)
+        with self.assertRaises(OSError):
+            command.adjust_balance(MockBankSystem1(), cash_box, account, 300)
+        self.assertEqual((1000, 2000), (cash_box.cash, account.balance))
+        self.assertEqual(0, sync.metrics()['depth'])
+        sync.close()